@@ -0,0 +1,122 @@
+"""
+Benchmark de clean_dataframe : ancienne version ligne par ligne (.apply)
+contre la version par valeur distincte, avec vérification de l'identité des résultats.
+
+Usage : python benchmarks/bench_clean_dataframe.py [nombre_de_lignes]
+"""
+
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+
+# Ajouter le dossier parent au path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.scraper import clean_dataframe, clean_text, extract_number
+from utils.schema import apply_schema
+from utils.specs import CATEGORY_SPECS
+
+
+def clean_dataframe_rowwise(df: pd.DataFrame, category: str) -> pd.DataFrame:
+    """Implémentation d'origine, cellule par cellule (référence)"""
+    df_cleaned = df.copy()
+    if 'prix' in df_cleaned.columns:
+        df_cleaned['prix_numerique'] = df_cleaned['prix'].apply(extract_number)
+    if 'kilométrage' in df_cleaned.columns:
+        df_cleaned['km_numerique'] = df_cleaned['kilométrage'].apply(extract_number)
+    if 'année' in df_cleaned.columns:
+        df_cleaned['année'] = df_cleaned['année'].apply(lambda x: int(x) if x and x.isdigit() else None)
+    text_columns = ['titre', 'marque', 'transmission', 'carburant', 'adresse', 'propriétaire']
+    for col in text_columns:
+        if col in df_cleaned.columns:
+            df_cleaned[col] = df_cleaned[col].apply(clean_text)
+    return apply_schema(df_cleaned)
+
+
+# Cas limites observés sur dakar-auto.com (espaces multiples, chiffres arabes, virgules...)
+EDGE_PRICES = ['1,250,000 FCFA', 'Prix sur demande', '', '45 000 F CFA / jour', '  3 000 000  ',
+               '٣٠٠٠٠', 'Négociable 2 500 000', '12\u202f500\u202f000 F CFA']
+EDGE_MILEAGES = ['0 km', '', 'Nouveau', '1,200 km', '250000']
+EDGE_YEARS = ['', '٢٠١٩']
+EDGE_TEXTS = ['Toyota  Corolla\n2015', '  Peugeot 208 ', '', 'Almadies\tDakar', 'Vendeur\xa0 pro']
+BRANDS = ['Toyota', 'Peugeot', 'Hyundai', 'Kia', 'Renault', 'Mercedes', 'Nissan', 'Ford']
+MODELS = ['Corolla', 'RAV4', '208', '3008', 'Tucson', 'Picanto', 'Clio', 'Classe C', 'Qashqai', 'Ranger']
+TOWNS = ['Almadies', 'Mermoz', 'Ouakam', 'Plateau', 'Parcelles Assainies', 'Yoff', 'Pikine', 'Rufisque']
+
+
+def thousands(value: int) -> str:
+    return f"{value:,}".replace(',', ' ')
+
+
+def make_value(column: str, rng: random.Random, unique: bool, row: int) -> str:
+    """Valeur réaliste d'une colonne ; avec unique=True, chaque ligne diffère"""
+    if rng.random() < 0.05:
+        pools = {'prix': EDGE_PRICES, 'kilométrage': EDGE_MILEAGES, 'année': EDGE_YEARS}
+        return rng.choice(pools.get(column, EDGE_TEXTS))
+    suffix = f" {row}" if unique else ""
+    year = rng.randint(1995, 2024)
+    if column == 'prix':
+        return f"{thousands((row if unique else rng.randint(10, 1200)) * 50_000)} F CFA"
+    if column == 'kilométrage':
+        return f"{thousands((row if unique else rng.randint(0, 300)) * 1000)} km"
+    if column == 'année':
+        return str(year)
+    if column in ('titre', 'marque'):
+        return f"{rng.choice(BRANDS)} {rng.choice(MODELS)} {year}{suffix}"
+    if column == 'adresse':
+        return f"{rng.choice(TOWNS)}  Dakar{suffix}"
+    return rng.choice(['Automatique', 'Manuelle', 'Diesel', 'Essence', 'Vendeur pro']) + suffix
+
+
+def make_corpus(category: str, rows: int, seed: int = 0, unique: bool = False) -> pd.DataFrame:
+    """Corpus synthétique aux colonnes de la catégorie"""
+    rng = random.Random(seed)
+    columns = CATEGORY_SPECS[category].columns
+    return pd.DataFrame({column: [make_value(column, rng, unique, row) for row in range(rows)]
+                         for column in columns})
+
+
+def check_identical():
+    """
+    Vérifie l'identité des résultats (valeurs et dtypes) sur le corpus et ses
+    cas limites, bruts ou déjà passés par apply_schema
+    """
+    for category in CATEGORY_SPECS:
+        corpora = [
+            make_corpus(category, 5000),
+            make_corpus(category, 5000, unique=True),
+            make_corpus(category, 0),
+            make_corpus(category, 50).assign(**{column: '' for column in ('prix', 'année')
+                                                if column in CATEGORY_SPECS[category].columns}),
+            make_corpus(category, 50).astype(object).where(lambda df: df != '', None),
+        ]
+        for corpus in corpora:
+            expected = clean_dataframe_rowwise(corpus, category)
+            pd.testing.assert_frame_equal(clean_dataframe(corpus, category), expected)
+            # Données brutes déjà typées par le schéma compact (scraping sans nettoyage)
+            pd.testing.assert_frame_equal(clean_dataframe(apply_schema(corpus), category), expected)
+    print("✅ Résultats identiques à l'implémentation ligne par ligne")
+
+
+def bench(rows: int, unique: bool = False):
+    print(f"\nValeurs {'toutes distinctes' if unique else 'réalistes (répétées)'} :")
+    for category in CATEGORY_SPECS:
+        df = make_corpus(category, rows, unique=unique)
+        timings = {}
+        for name, clean in (('ligne par ligne', clean_dataframe_rowwise), ('par valeur distincte', clean_dataframe)):
+            start = time.perf_counter()
+            clean(df, category)
+            timings[name] = time.perf_counter() - start
+        before, after = timings['ligne par ligne'], timings['par valeur distincte']
+        print(f"{category:10} {rows} lignes : {rows / before:>12,.0f} lignes/s avant, "
+              f"{rows / after:>12,.0f} lignes/s après (x{before / after:.1f})")
+
+
+if __name__ == '__main__':
+    check_identical()
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    bench(rows)
+    bench(rows, unique=True)
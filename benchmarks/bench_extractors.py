@@ -0,0 +1,207 @@
+"""
+Benchmark de l'extraction des cartes d'annonces : parsers BeautifulSoup
+d'origine (un par catégorie, arbre complet) contre les extracteurs
+déclaratifs (backends bs4 et lxml), avec vérification de l'identité des
+annonces et du nombre de pages sur les pages de benchmarks/fixtures/.
+
+Usage : python benchmarks/bench_extractors.py [répétitions]
+"""
+
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from bs4 import BeautifulSoup
+
+# Ajouter le dossier parent au path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.scraper import LISTING_STRAINER, parse_html, parse_listing_page, scan_listing_page
+from utils.extractors import iter_page_elements
+
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+# Publicités et scripts ajoutés à une page pour mesurer la mémoire du parse
+PADDING_SCRIPT_BYTES = 1024 * 1024
+PADDING_AD_BLOCKS = 20000
+
+
+def _text(elem) -> str:
+    return elem.get_text().strip() if elem else ""
+
+
+def _linked_text(elem) -> str:
+    if not elem:
+        return ""
+    link = elem.find('a')
+    return link.get_text().strip() if link else elem.get_text().strip()
+
+
+def _address(article) -> str:
+    address_parts = []
+    town_elem = article.find('span', class_='town-suburb')
+    if town_elem:
+        address_parts.append(town_elem.get_text().strip())
+    province_elem = article.find('span', class_='province')
+    if province_elem:
+        address_parts.append(province_elem.get_text().strip())
+    return ' '.join(address_parts)
+
+
+def _year(text: str) -> str:
+    year_match = re.search(r'\b(19|20)\d{2}\b', text) if text else None
+    return year_match.group() if year_match else ""
+
+
+def parse_card_original(article, category: str) -> Dict:
+    """Parsers d'origine de scrape_*_brut, cellule par cellule (référence)"""
+    data = {}
+    if category == 'locations':
+        data['marque'] = _linked_text(article.find('h2', class_='listing-card__header__title'))
+        data['année'] = _year(data['marque'])
+        data['prix'] = _text(article.find('h3', class_='listing-card__header__price'))
+        data['adresse'] = _address(article)
+        data['propriétaire'] = _linked_text(article.find('p', class_='time-author'))
+        return data
+
+    data['titre'] = _linked_text(article.find('h2', class_='listing-card__header__title'))
+    words = data['titre'].split()
+    data['marque'] = words[0] if words else ""
+    data['année'] = _year(data['titre'])
+    data['prix'] = _text(article.find('h3', class_='listing-card__header__price'))
+    if category == 'voitures':
+        attributes = article.find_all('li', class_='listing-card__attribute')
+        for name, i in (('kilométrage', 0), ('transmission', 1), ('carburant', 2)):
+            data[name] = attributes[i].get_text().strip() if i < len(attributes) else ""
+    else:
+        data['kilométrage'] = _text(article.find('li', class_='listing-card__attribute'))
+    data['adresse'] = _address(article)
+    return data
+
+
+def parse_page_original(content: bytes, category: str) -> List[Dict]:
+    """Page entière parsée par BeautifulSoup, puis chaque carte"""
+    soup = BeautifulSoup(content, 'lxml')
+    return [parse_card_original(article, category)
+            for article in soup.find_all('div', class_='listings-cards__list-item')]
+
+
+def max_page_original(content: bytes) -> int:
+    """Détection du nombre de pages de get_total_pages d'origine"""
+    soup = BeautifulSoup(content, 'lxml')
+    max_page = 1
+    paginator = soup.find('nav', class_='paginator')
+    if paginator:
+        for link in paginator.find_all('a', class_='page-link'):
+            matches = re.findall(r'page=(\d+)', link.get('href', ''))
+            if matches:
+                max_page = max(max_page, int(matches[-1]))
+    return max_page
+
+
+def fixture_pages() -> List[tuple]:
+    """(nom, catégorie, contenu) des pages de fixtures"""
+    pages = []
+    for path in sorted(FIXTURES_DIR.glob("*.html")):
+        pages.append((path.name, path.name.split('_')[0], path.read_bytes()))
+    return pages
+
+
+def padded_page() -> bytes:
+    """Page de fixtures alourdie d'un gros script et de blocs publicitaires"""
+    content = (FIXTURES_DIR / "voitures_page_1.html").read_bytes()
+    script = b"<script>var payload = '" + b"x" * PADDING_SCRIPT_BYTES + b"';</script>"
+    ads = b"".join(b'<div class="ad-slot"><p>Publicit\xc3\xa9 %d</p><img src="/ad.gif"></div>' % i
+                   for i in range(PADDING_AD_BLOCKS))
+    return content.replace(b"</main>", ads + b"</main>" + script)
+
+
+def check_identical():
+    """Vérifie l'identité des annonces et du nombre de pages sur toutes les fixtures"""
+    for name, category, content in fixture_pages():
+        expected = parse_page_original(content, category)
+        for backend in ('lxml', 'bs4'):
+            records, errors = parse_listing_page(content, category, backend)
+            assert not errors, (name, backend, errors)
+            assert records == expected, f"{name} ({backend}) : annonces différentes"
+            assert scan_listing_page(content, backend) == (len(expected), max_page_original(content)), \
+                f"{name} ({backend}) : cartes ou pages différentes"
+    content = padded_page()
+    assert parse_listing_page(content, 'voitures')[0] == parse_page_original(content, 'voitures')
+    print(f"✅ Annonces et pagination identiques aux parsers d'origine ({len(fixture_pages())} pages)")
+
+
+def bench(repeat: int):
+    pages = [(name, category, content) for name, category, content in fixture_pages()]
+    cards = sum(len(parse_page_original(content, category)) for _, category, content in pages) * repeat
+    variants = (
+        ("origine (bs4, arbre complet)", lambda content, category: parse_page_original(content, category)),
+        ("déclaratif bs4 (SoupStrainer)", lambda content, category: parse_listing_page(content, category, 'bs4')),
+        ("déclaratif lxml (XPath ciblé)", lambda content, category: parse_listing_page(content, category, 'lxml')),
+    )
+    print(f"\n{cards} cartes ({repeat} passes sur les fixtures) :")
+    reference = None
+    for label, parse in variants:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for _, category, content in pages:
+                parse(content, category)
+        elapsed = time.perf_counter() - start
+        reference = reference or elapsed
+        print(f"{label:32} {elapsed / cards * 1e6:>8.1f} µs/carte (x{reference / elapsed:.1f})")
+
+
+# Parse seul de la page alourdie, exécuté dans un processus neuf pour mesurer son pic mémoire
+MEMORY_VARIANTS = {
+    'arbre complet bs4': lambda content: BeautifulSoup(content, 'lxml'),
+    'SoupStrainer bs4': lambda content: parse_html(content, LISTING_STRAINER),
+    'parse ciblé lxml': lambda content: sum(1 for _ in iter_page_elements(content)),
+}
+
+
+def _status_bytes(field: str) -> int:
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith(field + ':'):
+                return int(line.split()[1]) * 1024
+    raise KeyError(field)
+
+
+def measure_memory(variant: str, path: str):
+    """Pic de mémoire résidente au-dessus de l'état courant pendant le parse (Linux)"""
+    content = Path(path).read_bytes()
+    # Remet le pic (VmHWM) à la mémoire résidente actuelle : l'import des modules n'est pas compté
+    with open('/proc/self/clear_refs', 'w') as clear_refs:
+        clear_refs.write('5')
+    before = _status_bytes('VmRSS')
+    result = MEMORY_VARIANTS[variant](content)
+    print(_status_bytes('VmHWM') - before)
+    del result
+
+
+def bench_memory():
+    content = padded_page()
+    print(f"\nPic mémoire du parse d'une page alourdie ({len(content) / (1024 * 1024):.1f} MB), "
+          f"processus neuf par mesure :")
+    with tempfile.NamedTemporaryFile(suffix='.html') as page_file:
+        page_file.write(content)
+        page_file.flush()
+        for variant in MEMORY_VARIANTS:
+            output = subprocess.run([sys.executable, __file__, '--memory', variant, page_file.name],
+                                    capture_output=True, text=True, check=True).stdout
+            print(f"{variant:32} {int(output.split()[-1]) / (1024 * 1024):>6.1f} MB")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 3 and sys.argv[1] == '--memory':
+        measure_memory(sys.argv[2], sys.argv[3])
+        sys.exit(0)
+    check_identical()
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
+    bench_memory()
@@ -2,12 +2,47 @@
 Dashboard de visualisation des données
 """
 
+import logging
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from pathlib import Path
 import numpy as np
+import sys
+import os
+
+# Ajouter le dossier parent au path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.schema import memory_report
+from utils.aggregates import group_means, histogram_bins, top_counts
+from utils.dataset_cache import dataset_cache
+from utils.filter_index import FilterIndex
+from utils.listing_store import listing_store, store_columns
+from utils.snapshots import snapshot_store
+from utils.specs import CATEGORY_SPECS
+from utils.storage import CLEAN_DATA_DIR, list_datasets
+
+
+logger = logging.getLogger(__name__)
+
+# Colonnes lues pour chaque dashboard (graphiques et tableau détaillé)
+DASHBOARD_COLUMNS = {name: store_columns(name) for name in CATEGORY_SPECS}
+
+# Filtres du dashboard voitures (colonne, libellé)
+CATEGORY_FILTERS = (('marque', "Marque:"), ('transmission', "Transmission:"), ('carburant', "Carburant:"))
+RANGE_FILTERS = (('prix_numerique', "Prix (FCFA):"), ('km_numerique', "Kilométrage (km):"), ('année', "Année:"))
+
+# Tailles de page proposées pour les tableaux détaillés
+PAGE_SIZES = (25, 50, 100, 250)
+DEFAULT_PAGE_SIZE = 50
+
+# Couleurs des graphiques par catégorie (échelle des barres, histogramme des prix)
+CATEGORY_COLORS = {
+    'voitures': ('Blues', '#1f77b4'),
+    'motos': ('Reds', '#d62728'),
+    'locations': ('Greens', '#2ca02c'),
+}
 
 
 def show():
@@ -15,14 +50,34 @@ def show():
     st.markdown("Visualisez les données nettoyées de dakar-auto.com")
     st.markdown("---")
     
+    # Source des données : fichiers nettoyés, base SQLite ou historique des instantanés
+    store_counts = listing_store.table_counts()
+    history_counts = {category: count for category, count in snapshot_store.categories().items() if count >= 2}
+    sources = (["Fichiers"] + (["Base SQLite"] if store_counts else [])
+               + (["Comparaison entre périodes"] if history_counts else []))
+    if len(sources) > 1:
+        source = st.radio("🗄️ Source des données:", sources, horizontal=True)
+        if source == "Base SQLite":
+            category = st.selectbox("📂 Catégorie:", list(store_counts),
+                                    format_func=lambda name: f"{CATEGORY_SPECS[name].label} "
+                                                             f"({store_counts[name]} annonces)")
+            show_store_dashboard(category)
+            return
+        if source == "Comparaison entre périodes":
+            category = st.selectbox("📂 Catégorie:", list(history_counts),
+                                    format_func=lambda name: f"{CATEGORY_SPECS[name].label} "
+                                                             f"({history_counts[name]} instantanés)")
+            show_snapshot_comparison(category)
+            return
+    
     # Charger les données nettoyées
-    data_dir = Path("data_dakar_auto")
+    data_dir = CLEAN_DATA_DIR
     
     if not data_dir.exists():
         data_dir.mkdir(exist_ok=True)
     
-    # Rechercher les fichiers
-    files = list(data_dir.glob("*nettoyees.csv")) + list(data_dir.glob("*_nettoyees.csv"))
+    # Rechercher les fichiers (Parquet, Feather ou CSV)
+    files = list_datasets(data_dir, "*nettoyees")
     
     if not files:
         st.warning("⚠️ Aucune donnée nettoyée disponible pour le dashboard.")
@@ -38,25 +93,123 @@ def show():
     selected_file_name = st.selectbox("📂 Sélectionnez un fichier:", list(file_options.keys()))
     selected_file = file_options[selected_file_name]
     
-    # Charger les données
+    # Déterminer le type de données
+    name = selected_file_name.lower()
+    category = ('voitures' if 'voiture' in name else 'motos' if 'moto' in name
+                else 'locations' if 'location' in name else None)
+    if category is None:
+        st.error("❌ Type de données non reconnu.")
+        return
+    
+    # Charger les données (relues seulement si le fichier a changé)
     try:
-        df = pd.read_csv(selected_file, encoding='utf-8-sig')
+        df = dataset_cache.load(selected_file, columns=DASHBOARD_COLUMNS[category])
         
-        # Déterminer le type de données
-        if 'voiture' in selected_file_name.lower():
-            show_voitures_dashboard(df)
-        elif 'moto' in selected_file_name.lower():
+        cache_stats = dataset_cache.get_stats()
+        st.caption(f"⚡ Cache des jeux de données : {cache_stats['hit_rate']:.0%} de hits "
+                   f"({cache_stats['hits']} hits, {cache_stats['misses']} lectures), "
+                   f"{cache_stats['entries']} fichier(s), {cache_stats['size_bytes'] / (1024 * 1024):.1f} MB")
+        
+        if selected_file.suffix == '.csv':
+            # Le rapport relit le CSV sans typage : calculé seulement à la demande
+            if st.checkbox("💾 Comparer la mémoire avec un chargement CSV non typé"):
+                raw_df = pd.read_csv(selected_file, encoding='utf-8-sig',
+                                     usecols=lambda column: column in df.columns)
+                st.dataframe(memory_report(raw_df, df), use_container_width=True)
+        
+        if category == 'voitures':
+            filter_index = dataset_cache.derived(selected_file, DASHBOARD_COLUMNS[category], 'filter_index',
+                                                 FilterIndex)
+            show_voitures_dashboard(df, filter_index)
+        elif category == 'motos':
             show_motos_dashboard(df)
-        elif 'location' in selected_file_name.lower():
-            show_locations_dashboard(df)
         else:
-            st.error("❌ Type de données non reconnu.")
+            show_locations_dashboard(df)
             
     except Exception as e:
         st.error(f"❌ Erreur de chargement: {e}")
 
 
-def show_voitures_dashboard(df):
+def sorted_positions(values: pd.Series, ascending: bool = True) -> np.ndarray:
+    """Positions des lignes triées selon une colonne (valeurs manquantes en dernier)"""
+    return values.reset_index(drop=True).sort_values(ascending=ascending, na_position='last',
+                                                    kind='stable').index.to_numpy()
+
+
+def show_data_grid(df: pd.DataFrame, key: str, height: int = 400):
+    """
+    Tableau paginé : seule la page visible est envoyée au navigateur.
+    Le tri et le découpage en pages sont faits côté serveur.
+    """
+    def fetch_page(sort_column, ascending, start, size):
+        if sort_column is None:
+            return df.iloc[start:start + size]
+        return df.iloc[sorted_positions(df[sort_column], ascending)[start:start + size]]
+    
+    show_paged_grid(list(df.columns), len(df), fetch_page, key, height)
+
+
+def show_paged_grid(columns: list, total: int, fetch_page, key: str, height: int = 400):
+    """
+    Contrôles de tri et de pagination d'un tableau de `total` lignes.
+    fetch_page(colonne de tri ou None, croissant, début, taille) retourne la page à afficher.
+    """
+    col1, col2, col3, col4 = st.columns([2, 1, 1, 1])
+    with col1:
+        sort_column = st.selectbox("Trier par:", ['(aucun)'] + list(columns), key=f"{key}_sort")
+    with col2:
+        ascending = st.radio("Ordre:", ["Croissant", "Décroissant"], key=f"{key}_order",
+                             horizontal=True) == "Croissant"
+    with col3:
+        page_size = st.selectbox("Lignes par page:", PAGE_SIZES, index=PAGE_SIZES.index(DEFAULT_PAGE_SIZE),
+                                 key=f"{key}_page_size")
+    
+    num_pages = max((total + page_size - 1) // page_size, 1)
+    # Le nombre de pages change avec les filtres : on ramène la page courante dans les bornes
+    page_key = f"{key}_page"
+    if st.session_state.get(page_key, 1) > num_pages:
+        st.session_state[page_key] = num_pages
+    with col4:
+        page = st.number_input(f"Page (sur {num_pages}):", min_value=1, max_value=num_pages, step=1,
+                               key=page_key)
+    
+    start = (page - 1) * page_size
+    page_df = fetch_page(None if sort_column == '(aucun)' else sort_column, ascending, start, page_size)
+    
+    st.dataframe(page_df, use_container_width=True, height=height)
+    if total:
+        st.caption(f"Lignes {start + 1} à {start + len(page_df)} sur {total}")
+
+
+def show_chart(fig: go.Figure, name: str):
+    """Affiche un graphique ; en niveau DEBUG, journalise la taille des données envoyées au navigateur"""
+    # La sérialisation n'est faite que si le message sera effectivement émis
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Graphique « %s » : %d octets envoyés", name, len(fig.to_json().encode('utf-8')))
+    st.plotly_chart(fig, use_container_width=True)
+
+
+def price_histogram(prices: pd.Series, color: str, nbins: int = 30) -> go.Figure:
+    """Histogramme des prix calculé côté serveur : seuls les effectifs par classe sont envoyés"""
+    return bins_histogram(histogram_bins(prices, nbins), color)
+
+
+def bins_histogram(bins: pd.DataFrame, color: str) -> go.Figure:
+    """Histogramme des prix à partir de classes déjà calculées (début, fin, centre, effectif)"""
+    fig = go.Figure(go.Bar(
+        x=bins['centre'],
+        y=bins['effectif'],
+        width=bins['fin'] - bins['début'],
+        customdata=bins[['début', 'fin']],
+        hovertemplate="%{customdata[0]:,.0f} - %{customdata[1]:,.0f} FCFA<br>%{y} annonces<extra></extra>",
+        marker_color=color
+    ))
+    fig.update_layout(xaxis_title='Prix (FCFA)', yaxis_title="Nombre d'annonces", bargap=0,
+                      showlegend=False, height=400)
+    return fig
+
+
+def show_voitures_dashboard(df, filter_index: FilterIndex = None):
     """Dashboard spécifique pour les voitures"""
     
     st.markdown("### 🚗 Analyse des Voitures")
@@ -97,7 +250,7 @@ def show_voitures_dashboard(df):
         # Top 10 marques
         if 'marque' in df.columns:
             st.markdown("#### 🏆 Top 10 Marques")
-            top_marques = df['marque'].value_counts().head(10)
+            top_marques = top_counts(df['marque'], 10)
             fig = px.bar(
                 x=top_marques.values,
                 y=top_marques.index,
@@ -107,23 +260,16 @@ def show_voitures_dashboard(df):
                 color_continuous_scale='Blues'
             )
             fig.update_layout(showlegend=False, height=400)
-            st.plotly_chart(fig, use_container_width=True)
+            show_chart(fig, "Top 10 marques")
     
     with col2:
         # Distribution des prix
         if 'prix_numerique' in df.columns:
             st.markdown("#### 💰 Distribution des Prix")
-            df_clean_price = df[df['prix_numerique'].notna() & (df['prix_numerique'] > 0)]
-            if len(df_clean_price) > 0:
-                fig = px.histogram(
-                    df_clean_price,
-                    x='prix_numerique',
-                    nbins=30,
-                    labels={'prix_numerique': 'Prix (FCFA)'},
-                    color_discrete_sequence=['#1f77b4']
-                )
-                fig.update_layout(showlegend=False, height=400)
-                st.plotly_chart(fig, use_container_width=True)
+            prices = df['prix_numerique']
+            prices = prices[prices > 0]
+            if len(prices) > 0:
+                show_chart(price_histogram(prices, '#1f77b4'), "Distribution des prix")
             else:
                 st.info("Pas de données de prix disponibles")
     
@@ -134,39 +280,38 @@ def show_voitures_dashboard(df):
         # Transmission
         if 'transmission' in df.columns:
             st.markdown("#### ⚙️ Type de Transmission")
-            transmission_counts = df['transmission'].value_counts()
+            transmission_counts = top_counts(df['transmission'])
             fig = px.pie(
                 values=transmission_counts.values,
                 names=transmission_counts.index,
                 hole=0.4
             )
             fig.update_layout(height=400)
-            st.plotly_chart(fig, use_container_width=True)
+            show_chart(fig, "Transmission")
     
     with col2:
         # Carburant
         if 'carburant' in df.columns:
             st.markdown("#### ⛽ Type de Carburant")
-            carburant_counts = df['carburant'].value_counts()
+            carburant_counts = top_counts(df['carburant'])
             fig = px.pie(
                 values=carburant_counts.values,
                 names=carburant_counts.index,
                 hole=0.4
             )
             fig.update_layout(height=400)
-            st.plotly_chart(fig, use_container_width=True)
+            show_chart(fig, "Carburant")
     
     # Prix par marque (Top 10)
     if 'marque' in df.columns and 'prix_numerique' in df.columns:
         st.markdown("---")
         st.markdown("#### 📊 Prix Moyen par Marque (Top 10)")
         
-        top_marques_list = df['marque'].value_counts().head(10).index
-        df_top = df[df['marque'].isin(top_marques_list)].copy()
-        df_top = df_top[df_top['prix_numerique'].notna() & (df_top['prix_numerique'] > 0)]
+        top_marques_list = top_counts(df['marque'], 10).index
+        df_top = df.loc[df['marque'].isin(top_marques_list) & (df['prix_numerique'] > 0), ['marque', 'prix_numerique']]
         
         if len(df_top) > 0:
-            prix_par_marque = df_top.groupby('marque')['prix_numerique'].mean().sort_values(ascending=False)
+            prix_par_marque = group_means(df_top, 'marque', 'prix_numerique')
             
             fig = px.bar(
                 x=prix_par_marque.index,
@@ -176,44 +321,43 @@ def show_voitures_dashboard(df):
                 color_continuous_scale='Viridis'
             )
             fig.update_layout(showlegend=False, height=400)
-            st.plotly_chart(fig, use_container_width=True)
+            show_chart(fig, "Prix moyen par marque")
     
     # Tableau des données
     st.markdown("---")
     st.markdown("#### 📋 Données Détaillées")
     
-    # Filtres
+    # Filtres (index construit une fois par jeu de données)
+    if filter_index is None:
+        filter_index = FilterIndex(df)
+    
+    selected_categories = {}
+    selected_ranges = {}
     with st.expander("🔍 Filtres"):
         col1, col2, col3 = st.columns(3)
+        for col, (column, label) in zip((col1, col2, col3), CATEGORY_FILTERS):
+            with col:
+                if column in df.columns:
+                    selected_categories[column] = st.multiselect(label, filter_index.options(column),
+                                                                 placeholder="Toutes")
         
-        with col1:
-            if 'marque' in df.columns:
-                marques = ['Toutes'] + sorted(df['marque'].dropna().unique().tolist())
-                selected_marque = st.selectbox("Marque:", marques)
-        
-        with col2:
-            if 'transmission' in df.columns:
-                transmissions = ['Toutes'] + sorted(df['transmission'].dropna().unique().tolist())
-                selected_transmission = st.selectbox("Transmission:", transmissions)
-        
-        with col3:
-            if 'carburant' in df.columns:
-                carburants = ['Tous'] + sorted(df['carburant'].dropna().unique().tolist())
-                selected_carburant = st.selectbox("Carburant:", carburants)
+        col1, col2, col3 = st.columns(3)
+        for col, (column, label) in zip((col1, col2, col3), RANGE_FILTERS):
+            bounds = filter_index.bounds(column)
+            if bounds is None or bounds[0] == bounds[1]:
+                continue
+            low, high = int(bounds[0]), int(bounds[1])
+            with col:
+                selected = st.slider(label, low, high, (low, high))
+            # Intervalle complet = pas de filtre (les valeurs manquantes restent affichées)
+            if selected != (low, high):
+                selected_ranges[column] = selected
     
     # Appliquer les filtres
-    df_filtered = df.copy()
-    
-    if 'marque' in df.columns and 'selected_marque' in locals() and selected_marque != 'Toutes':
-        df_filtered = df_filtered[df_filtered['marque'] == selected_marque]
-    
-    if 'transmission' in df.columns and 'selected_transmission' in locals() and selected_transmission != 'Toutes':
-        df_filtered = df_filtered[df_filtered['transmission'] == selected_transmission]
+    positions = filter_index.select(selected_categories, selected_ranges)
+    df_filtered = df if positions is None else df.iloc[positions]
     
-    if 'carburant' in df.columns and 'selected_carburant' in locals() and selected_carburant != 'Tous':
-        df_filtered = df_filtered[df_filtered['carburant'] == selected_carburant]
-    
-    st.dataframe(df_filtered, use_container_width=True, height=400)
+    show_data_grid(df_filtered, key="voitures_grid")
     st.caption(f"📊 {len(df_filtered)} résultats affichés sur {len(df)} total")
 
 
@@ -251,7 +395,7 @@ def show_motos_dashboard(df):
         # Top marques
         if 'marque' in df.columns:
             st.markdown("#### 🏆 Top 10 Marques")
-            top_marques = df['marque'].value_counts().head(10)
+            top_marques = top_counts(df['marque'], 10)
             fig = px.bar(
                 x=top_marques.values,
                 y=top_marques.index,
@@ -261,28 +405,21 @@ def show_motos_dashboard(df):
                 color_continuous_scale='Reds'
             )
             fig.update_layout(showlegend=False, height=400)
-            st.plotly_chart(fig, use_container_width=True)
+            show_chart(fig, "Top 10 marques")
     
     with col2:
         # Distribution des prix
         if 'prix_numerique' in df.columns:
             st.markdown("#### 💰 Distribution des Prix")
-            df_clean_price = df[df['prix_numerique'].notna() & (df['prix_numerique'] > 0)]
-            if len(df_clean_price) > 0:
-                fig = px.histogram(
-                    df_clean_price,
-                    x='prix_numerique',
-                    nbins=30,
-                    labels={'prix_numerique': 'Prix (FCFA)'},
-                    color_discrete_sequence=['#d62728']
-                )
-                fig.update_layout(showlegend=False, height=400)
-                st.plotly_chart(fig, use_container_width=True)
+            prices = df['prix_numerique']
+            prices = prices[prices > 0]
+            if len(prices) > 0:
+                show_chart(price_histogram(prices, '#d62728'), "Distribution des prix")
     
     # Tableau des données
     st.markdown("---")
     st.markdown("#### 📋 Données Détaillées")
-    st.dataframe(df, use_container_width=True, height=400)
+    show_data_grid(df, key="motos_grid")
 
 
 def show_locations_dashboard(df):
@@ -312,7 +449,7 @@ def show_locations_dashboard(df):
         # Top marques
         if 'marque' in df.columns:
             st.markdown("#### 🏆 Top 10 Marques")
-            top_marques = df['marque'].value_counts().head(10)
+            top_marques = top_counts(df['marque'], 10)
             fig = px.bar(
                 x=top_marques.values,
                 y=top_marques.index,
@@ -322,28 +459,255 @@ def show_locations_dashboard(df):
                 color_continuous_scale='Greens'
             )
             fig.update_layout(showlegend=False, height=400)
-            st.plotly_chart(fig, use_container_width=True)
+            show_chart(fig, "Top 10 marques")
     
     with col2:
         # Distribution des prix
         if 'prix_numerique' in df.columns:
             st.markdown("#### 💰 Distribution des Prix")
-            df_clean_price = df[df['prix_numerique'].notna() & (df['prix_numerique'] > 0)]
-            if len(df_clean_price) > 0:
-                fig = px.histogram(
-                    df_clean_price,
-                    x='prix_numerique',
-                    nbins=30,
-                    labels={'prix_numerique': 'Prix (FCFA)'},
-                    color_discrete_sequence=['#2ca02c']
-                )
-                fig.update_layout(showlegend=False, height=400)
-                st.plotly_chart(fig, use_container_width=True)
+            prices = df['prix_numerique']
+            prices = prices[prices > 0]
+            if len(prices) > 0:
+                show_chart(price_histogram(prices, '#2ca02c'), "Distribution des prix")
     
     # Tableau des données
     st.markdown("---")
     st.markdown("#### 📋 Données Détaillées")
-    st.dataframe(df, use_container_width=True, height=400)
+    show_data_grid(df, key="locations_grid")
+
+
+def show_store_dashboard(category: str):
+    """
+    Dashboard d'une catégorie de la base SQLite : métriques, agrégats,
+    filtres et pages du tableau sont calculés par des requêtes indexées,
+    sans charger la table en mémoire.
+    """
+    spec = CATEGORY_SPECS[category]
+    columns = store_columns(category)
+    bar_scale, histogram_color = CATEGORY_COLORS[category]
+    
+    st.markdown(f"### {spec.label} — Base SQLite")
+    
+    # Métriques globales (une seule requête pour les moyennes)
+    metric_columns = [(column, label, fmt) for column, label, fmt in (
+        ('prix_numerique', "💰 Prix moyen", "{:,.0f} FCFA"),
+        ('km_numerique', "🛣️ KM moyen", "{:,.0f} km"),
+        ('année', "📅 Année moyenne", "{:.0f}"),
+    ) if column in columns]
+    means = listing_store.means(category, [column for column, _, _ in metric_columns])
+    total = listing_store.count(category)
+    metric_cols = st.columns(len(metric_columns) + 1)
+    with metric_cols[0]:
+        st.metric("📊 Total d'annonces", total)
+    for col, (column, label, fmt) in zip(metric_cols[1:], metric_columns):
+        with col:
+            st.metric(label, fmt.format(means[column]) if means[column] is not None else "N/A")
+    
+    st.markdown("---")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.markdown("#### 🏆 Top 10 Marques")
+        top_marques = listing_store.top_counts(category, 'marque', 10)
+        fig = px.bar(
+            x=top_marques.values,
+            y=top_marques.index,
+            orientation='h',
+            labels={'x': 'Nombre d\'annonces', 'y': 'Marque'},
+            color=top_marques.values,
+            color_continuous_scale=bar_scale
+        )
+        fig.update_layout(showlegend=False, height=400)
+        show_chart(fig, "Top 10 marques")
+    
+    with col2:
+        st.markdown("#### 💰 Distribution des Prix")
+        bins = listing_store.histogram_bins(category, 'prix_numerique', ranges={'prix_numerique': (1, None)})
+        if len(bins):
+            show_chart(bins_histogram(bins, histogram_color), "Distribution des prix")
+        else:
+            st.info("Pas de données de prix disponibles")
+    
+    # Répartitions (voitures : transmission et carburant)
+    pie_columns = [(column, title) for column, title in (('transmission', "#### ⚙️ Type de Transmission"),
+                                                          ('carburant', "#### ⛽ Type de Carburant"))
+                   if column in columns]
+    if pie_columns:
+        for col, (column, title) in zip(st.columns(len(pie_columns)), pie_columns):
+            with col:
+                st.markdown(title)
+                counts = listing_store.top_counts(category, column)
+                fig = px.pie(values=counts.values, names=counts.index, hole=0.4)
+                fig.update_layout(height=400)
+                show_chart(fig, column.capitalize())
+    
+    # Prix moyen par marque (Top 10)
+    if len(top_marques):
+        st.markdown("---")
+        st.markdown("#### 📊 Prix Moyen par Marque (Top 10)")
+        prix_par_marque = listing_store.group_means(category, 'marque', 'prix_numerique',
+                                                    categories={'marque': list(top_marques.index)},
+                                                    ranges={'prix_numerique': (1, None)})
+        if len(prix_par_marque):
+            fig = px.bar(
+                x=prix_par_marque.index,
+                y=prix_par_marque.values,
+                labels={'x': 'Marque', 'y': 'Prix Moyen (FCFA)'},
+                color=prix_par_marque.values,
+                color_continuous_scale='Viridis'
+            )
+            fig.update_layout(showlegend=False, height=400)
+            show_chart(fig, "Prix moyen par marque")
+    
+    # Tableau des données (filtres traduits en clause WHERE)
+    st.markdown("---")
+    st.markdown("#### 📋 Données Détaillées")
+    
+    selected_categories = {}
+    selected_ranges = {}
+    with st.expander("🔍 Filtres"):
+        category_filters = [(column, label) for column, label in CATEGORY_FILTERS if column in columns]
+        if category_filters:
+            for col, (column, label) in zip(st.columns(len(category_filters)), category_filters):
+                with col:
+                    selected_categories[column] = st.multiselect(label, listing_store.options(category, column),
+                                                                 placeholder="Toutes",
+                                                                 key=f"store_{category}_{column}")
+        
+        range_filters = [(column, label) for column, label in RANGE_FILTERS if column in columns]
+        for col, (column, label) in zip(st.columns(len(range_filters)), range_filters):
+            bounds = listing_store.bounds(category, column)
+            if bounds is None or bounds[0] == bounds[1]:
+                continue
+            low, high = int(bounds[0]), int(bounds[1])
+            with col:
+                selected = st.slider(label, low, high, (low, high), key=f"store_{category}_{column}")
+            # Intervalle complet = pas de filtre (les valeurs manquantes restent affichées)
+            if selected != (low, high):
+                selected_ranges[column] = selected
+    
+    filtered = listing_store.count(category, selected_categories, selected_ranges)
+    
+    def fetch_page(sort_column, ascending, start, size):
+        return listing_store.page(category, selected_categories, selected_ranges, sort_column, ascending,
+                                  start, size)
+    
+    show_paged_grid(list(columns), filtered, fetch_page, key=f"store_{category}_grid")
+    st.caption(f"📊 {filtered} résultats affichés sur {total} total")
+
+
+def show_snapshot_comparison(category: str):
+    """
+    Comparaison de deux instantanés d'une catégorie. Volumes et prix moyens
+    viennent du manifeste ; seules les annonces ajoutées, retirées ou
+    modifiées entre les deux sont relues.
+    """
+    spec = CATEGORY_SPECS[category]
+    bar_scale, histogram_color = CATEGORY_COLORS[category]
+    snapshots = {entry['id']: entry for entry in snapshot_store.snapshots(category)}
+    snapshot_ids = list(snapshots)
+    
+    def label(snapshot_id):
+        entry = snapshots[snapshot_id]
+        return f"{entry['taken_at'].replace('T', ' ')} ({entry['rows']} annonces)"
+    
+    st.markdown(f"### {spec.label} — Comparaison entre périodes")
+    col1, col2 = st.columns(2)
+    with col1:
+        old_id = st.selectbox("Période de référence:", snapshot_ids, index=len(snapshot_ids) - 2,
+                              format_func=label, key=f"history_{category}_old")
+    with col2:
+        new_id = st.selectbox("Période comparée:", snapshot_ids, index=len(snapshot_ids) - 1,
+                              format_func=label, key=f"history_{category}_new")
+    if old_id == new_id:
+        st.info("Choisissez deux instantanés différents.")
+        return
+    old, new = snapshots[old_id], snapshots[new_id]
+    
+    # Différences (instantanés immuables : gardées pour les reruns de la session)
+    diff_key = (category, old_id, new_id)
+    cached = st.session_state.get('snapshot_diff')
+    if cached is not None and cached[0] == diff_key:
+        diff = cached[1]
+    else:
+        columns = [column for column in ('titre', 'marque', 'année', 'prix_numerique')
+                   if column in store_columns(category)]
+        diff = snapshot_store.compare(category, old_id, new_id, columns=columns)
+        st.session_state['snapshot_diff'] = (diff_key, diff)
+    
+    # Variations de prix des annonces présentes dans les deux instantanés
+    prices = diff.changed[['prix_numerique_avant', 'prix_numerique']].astype('float64')
+    moved = prices.notna().all(axis=1) & prices['prix_numerique'].ne(prices['prix_numerique_avant'])
+    variations = diff.changed.loc[moved].assign(
+        variation=prices.loc[moved, 'prix_numerique'] - prices.loc[moved, 'prix_numerique_avant'],
+        variation_pct=(prices.loc[moved, 'prix_numerique'] / prices.loc[moved, 'prix_numerique_avant'] - 1) * 100,
+    )
+    
+    col1, col2, col3, col4, col5 = st.columns(5)
+    with col1:
+        st.metric("📊 Annonces", new['rows'], delta=new['rows'] - old['rows'])
+    with col2:
+        if new['prix_moyen'] is not None and old['prix_moyen'] is not None:
+            st.metric("💰 Prix moyen", f"{new['prix_moyen']:,.0f} FCFA",
+                      delta=f"{new['prix_moyen'] - old['prix_moyen']:+,.0f} FCFA")
+        else:
+            st.metric("💰 Prix moyen", "N/A")
+    with col3:
+        st.metric("🆕 Ajoutées", len(diff.added))
+    with col4:
+        st.metric("🗑️ Retirées", len(diff.removed))
+    with col5:
+        st.metric("🔁 Prix modifiés", len(variations),
+                  delta=f"{int((variations['variation'] > 0).sum())} hausses, "
+                        f"{int((variations['variation'] < 0).sum())} baisses", delta_color='off')
+    
+    st.markdown("---")
+    
+    # Volumes et prix moyens par marque (manifeste)
+    marques = sorted(set(old['marques']) | set(new['marques']),
+                     key=lambda marque: max(old['marques'].get(marque, {}).get('annonces', 0),
+                                            new['marques'].get(marque, {}).get('annonces', 0)),
+                     reverse=True)[:10]
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("#### 📦 Annonces par Marque (Top 10)")
+        fig = go.Figure([
+            go.Bar(name=label_text, x=marques,
+                   y=[entry['marques'].get(marque, {}).get('annonces', 0) for marque in marques])
+            for label_text, entry in (("Référence", old), ("Comparée", new))
+        ])
+        fig.update_layout(barmode='group', height=400, xaxis_title='Marque', yaxis_title="Nombre d'annonces")
+        show_chart(fig, "Annonces par marque")
+    with col2:
+        st.markdown("#### 💰 Prix Moyen par Marque (Top 10)")
+        fig = go.Figure([
+            go.Bar(name=label_text, x=marques,
+                   y=[entry['marques'].get(marque, {}).get('prix_moyen') for marque in marques])
+            for label_text, entry in (("Référence", old), ("Comparée", new))
+        ])
+        fig.update_layout(barmode='group', height=400, xaxis_title='Marque', yaxis_title='Prix Moyen (FCFA)')
+        show_chart(fig, "Prix moyen par marque")
+    
+    if len(variations):
+        st.markdown("#### 📈 Variations de Prix")
+        fig = bins_histogram(histogram_bins(variations['variation']), histogram_color)
+        fig.update_layout(xaxis_title='Variation de prix (FCFA)')
+        show_chart(fig, "Variations de prix")
+    
+    # Annonces concernées
+    st.markdown("---")
+    st.markdown("#### 📋 Annonces Concernées")
+    tab1, tab2, tab3 = st.tabs([f"🔁 Prix modifiés ({len(variations)})", f"🆕 Ajoutées ({len(diff.added)})",
+                                f"🗑️ Retirées ({len(diff.removed)})"])
+    with tab1:
+        changed_columns = [column for column in diff.added.columns if column != 'prix_numerique']
+        changed_columns += ['prix_numerique_avant', 'prix_numerique', 'variation', 'variation_pct']
+        show_data_grid(variations[changed_columns].reset_index(drop=True), key=f"history_{category}_changed")
+    with tab2:
+        show_data_grid(diff.added.reset_index(drop=True), key=f"history_{category}_added")
+    with tab3:
+        show_data_grid(diff.removed.reset_index(drop=True), key=f"history_{category}_removed")
 
 
 def show_demo_dashboard():
@@ -364,3 +728,4 @@ def show_demo_dashboard():
     
     df_demo = pd.DataFrame(demo_data)
     show_voitures_dashboard(df_demo)
+
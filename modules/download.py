@@ -6,6 +6,73 @@ import streamlit as st
 import pandas as pd
 from pathlib import Path
 import os
+import sys
+import tempfile
+
+# Ajouter le dossier parent au path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.schema import read_dataset
+from utils.catalog import get_catalog, preview_frame
+from utils.downloads import download_data, file_download_data, zip_bundles
+from utils.ingest import ingest_csv
+from utils.listing_store import listing_store
+from utils.specs import CATEGORY_SPECS
+from utils.storage import CLEAN_DATA_DIR, MIME_TYPES, RAW_DATA_DIR, list_datasets, load_dataset
+
+
+def export_store_csv(category: str) -> bytes:
+    """
+    Table SQLite d'une catégorie en CSV : écrite en flux dans un fichier
+    temporaire, puis lue une seule fois pour st.download_button (qui garde
+    de toute façon les octets servis en mémoire)
+    """
+    with tempfile.TemporaryDirectory(prefix='export_') as directory:
+        path = Path(directory) / f"{category}_base.csv"
+        listing_store.export_csv(category, path)
+        return path.read_bytes()
+
+
+def show_dataset_file(file_path: Path, entry: dict, key_prefix: str):
+    """Statistiques, aperçu et téléchargement d'un fichier, à partir de son entrée de catalogue"""
+    if entry is None or 'error' in entry:
+        st.error(f"❌ Erreur de lecture: {entry.get('error') if entry else 'fichier introuvable'}")
+        return
+    
+    # Statistiques
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Lignes", entry['rows'])
+    with col2:
+        st.metric("Colonnes", len(entry['columns']))
+    with col3:
+        file_size = entry['size'] / 1024  # KB
+        st.metric("Taille", f"{file_size:.1f} KB")
+    
+    # Aperçu
+    st.markdown("**Aperçu:**")
+    st.dataframe(preview_frame(entry), use_container_width=True)
+    
+    # Bouton de téléchargement : le fichier tel qu'il est stocké
+    st.download_button(
+        label="📥 Télécharger ce fichier" if file_path.suffix == '.csv'
+        else f"📥 Télécharger ce fichier ({file_path.suffix[1:]})",
+        data=file_download_data(file_path),
+        file_name=file_path.name,
+        mime=MIME_TYPES[file_path.suffix],
+        key=f"download_{key_prefix}_{file_path.name}"
+    )
+    
+    # Export CSV d'un fichier colonnaire, converti seulement à la demande
+    if file_path.suffix != '.csv':
+        if st.button("🔄 Préparer l'export CSV", key=f"export_{key_prefix}_{file_path.name}"):
+            st.download_button(
+                label="📥 Exporter en CSV",
+                data=download_data(lambda: load_dataset(file_path).to_csv(index=False, encoding='utf-8-sig')),
+                file_name=file_path.with_suffix('.csv').name,
+                mime="text/csv",
+                key=f"download_{key_prefix}_csv_{file_path.name}"
+            )
 
 
 def show():
@@ -14,8 +81,8 @@ def show():
     st.markdown("---")
     
     # Vérifier les dossiers de données
-    data_dir_brut = Path("data_dakar_auto_brutes")
-    data_dir_clean = Path("data_dakar_auto")
+    data_dir_brut = RAW_DATA_DIR
+    data_dir_clean = CLEAN_DATA_DIR
     
     # Créer les dossiers s'ils n'existent pas
     data_dir_brut.mkdir(exist_ok=True)
@@ -30,7 +97,7 @@ def show():
         st.info("Ces données n'ont subi aucun traitement et contiennent les valeurs exactes extraites du site.")
         
         # Lister les fichiers disponibles
-        files_brut = list(data_dir_brut.glob("*.csv"))
+        files_brut = list_datasets(data_dir_brut)
         
         if not files_brut:
             st.warning("⚠️ Aucun fichier de données brutes disponible.")
@@ -38,53 +105,19 @@ def show():
         else:
             st.success(f"✅ {len(files_brut)} fichier(s) disponible(s)")
             
-            # Afficher chaque fichier
+            # Afficher chaque fichier (métadonnées et aperçu lus dans le catalogue)
+            entries = get_catalog(data_dir_brut).refresh(files_brut)
             for file_path in sorted(files_brut):
                 with st.expander(f"📄 {file_path.name}"):
-                    try:
-                        df = pd.read_csv(file_path, encoding='utf-8-sig')
-                        
-                        # Statistiques
-                        col1, col2, col3 = st.columns(3)
-                        with col1:
-                            st.metric("Lignes", len(df))
-                        with col2:
-                            st.metric("Colonnes", len(df.columns))
-                        with col3:
-                            file_size = file_path.stat().st_size / 1024  # KB
-                            st.metric("Taille", f"{file_size:.1f} KB")
-                        
-                        # Aperçu
-                        st.markdown("**Aperçu:**")
-                        st.dataframe(df.head(5), use_container_width=True)
-                        
-                        # Bouton de téléchargement
-                        csv_data = df.to_csv(index=False, encoding='utf-8-sig')
-                        st.download_button(
-                            label="📥 Télécharger ce fichier",
-                            data=csv_data,
-                            file_name=file_path.name,
-                            mime="text/csv",
-                            key=f"download_brut_{file_path.name}"
-                        )
-                        
-                    except Exception as e:
-                        st.error(f"❌ Erreur de lecture: {e}")
+                    show_dataset_file(file_path, entries.get(file_path.name), "brut")
             
             # Téléchargement groupé
             st.markdown("---")
             if st.button("📥 Télécharger tous les fichiers bruts (ZIP)", use_container_width=True):
-                import zipfile
-                import io
-                
-                zip_buffer = io.BytesIO()
-                with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-                    for file_path in files_brut:
-                        zip_file.write(file_path, file_path.name)
-                
+                # Archive écrite en flux sur disque, réutilisée tant que les fichiers n'ont pas changé
                 st.download_button(
                     label="💾 Télécharger le ZIP",
-                    data=zip_buffer.getvalue(),
+                    data=zip_bundles.download_data(files_brut),
                     file_name="dakar_auto_donnees_brutes.zip",
                     mime="application/zip"
                 )
@@ -95,7 +128,7 @@ def show():
         st.info("Ces données ont été nettoyées et formatées pour une meilleure utilisation.")
         
         # Lister les fichiers disponibles
-        files_clean = list(data_dir_clean.glob("*.csv"))
+        files_clean = list_datasets(data_dir_clean)
         
         if not files_clean:
             st.warning("⚠️ Aucun fichier de données nettoyées disponible.")
@@ -103,56 +136,36 @@ def show():
         else:
             st.success(f"✅ {len(files_clean)} fichier(s) disponible(s)")
             
-            # Afficher chaque fichier
+            # Afficher chaque fichier (métadonnées et aperçu lus dans le catalogue)
+            entries = get_catalog(data_dir_clean).refresh(files_clean)
             for file_path in sorted(files_clean):
                 with st.expander(f"📄 {file_path.name}"):
-                    try:
-                        df = pd.read_csv(file_path, encoding='utf-8-sig')
-                        
-                        # Statistiques
-                        col1, col2, col3 = st.columns(3)
-                        with col1:
-                            st.metric("Lignes", len(df))
-                        with col2:
-                            st.metric("Colonnes", len(df.columns))
-                        with col3:
-                            file_size = file_path.stat().st_size / 1024  # KB
-                            st.metric("Taille", f"{file_size:.1f} KB")
-                        
-                        # Aperçu
-                        st.markdown("**Aperçu:**")
-                        st.dataframe(df.head(5), use_container_width=True)
-                        
-                        # Bouton de téléchargement
-                        csv_data = df.to_csv(index=False, encoding='utf-8-sig')
-                        st.download_button(
-                            label="📥 Télécharger ce fichier",
-                            data=csv_data,
-                            file_name=file_path.name,
-                            mime="text/csv",
-                            key=f"download_clean_{file_path.name}"
-                        )
-                        
-                    except Exception as e:
-                        st.error(f"❌ Erreur de lecture: {e}")
+                    show_dataset_file(file_path, entries.get(file_path.name), "clean")
             
             # Téléchargement groupé
             st.markdown("---")
             if st.button("📥 Télécharger tous les fichiers nettoyés (ZIP)", use_container_width=True):
-                import zipfile
-                import io
-                
-                zip_buffer = io.BytesIO()
-                with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-                    for file_path in files_clean:
-                        zip_file.write(file_path, file_path.name)
-                
+                # Archive écrite en flux sur disque, réutilisée tant que les fichiers n'ont pas changé
                 st.download_button(
                     label="💾 Télécharger le ZIP",
-                    data=zip_buffer.getvalue(),
+                    data=zip_bundles.download_data(files_clean),
                     file_name="dakar_auto_donnees_nettoyees.zip",
                     mime="application/zip"
                 )
+        
+        # Export CSV des tables de la base SQLite
+        store_counts = listing_store.table_counts()
+        if store_counts:
+            st.markdown("---")
+            st.markdown("#### 🗄️ Base SQLite")
+            for category, count in store_counts.items():
+                st.download_button(
+                    label=f"📥 {category.capitalize()} : {count} annonces (CSV)",
+                    data=download_data(lambda category=category: export_store_csv(category)),
+                    file_name=f"{category}_base.csv",
+                    mime="text/csv",
+                    key=f"download_store_{category}"
+                )
     
     # TAB 3: Upload de fichiers CSV
     with tab3:
@@ -176,34 +189,63 @@ def show():
                 help="Vous pouvez uploader plusieurs fichiers CSV à la fois"
             )
             
+            clean_category = st.selectbox(
+                "Nettoyer à l'import",
+                [None] + list(CATEGORY_SPECS),
+                format_func=lambda category: "Non" if category is None else category.capitalize(),
+                help="Produit aussi un fichier <nom>_nettoyees.csv (nettoyage par morceaux)"
+            )
+            clean_workers = st.number_input(
+                "Processus de nettoyage:",
+                min_value=0,
+                max_value=os.cpu_count() or 1,
+                value=0,
+                step=1,
+                disabled=clean_category is None,
+                help="0 = nettoyage dans le processus de l'application; sinon pool de processus (très gros fichiers)"
+            )
+            
             if uploaded_files:
                 st.success(f"✅ {len(uploaded_files)} fichier(s) uploadé(s)")
+                # Imports déjà faits : un fichier n'est pas réimporté à chaque rerun
+                ingested = st.session_state.setdefault('ingested_uploads', {})
                 
                 # Afficher et traiter chaque fichier
                 for uploaded_file in uploaded_files:
                     with st.expander(f"📄 {uploaded_file.name}", expanded=False):
                         try:
-                            # Lire le fichier
-                            df = pd.read_csv(uploaded_file, encoding='utf-8-sig')
-                            
-                            # Sauvegarder automatiquement le fichier dans le dossier scraped
-                            save_path = scraped_dir / uploaded_file.name
-                            df.to_csv(save_path, index=False, encoding='utf-8-sig')
+                            ingest_key = (uploaded_file.file_id, clean_category)
+                            result = ingested.get(ingest_key)
+                            if result is None:
+                                # Import par morceaux : le fichier n'est jamais chargé en entier
+                                progress = st.empty()
+                                result = ingest_csv(
+                                    uploaded_file,
+                                    scraped_dir / uploaded_file.name,
+                                    category=clean_category,
+                                    workers=clean_workers,
+                                    progress_callback=lambda rows: progress.caption(f"⏳ {rows} lignes importées...")
+                                )
+                                progress.empty()
+                                ingested[ingest_key] = result
+                            save_path = result.path
                             
                             # Statistiques
                             col1, col2, col3 = st.columns(3)
                             with col1:
-                                st.metric("Lignes", len(df))
+                                st.metric("Lignes", result.rows)
                             with col2:
-                                st.metric("Colonnes", len(df.columns))
+                                st.metric("Colonnes", len(result.columns))
                             with col3:
                                 st.metric("Taille", f"{save_path.stat().st_size / 1024:.1f} KB")
                             
                             # Aperçu des données
                             st.markdown("**Aperçu:**")
-                            st.dataframe(df.head(3), use_container_width=True)
+                            st.dataframe(read_dataset(save_path, nrows=3), use_container_width=True)
                             
                             st.success(f"💾 Sauvegardé: {save_path}")
+                            if result.cleaned_path is not None:
+                                st.success(f"🧹 Nettoyé: {result.cleaned_path}")
                             
                         except Exception as e:
                             st.error(f"❌ Erreur: {e}")
@@ -232,17 +274,10 @@ def show():
                 with col_btn1:
                     # Bouton pour télécharger tous les fichiers en ZIP
                     if st.button("📥 Tout (ZIP)", use_container_width=True, help="Télécharger tous les fichiers"):
-                        import zipfile
-                        import io
-                        
-                        zip_buffer = io.BytesIO()
-                        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-                            for file_path in scraped_files:
-                                zip_file.write(file_path, file_path.name)
-                        
+                        # Archive écrite en flux sur disque, réutilisée tant que les fichiers n'ont pas changé
                         st.download_button(
                             label="💾 ZIP Complet",
-                            data=zip_buffer.getvalue(),
+                            data=zip_bundles.download_data(scraped_files),
                             file_name="scraped_files.zip",
                             mime="application/zip",
                             use_container_width=True
@@ -277,18 +312,10 @@ def show():
                         if len(selected_files) > 1:
                             # Télécharger les sélectionnés en ZIP
                             if st.button(f"📥 Télécharger {len(selected_files)} sélectionnés (ZIP)", use_container_width=True):
-                                import zipfile
-                                import io
-                                
-                                zip_buffer = io.BytesIO()
-                                with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-                                    for file_name in selected_files:
-                                        file_path = scraped_dir / file_name
-                                        zip_file.write(file_path, file_name)
-                                
+                                # Archive écrite en flux sur disque, réutilisée tant que les fichiers n'ont pas changé
                                 st.download_button(
                                     label="💾 Télécharger ZIP",
-                                    data=zip_buffer.getvalue(),
+                                    data=zip_bundles.download_data([scraped_dir / file_name for file_name in selected_files]),
                                     file_name="selected_files.zip",
                                     mime="application/zip",
                                     use_container_width=True
@@ -316,45 +343,50 @@ def show():
             st.markdown("---")
             st.markdown("### 📊 Détails des fichiers sélectionnés")
             
+            catalog = get_catalog(scraped_dir)
+            entries = catalog.refresh(scraped_dir / file_name for file_name in selected_files)
             for file_name in selected_files:
                 file_path = scraped_dir / file_name
                 with st.expander(f"📄 {file_name}", expanded=False):
                     try:
-                        df = pd.read_csv(file_path, encoding='utf-8-sig')
+                        entry = entries[file_name]
+                        if 'error' in entry:
+                            raise ValueError(entry['error'])
+                        # Lit le fichier entier une fois par version, résultat gardé au catalogue
+                        non_null = catalog.non_null_counts(file_path)
                         
                         # Statistiques
                         col1, col2, col3, col4 = st.columns(4)
                         with col1:
-                            st.metric("Lignes", len(df))
+                            st.metric("Lignes", entry['rows'])
                         with col2:
-                            st.metric("Colonnes", len(df.columns))
+                            st.metric("Colonnes", len(entry['columns']))
                         with col3:
-                            st.metric("Taille", f"{file_path.stat().st_size / 1024:.1f} KB")
+                            st.metric("Taille", f"{entry['size'] / 1024:.1f} KB")
                         with col4:
-                            st.metric("Valeurs nulles", df.isnull().sum().sum())
+                            st.metric("Valeurs nulles", sum(entry['rows'] - count for count in non_null.values()))
                         
                         # Informations sur les colonnes
                         st.markdown("**Colonnes:**")
                         col_info = pd.DataFrame({
-                            'Colonne': df.columns,
-                            'Type': df.dtypes.astype(str),
-                            'Non-null': df.count().values
+                            'Colonne': entry['columns'],
+                            'Type': entry['dtypes'],
+                            'Non-null': [non_null[column] for column in entry['columns']]
                         })
                         st.dataframe(col_info, use_container_width=True, height=150)
                         
                         # Aperçu des données
                         st.markdown("**Aperçu (5 premières lignes):**")
-                        st.dataframe(df.head(5), use_container_width=True)
+                        st.dataframe(preview_frame(entry), use_container_width=True)
                         
                         # Boutons d'action
                         col_btn1, col_btn2 = st.columns(2)
                         
                         with col_btn1:
-                            # Téléchargement individuel
-                            csv_data = df.to_csv(index=False, encoding='utf-8-sig')
+                            # Téléchargement individuel : le fichier tel qu'il est stocké
                             st.download_button(
                                 label="📥 Télécharger",
-                                data=csv_data,
+                                data=file_download_data(file_path),
                                 file_name=file_name,
                                 mime="text/csv",
                                 key=f"download_{file_name}",
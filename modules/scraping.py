@@ -4,20 +4,85 @@ Page de scraping interactif
 
 import streamlit as st
 import pandas as pd
-from pathlib import Path
 import sys
 import os
+from typing import Dict, Iterable, Tuple
 
 # Ajouter le dossier parent au path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from utils.scraper import (
-    scrape_voitures_brut,
-    scrape_motos_brut,
-    scrape_locations_brut,
+    iter_category_pages,
     get_total_pages,
-    clean_dataframe
+    iter_archived_pages,
+    clear_page_counts,
+    clean_dataframe,
+    DEFAULT_MAX_WORKERS,
+    DEFAULT_FETCH_QUEUE_SIZE,
+    DEFAULT_PARSE_QUEUE_SIZE,
+    DEFAULT_PARSER_BACKEND,
+    PARSER_BACKENDS
 )
+from utils.http_client import (
+    configure_session,
+    connection_stats,
+    rate_controller,
+    rate_limiter,
+    DEFAULT_CONNECT_TIMEOUT,
+    DEFAULT_READ_TIMEOUT,
+    DEFAULT_REQUESTS_PER_SECOND
+)
+from utils.http_cache import http_cache, DEFAULT_MAX_AGE
+from utils.archive import html_archive
+from utils.downloads import file_download_data
+from utils.listing_store import ListingStore, listing_store, store_columns
+from utils.snapshots import SnapshotStore, snapshot_store
+from utils.specs import CATEGORY_SPECS
+from utils.schema import apply_schema
+from utils.scrape_result import ScrapeResult, summarize_frame, summarize_scrape
+from utils.storage import (
+    CLEAN_DATA_DIR,
+    DATASET_FORMATS,
+    DEFAULT_DATASET_FORMAT,
+    RAW_DATA_DIR,
+    dataset_path,
+    raw_data_path,
+    save_dataset_chunks
+)
+from utils.checkpoint import load_journal, run_checkpointed_crawl
+from utils.seen_index import crawl_path, run_incremental_crawl
+
+
+def store_listings(chunks: Iterable[pd.DataFrame], category_name: str, is_cleaned: bool,
+                   store: ListingStore = listing_store, history: SnapshotStore = snapshot_store) -> Tuple[Dict, Dict]:
+    """
+    Ajoute les annonces d'un scraping, lues par morceaux, à la base SQLite
+    (ajout ou mise à jour, une transaction par morceau) et à l'historique
+    (instantané daté, en delta avec le précédent). Des morceaux bruts sont
+    d'abord nettoyés. L'instantané porte sur l'ensemble du scraping : seules
+    ses colonnes stockées sont gardées d'un morceau à l'autre. Retourne les
+    compteurs de la base et l'entrée de l'instantané.
+    """
+    counts = {'inserted': 0, 'updated': 0}
+    columns = list(store_columns(category_name))
+    stored_chunks = []
+    for chunk in chunks:
+        stored_df = chunk if is_cleaned else clean_dataframe(chunk, category_name)
+        for key, value in store.insert(category_name, stored_df).items():
+            counts[key] += value
+        stored_chunks.append(stored_df[[column for column in columns if column in stored_df.columns]])
+    stored = pd.concat(stored_chunks, ignore_index=True) if stored_chunks else pd.DataFrame(columns=columns)
+    # Les catégories et entiers compacts diffèrent d'un morceau à l'autre
+    snapshot = history.save(category_name, apply_schema(stored))
+    return counts, snapshot
+
+
+def keep_result(result: ScrapeResult):
+    """Garde le résultat dans la session ; le fichier temporaire du précédent est supprimé"""
+    previous = st.session_state.get('scrape_result')
+    if previous is not None and previous.path != result.path:
+        previous.discard()
+    st.session_state['scrape_result'] = result
 
 
 def show():
@@ -28,20 +93,22 @@ def show():
     # Sélection de la catégorie
     col1, col2 = st.columns([2, 1])
     
+    # Catégories et URLs issues des spécifications (utils/specs.py)
+    specs = {spec.label: spec for spec in CATEGORY_SPECS.values()}
+    
     with col1:
         category = st.selectbox(
             "📂 Choisissez une catégorie:",
-            ["🚗 Voitures", "🏍️ Motos", "🚙 Locations de voitures"]
+            list(specs.keys())
         )
     
-    # Configuration des URLs
-    urls = {
-        "🚗 Voitures": "https://dakar-auto.com/senegal/voitures-4",
-        "🏍️ Motos": "https://dakar-auto.com/senegal/motos-and-scooters-3",
-        "🚙 Locations de voitures": "https://dakar-auto.com/senegal/location-de-voitures-19"
-    }
+    spec = specs[category]
+    url = spec.url
     
-    url = urls[category]
+    # Appliquer la configuration du cache avant toute requête (détection comprise)
+    http_cache.enabled = st.session_state.get('http_cache_enabled', True)
+    http_cache.max_age = st.session_state.get('http_cache_max_age', DEFAULT_MAX_AGE)
+    html_archive.enabled = st.session_state.get('html_archive_enabled', True)
     
     # Options de scraping
     st.markdown("### ⚙️ Options de scraping")
@@ -55,7 +122,7 @@ def show():
         if detect_pages:
             if st.button("🔍 Détecter les pages"):
                 with st.spinner("Détection en cours..."):
-                    total_pages = get_total_pages(url)
+                    total_pages = get_total_pages(url, category=spec.name)
                     st.session_state['total_pages'] = total_pages
                     st.success(f"✅ {total_pages} pages détectées!")
         else:
@@ -71,6 +138,193 @@ def show():
     with col3:
         clean_data = st.checkbox("Nettoyer les données après scraping", value=False)
     
+    stream_to_disk = st.checkbox(
+        f"💾 Écrire chaque page dans {raw_data_path(spec.name)} pendant le scraping",
+        value=True,
+        help="Les annonces sont ajoutées au CSV brut page par page : la mémoire reste bornée "
+             "et un arrêt brutal ne fait pas perdre les pages déjà terminées"
+    )
+    
+    incremental = stream_to_disk and st.checkbox(
+        "🔁 Mode incrémental: ajouter uniquement les nouvelles annonces",
+        value=False,
+        help="Les pages sont parcourues de la plus récente à la plus ancienne ; le scraping s'arrête "
+             "à la première page dont toutes les annonces sont déjà dans le CSV brut"
+    )
+    
+    # Reprise d'un crawl interrompu (journal de checkpoints du CSV brut)
+    resume = False
+    journal = load_journal(spec.name) if stream_to_disk and not incremental else None
+    if journal is not None and journal.is_resumable(url):
+        st.warning(
+            f"⏸️ Un scraping précédent a été interrompu: {len(journal.completed)} pages terminées, "
+            f"{len(journal.missing_pages())} pages manquantes sur {journal.header['max_pages']}."
+        )
+        resume = st.checkbox("▶️ Reprendre uniquement les pages manquantes", value=True)
+    
+    # Options de concurrence
+    with st.expander("⚡ Options avancées (concurrence)"):
+        col1, col2 = st.columns(2)
+        with col1:
+            max_workers = st.slider(
+                "Requêtes simultanées:",
+                min_value=1,
+                max_value=16,
+                value=DEFAULT_MAX_WORKERS,
+                help="Nombre de pages téléchargées en parallèle"
+            )
+        with col2:
+            requests_per_second = st.slider(
+                "Débit initial (requêtes/seconde):",
+                min_value=0.5,
+                max_value=10.0,
+                value=DEFAULT_REQUESTS_PER_SECOND,
+                step=0.5,
+                help="Budget global partagé par toutes les requêtes vers le site"
+            )
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            adaptive_rate = st.checkbox(
+                "Débit adaptatif (AIMD)",
+                value=True,
+                help="Augmente le débit tant que le site répond vite, le divise par deux sur 429, 5xx ou timeout"
+            )
+        with col2:
+            max_requests_per_second = st.number_input(
+                "Débit maximal adaptatif (requêtes/seconde):",
+                min_value=0.5,
+                max_value=20.0,
+                value=None,
+                step=0.5,
+                placeholder="Débit initial",
+                disabled=not adaptive_rate,
+                help="Par défaut, le débit ne remonte jamais au-dessus du débit initial"
+            )
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            parse_workers = st.number_input(
+                "Processus de parsing:",
+                min_value=0,
+                max_value=os.cpu_count() or 1,
+                value=0,
+                step=1,
+                help="0 = parsing dans le thread principal; sinon pool de processus dédié"
+            )
+        with col2:
+            fetch_queue_size = st.number_input(
+                "File des pages téléchargées:",
+                min_value=1,
+                max_value=256,
+                value=DEFAULT_FETCH_QUEUE_SIZE,
+                step=1,
+                help="Nombre maximal de pages brutes en attente de parsing"
+            )
+        with col3:
+            parse_queue_size = st.number_input(
+                "File de parsing:",
+                min_value=1,
+                max_value=128,
+                value=DEFAULT_PARSE_QUEUE_SIZE,
+                step=1,
+                help="Nombre maximal de pages en cours de parsing"
+            )
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            parser_backend = st.selectbox(
+                "Moteur d'extraction:",
+                PARSER_BACKENDS,
+                index=PARSER_BACKENDS.index(DEFAULT_PARSER_BACKEND),
+                help="lxml: XPath compilés (rapide) ; bs4: BeautifulSoup (repli)"
+            )
+        with col2:
+            connect_timeout = st.number_input(
+                "Timeout de connexion (s):",
+                min_value=1,
+                max_value=60,
+                value=DEFAULT_CONNECT_TIMEOUT,
+                step=1
+            )
+        with col3:
+            read_timeout = st.number_input(
+                "Timeout de lecture (s):",
+                min_value=1,
+                max_value=120,
+                value=DEFAULT_READ_TIMEOUT,
+                step=1
+            )
+    
+    # Cache HTTP
+    with st.expander("🗄️ Cache HTTP"):
+        col1, col2 = st.columns(2)
+        with col1:
+            st.checkbox(
+                "Utiliser le cache HTTP",
+                value=True,
+                key='http_cache_enabled',
+                help="Réutilise les pages déjà téléchargées (requêtes conditionnelles ETag/Last-Modified)"
+            )
+        with col2:
+            st.number_input(
+                "Durée de fraîcheur (s):",
+                min_value=0,
+                max_value=86400,
+                value=DEFAULT_MAX_AGE,
+                step=60,
+                key='http_cache_max_age',
+                help="Pendant cette durée, une page en cache est servie sans aucune requête"
+            )
+        
+        cache_stats = http_cache.get_stats()
+        col1, col2, col3, col4, col5 = st.columns(5)
+        with col1:
+            st.metric("✅ Hits", cache_stats['hits'])
+        with col2:
+            st.metric("🔁 Revalidés (304)", cache_stats['revalidated'])
+        with col3:
+            st.metric("❌ Misses", cache_stats['misses'])
+        with col4:
+            st.metric("📈 Taux de hit", f"{cache_stats['hit_rate']:.0%}")
+        with col5:
+            st.metric("💽 Taille", f"{cache_stats['size_bytes'] / (1024 * 1024):.1f} MB")
+        st.caption(f"{cache_stats['entries']} pages en cache, {cache_stats['evictions']} évictions LRU")
+        
+        if st.button("🗑️ Vider le cache"):
+            http_cache.clear()
+            http_cache.reset_stats()
+            clear_page_counts()
+            st.rerun()
+    
+    # Archive des pages HTML et ré-extraction hors ligne
+    with st.expander("📦 Archive HTML"):
+        st.checkbox(
+            "Archiver les pages téléchargées",
+            value=True,
+            key='html_archive_enabled',
+            help="Chaque nouvelle version d'une page est conservée compressée dans .html_archive/"
+        )
+        
+        archive_stats = html_archive.get_stats()
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("🗂️ Segments", archive_stats['segments'])
+        with col2:
+            st.metric("📄 Pages archivées", archive_stats['snapshots'])
+        with col3:
+            st.metric("💽 Taille", f"{archive_stats['size_bytes'] / (1024 * 1024):.1f} MB")
+        
+        if st.button(f"♻️ Ré-extraire {category} depuis l'archive",
+                     help="Applique les extracteurs actuels aux pages archivées, sans accès réseau"):
+            with st.spinner("Ré-extraction en cours..."):
+                data = [record for _, records in iter_archived_pages(spec.name) for record in records]
+            if data:
+                keep_result(summarize_frame(pd.DataFrame(data), spec.name))
+                st.success(f"✅ {len(data)} annonces ré-extraites depuis l'archive.")
+            else:
+                st.warning("⚠️ Aucune page archivée pour cette catégorie.")
+    
     # Afficher les informations
     if 'total_pages' in st.session_state and detect_pages:
         st.info(f"📊 Nombre total de pages détectées: **{st.session_state['total_pages']}**")
@@ -81,7 +335,12 @@ def show():
     if st.button("🚀 Lancer le scraping", type="primary", use_container_width=True):
         
         # Déterminer le nombre de pages
-        if detect_pages and 'total_pages' in st.session_state:
+        if resume:
+            num_pages = journal.header['max_pages']
+        elif incremental:
+            # Pas de détection : le crawl s'arrête de lui-même aux annonces déjà connues
+            num_pages = st.session_state['max_pages'] if not detect_pages and 'max_pages' in st.session_state else None
+        elif detect_pages and 'total_pages' in st.session_state:
             num_pages = st.session_state['total_pages']
         elif not detect_pages and 'max_pages' in st.session_state:
             num_pages = st.session_state['max_pages']
@@ -100,40 +359,82 @@ def show():
             logs.append(message)
             log_container.text_area("📋 Logs:", "\n".join(logs), height=200)
         
+        rate_limiter.set_rate(requests_per_second)
+        # Le plafond reste le débit choisi, sauf s'il est explicitement relevé
+        rate_controller.configure(enabled=adaptive_rate,
+                                  max_rate=max(max_requests_per_second or 0, requests_per_second))
+        # Un pool au moins aussi grand que le nombre de workers évite les connexions jetables
+        configure_session(pool_maxsize=max(max_workers, 4), connect_timeout=connect_timeout,
+                          read_timeout=read_timeout)
+        connection_stats.reset()
+        
         # Scraping selon la catégorie
         try:
-            status_text.text(f"⏳ Scraping en cours... (0/{num_pages} pages)")
+            # Nombre de pages inconnu en mode incrémental sans limite
+            total_label = num_pages or "?"
+            pages_done = 0
+            status_text.text(f"⏳ Scraping en cours... (0/{total_label} pages)")
             
-            if category == "🚗 Voitures":
-                data = scrape_voitures_brut(url, num_pages, log_callback)
-                df = pd.DataFrame(data)
-                category_name = "voitures"
-                
-            elif category == "🏍️ Motos":
-                data = scrape_motos_brut(url, num_pages, log_callback)
-                df = pd.DataFrame(data)
-                category_name = "motos"
-                
-            else:  # Locations
-                data = scrape_locations_brut(url, num_pages, log_callback)
-                df = pd.DataFrame(data)
-                category_name = "locations"
+            def show_progress(page):
+                nonlocal pages_done
+                pages_done = page
+                if num_pages:
+                    progress_bar.progress(min(page / num_pages, 1.0))
+                status_text.text(f"⏳ Scraping en cours... ({page}/{total_label} pages)")
+            
+            if incremental:
+                raw_path, rows_written = run_incremental_crawl(
+                    url, spec.name, num_pages, log_callback, page_callback=show_progress,
+                    backend=parser_backend
+                )
+                log_callback(f"💾 {rows_written} nouvelles annonces ajoutées à {raw_path}")
+                # Le résultat (et l'instantané) porte sur les annonces vues lors de ce scraping,
+                # pas sur le CSV brut qui cumule tous les scrapings
+                raw_path = crawl_path(raw_path)
+            elif stream_to_disk:
+                # Chaque page est ajoutée au CSV brut dès qu'elle est extraite et
+                # journalisée, pour pouvoir reprendre un scraping interrompu. Le CSV
+                # ne contient que ce scraping (réécrit au lancement, complété à la reprise)
+                raw_path, rows_written = run_checkpointed_crawl(
+                    url, spec.name, num_pages, log_callback, resume=resume, page_callback=show_progress,
+                    max_workers=max_workers, parse_workers=parse_workers, fetch_queue_size=fetch_queue_size,
+                    parse_queue_size=parse_queue_size, backend=parser_backend
+                )
+                log_callback(f"💾 {rows_written} annonces écrites dans {raw_path}")
+            else:
+                raw_path = None
+                pages = iter_category_pages(url, spec.name, num_pages, log_callback, max_workers,
+                                            parse_workers, fetch_queue_size, parse_queue_size, parser_backend)
+                data = []
+                for page, records in pages:
+                    data.extend(records)
+                    show_progress(page)
+            
+            category_name = spec.name
             
             progress_bar.progress(100)
-            status_text.text(f"✅ Scraping terminé! ({num_pages} pages)")
+            status_text.text(f"✅ Scraping terminé! ({num_pages or pages_done} pages)")
             
-            # Nettoyage optionnel
-            if clean_data:
-                with st.spinner("Nettoyage des données..."):
-                    df = clean_dataframe(df, category_name)
-                    st.success("✅ Données nettoyées!")
+            stats = connection_stats.snapshot()
+            log_callback(
+                f"🔌 Connexions: {stats['requests']} requêtes, {stats['new_connections']} nouvelles, "
+                f"{stats['reused_connections']} réutilisées (keep-alive), {stats['retries']} nouvelles tentatives, "
+                f"débit final {rate_limiter.rate:.1f} req/s"
+            )
             
-            # Stocker dans session state
-            st.session_state['scraped_data'] = df
-            st.session_state['category_name'] = category_name
-            st.session_state['is_cleaned'] = clean_data
+            # La session ne garde que les compteurs et un aperçu : les annonces
+            # restent dans le CSV (brut, ou nettoyé par morceaux si demandé)
+            with st.spinner("Nettoyage des données..." if clean_data else "Analyse des données..."):
+                if raw_path is not None:
+                    result = summarize_scrape(raw_path, category_name, clean=clean_data)
+                else:
+                    result = summarize_frame(pd.DataFrame(data), category_name, clean=clean_data)
+                    del data
+            if clean_data:
+                st.success("✅ Données nettoyées!")
+            keep_result(result)
             
-            st.success(f"🎉 Scraping terminé avec succès! {len(df)} articles récupérés.")
+            st.success(f"🎉 Scraping terminé avec succès! {result.rows} articles récupérés.")
             
         except Exception as e:
             st.error(f"❌ Erreur lors du scraping: {e}")
@@ -141,40 +442,46 @@ def show():
             status_text.empty()
     
     # Affichage des résultats
-    if 'scraped_data' in st.session_state:
+    if 'scrape_result' in st.session_state:
         st.markdown("---")
         st.markdown("### 📊 Résultats du scraping")
         
-        df = st.session_state['scraped_data']
-        category_name = st.session_state['category_name']
-        is_cleaned = st.session_state.get('is_cleaned', False)
+        result = st.session_state['scrape_result']
+        preview = result.preview
+        category_name = result.category
+        is_cleaned = result.cleaned
         
         # Statistiques
         col1, col2, col3, col4 = st.columns(4)
         
         with col1:
-            st.metric("📄 Lignes", len(df))
+            st.metric("📄 Lignes", result.rows)
         
         with col2:
-            st.metric("📋 Colonnes", len(df.columns))
+            st.metric("📋 Colonnes", len(result.columns))
         
         with col3:
-            missing = df.isnull().sum().sum()
-            st.metric("⚠️ Valeurs manquantes", missing)
+            st.metric("⚠️ Valeurs manquantes", result.missing)
         
         with col4:
-            duplicates = df.duplicated().sum()
-            st.metric("🔄 Doublons", duplicates)
+            st.metric("🔄 Doublons", result.duplicates)
         
         # Aperçu des données
         st.markdown("#### Aperçu des données")
-        st.dataframe(df.head(10), use_container_width=True)
+        st.dataframe(preview.head(10), use_container_width=True)
         
         # Informations sur les colonnes
         with st.expander("ℹ️ Informations sur les colonnes"):
-            st.write(df.dtypes)
-            if not df.empty and len(df.columns) > 0:
-                st.write(df.describe())
+            st.write(preview.dtypes)
+            if result.memory is not None:
+                report = result.memory
+                st.caption(f"💾 Mémoire : {report.loc['Total', 'Octets/ligne avant']:.0f} octets/ligne en texte, "
+                           f"{report.loc['Total', 'Octets/ligne après']:.0f} octets/ligne après typage")
+                st.dataframe(report, use_container_width=True)
+            if not preview.empty and len(preview.columns) > 0:
+                if len(preview) < result.rows:
+                    st.caption(f"Statistiques calculées sur les {len(preview)} premières lignes")
+                st.write(preview.describe())
             else:
                 st.warning("⚠️ Le DataFrame est vide, aucune statistique à afficher.")
         
@@ -182,15 +489,26 @@ def show():
         st.markdown("---")
         st.markdown("### 💾 Sauvegarder les données")
         
+        save_format = st.selectbox(
+            "Format de sauvegarde locale",
+            list(DATASET_FORMATS),
+            index=list(DATASET_FORMATS).index(DEFAULT_DATASET_FORMAT),
+            format_func=lambda fmt: {'parquet': "Parquet (colonnes compressées)",
+                                     'feather': "Feather / Arrow IPC (lecture la plus rapide)",
+                                     'csv': "CSV"}[fmt],
+            help="Parquet et Feather conservent les types et permettent de ne relire que certaines colonnes. "
+                 "Le téléchargement direct reste au format CSV."
+        )
+        
         col1, col2 = st.columns(2)
         
         with col1:
             # Téléchargement direct
             suffix = "_nettoyees" if is_cleaned else "_brutes"
-            csv = df.to_csv(index=False, encoding='utf-8-sig')
+            # Le CSV du résultat est servi tel quel, lu seulement au clic (si Streamlit le permet)
             st.download_button(
                 label="📥 Télécharger CSV",
-                data=csv,
+                data=file_download_data(result.path),
                 file_name=f"{category_name}{suffix}.csv",
                 mime="text/csv",
                 use_container_width=True
@@ -199,9 +517,17 @@ def show():
         with col2:
             # Sauvegarde locale
             if st.button("💾 Sauvegarder localement", use_container_width=True):
-                output_dir = Path("data_dakar_auto_brutes") if not is_cleaned else Path("data_dakar_auto")
-                output_dir.mkdir(exist_ok=True)
-                
-                filename = output_dir / f"{category_name}{suffix}.csv"
-                df.to_csv(filename, index=False, encoding='utf-8-sig')
+                output_dir = RAW_DATA_DIR if not is_cleaned else CLEAN_DATA_DIR
+                # Le CSV brut écrit pendant le scraping (<catégorie>_brutes.csv) porte
+                # le journal de reprise et l'index incrémental : il n'est jamais réécrit
+                stem = f"{category_name}{suffix}" if is_cleaned else f"{category_name}{suffix}_sauvegarde"
+                filename = dataset_path(output_dir, stem, save_format)
+                # Écriture et base SQLite en flux depuis le CSV du résultat, morceau par morceau
+                save_dataset_chunks(result.iter_chunks(), filename, result.columns)
                 st.success(f"✅ Données sauvegardées dans: {filename}")
+                
+                counts, snapshot = store_listings(result.iter_chunks(), category_name, is_cleaned)
+                st.info(f"🗄️ Base SQLite : {counts['inserted']} annonce(s) ajoutée(s), "
+                        f"{counts['updated']} mise(s) à jour")
+                st.info(f"📸 Instantané {snapshot['id']} : +{snapshot['added']} ajoutée(s), "
+                        f"-{snapshot['removed']} retirée(s), {snapshot['changed']} modifiée(s)")
@@ -0,0 +1,60 @@
+"""
+Fixtures communes : site simulé à partir des pages de benchmarks/fixtures/
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# Ajouter le dossier parent au path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.archive import html_archive
+from utils.http_cache import http_cache
+from utils.scraper import clear_page_counts
+
+
+FIXTURES_DIR = Path(__file__).parent.parent / "benchmarks" / "fixtures"
+BASE_URL = "https://dakar-auto.test/voitures"
+
+
+class FakeSite:
+    """
+    Pages servies à la place du réseau : `pages[n]` est le contenu de la
+    page n, toute autre page est vide. Les URLs demandées sont notées ;
+    `fail_at` fait échouer une page (comme une erreur réseau).
+    """
+
+    def __init__(self, pages):
+        self.pages = dict(pages)
+        self.requests = []
+        self.fail_at = set()
+        self.empty = (FIXTURES_DIR / "voitures_page_vide.html").read_bytes()
+
+    def fetch(self, url: str, *args, **kwargs) -> bytes:
+        self.requests.append(url)
+        page = int(url.rsplit('page=', 1)[1]) if 'page=' in url else 1
+        if page in self.fail_at:
+            raise ConnectionError(f"page {page} indisponible")
+        return self.pages.get(page, self.empty)
+
+
+@pytest.fixture
+def fake_site(tmp_path, monkeypatch):
+    """
+    Site de voitures simulé (pages de fixtures 1 à 3), dossier de travail
+    temporaire, sans cache HTTP ni archive HTML
+    """
+    monkeypatch.chdir(tmp_path)
+    site = FakeSite({
+        1: (FIXTURES_DIR / "voitures_page_1.html").read_bytes(),
+        2: (FIXTURES_DIR / "voitures_page_2_latin1.html").read_bytes(),
+        3: (FIXTURES_DIR / "voitures_page_412.html").read_bytes(),
+    })
+    monkeypatch.setattr(http_cache, 'fetch', site.fetch)
+    monkeypatch.setattr(html_archive, 'enabled', False)
+    clear_page_counts()
+    yield site
+    clear_page_counts()
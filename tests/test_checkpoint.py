@@ -0,0 +1,72 @@
+"""
+Reprise d'un scraping interrompu : ni annonce en double, ni annonce manquante
+"""
+
+import pandas as pd
+import pytest
+
+from conftest import BASE_URL
+from utils.checkpoint import journal_path, load_journal, run_checkpointed_crawl
+from utils.scraper import clear_page_counts
+
+
+class Interrupted(Exception):
+    pass
+
+
+def read_sorted(path):
+    """Lignes du CSV brut, dans un ordre indépendant de l'ordre d'écriture des pages"""
+    rows = pd.read_csv(path, encoding='utf-8-sig', dtype=str, keep_default_na=False)
+    return rows.sort_values(list(rows.columns), kind='stable').reset_index(drop=True)
+
+
+@pytest.fixture
+def expected(fake_site):
+    """Annonces d'un scraping des 3 pages sans interruption ; le CSV et le journal sont ensuite retirés"""
+    csv_path, written = run_checkpointed_crawl(BASE_URL, 'voitures', 3)
+    rows = read_sorted(csv_path)
+    assert written == len(rows) > 0
+    csv_path.unlink()
+    journal_path(csv_path).unlink()
+    fake_site.requests.clear()
+    clear_page_counts()
+    return rows
+
+
+def test_resume_after_crash(fake_site, expected):
+    def crash_after_page_2(page):
+        if page == 2:
+            raise Interrupted()
+
+    with pytest.raises(Interrupted):
+        run_checkpointed_crawl(BASE_URL, 'voitures', 3, page_callback=crash_after_page_2, max_workers=1)
+    journal = load_journal('voitures')
+    assert journal.is_resumable(BASE_URL)
+    assert journal.missing_pages() == [3]
+
+    # Arrêt brutal pendant l'écriture d'une page : ligne partielle après le dernier checkpoint
+    csv_path = journal.path.with_suffix('.csv')
+    with open(csv_path, 'a', encoding='utf-8') as f:
+        f.write('Toyota Corolla 2015,Toyota,20')
+
+    fake_site.requests.clear()
+    _, written = run_checkpointed_crawl(BASE_URL, 'voitures', resume=True)
+    assert fake_site.requests == [f"{BASE_URL}?page=3"]
+    rows = read_sorted(csv_path)
+    assert written == len(rows) - journal.total_rows
+    pd.testing.assert_frame_equal(rows, expected)
+    assert not load_journal('voitures').is_resumable(BASE_URL)
+
+
+def test_resume_fetches_only_failed_pages(fake_site, expected):
+    fake_site.fail_at = {2}
+    csv_path, _ = run_checkpointed_crawl(BASE_URL, 'voitures', 3)
+    journal = load_journal('voitures')
+    assert journal.missing_pages() == [2]
+    assert len(read_sorted(csv_path)) < len(expected)
+
+    fake_site.fail_at = set()
+    fake_site.requests.clear()
+    run_checkpointed_crawl(BASE_URL, 'voitures', resume=True)
+    assert fake_site.requests == [f"{BASE_URL}?page=2"]
+    pd.testing.assert_frame_equal(read_sorted(csv_path), expected)
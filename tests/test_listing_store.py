@@ -0,0 +1,109 @@
+"""
+Base SQLite des annonces : requêtes du dashboard et export CSV sur 100 000 annonces
+"""
+
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.aggregates import group_means, histogram_bins, top_counts
+from utils.filter_index import FilterIndex
+from utils.listing_store import ListingStore, store_columns
+from utils.schema import apply_schema, read_dataset
+
+
+ROWS = 100_000
+MARQUES = ['Toyota', 'Hyundai', 'Kia', 'Peugeot', 'Renault', 'Mercedes-Benz', 'Nissan', 'Ford', 'Honda', 'BMW']
+
+
+@pytest.fixture(scope='module')
+def listings():
+    """Annonces de voitures nettoyées générées (identités toutes différentes), avec des valeurs manquantes"""
+    rng = np.random.default_rng(0)
+    prices = rng.integers(500, 60_000, ROWS) * 1000.0
+    prices[rng.random(ROWS) < 0.05] = np.nan
+    kms = rng.integers(0, 400_000, ROWS).astype('float64')
+    kms[rng.random(ROWS) < 0.1] = np.nan
+    marques = rng.choice(MARQUES, ROWS)
+    df = pd.DataFrame({
+        'titre': [f"{marque} {i}" for i, marque in enumerate(marques)],
+        'marque': marques,
+        'année': rng.integers(1995, 2025, ROWS),
+        'prix': [f"{price:,.0f} F CFA" if price == price else "Prix sur demande" for price in prices],
+        'kilométrage': [f"{km:,.0f} km" if km == km else "" for km in kms],
+        'transmission': rng.choice(['Automatique', 'Manuelle'], ROWS),
+        'carburant': rng.choice(['Essence', 'Diesel', 'Hybride'], ROWS),
+        'adresse': rng.choice(['Dakar', 'Thiès', 'Mbour', 'Rufisque Dakar'], ROWS),
+        'prix_numerique': prices,
+        'km_numerique': kms,
+    })
+    return apply_schema(df)
+
+
+@pytest.fixture(scope='module')
+def store(listings, tmp_path_factory):
+    store = ListingStore(tmp_path_factory.mktemp("base") / "annonces.sqlite")
+    assert store.insert('voitures', listings) == {'inserted': ROWS, 'updated': 0}
+    return store
+
+
+def read_dataset_like(listings):
+    """Annonces telles qu'elles reviennent d'un CSV (les textes vides deviennent des valeurs manquantes)"""
+    return read_dataset(io.StringIO(listings[list(store_columns('voitures'))].to_csv(index=False)))
+
+
+def test_aggregates_match_pandas(store, listings):
+    assert store.count('voitures') == ROWS
+    means = store.means('voitures', ['prix_numerique', 'km_numerique'])
+    assert means['prix_numerique'] == pytest.approx(listings['prix_numerique'].mean())
+    assert means['km_numerique'] == pytest.approx(listings['km_numerique'].mean())
+
+    assert store.top_counts('voitures', 'marque').to_dict() == top_counts(listings['marque']).to_dict()
+    assert store.top_counts('voitures', 'carburant', n=2).tolist() == top_counts(listings['carburant'], 2).tolist()
+
+    expected = group_means(listings, 'marque', 'prix_numerique')
+    actual = store.group_means('voitures', 'marque', 'prix_numerique')
+    assert list(actual.index) == list(expected.index)
+    np.testing.assert_allclose(actual.to_numpy(), expected.to_numpy())
+
+    pd.testing.assert_frame_equal(store.histogram_bins('voitures', 'prix_numerique'),
+                                  histogram_bins(listings['prix_numerique']))
+
+
+def test_filters_match_filter_index(store, listings):
+    index = FilterIndex(listings)
+    categories = {'marque': ['Toyota', 'Kia'], 'carburant': ['Diesel']}
+    ranges = {'prix_numerique': (5_000_000, 20_000_000), 'année': (2010, 2020)}
+    positions = index.select(categories, ranges)
+    assert store.count('voitures', categories, ranges) == len(positions)
+
+    expected = group_means(listings.iloc[positions], 'marque', 'prix_numerique')
+    actual = store.group_means('voitures', 'marque', 'prix_numerique', categories, ranges)
+    np.testing.assert_allclose(actual.to_numpy(), expected.to_numpy())
+    assert list(actual.index) == list(expected.index)
+
+    # Page triée : valeurs manquantes en dernier, puis ordre d'insertion
+    page = store.page('voitures', categories, ranges, sort_column='prix_numerique', ascending=False,
+                      start=50, size=50)
+    selected = listings.iloc[positions]
+    order = selected['prix_numerique'].astype('float64').sort_values(ascending=False, kind='stable',
+                                                                     na_position='last')
+    assert page['titre'].tolist() == selected.loc[order.index[50:100], 'titre'].tolist()
+
+
+def test_export_is_streamed_to_a_file(store, listings, tmp_path, monkeypatch):
+    # Plusieurs morceaux, dont un incomplet : l'en-tête n'est écrit qu'une fois
+    monkeypatch.setattr('utils.listing_store.EXPORT_CHUNK_ROWS', 30_000)
+    path = tmp_path / "voitures_base.csv"
+    assert store.export_csv('voitures', path) == ROWS
+    assert not path.with_name(path.name + '.tmp').exists()
+    exported = read_dataset(path)
+    assert list(exported.columns) == list(store_columns('voitures'))
+    pd.testing.assert_frame_equal(exported, read_dataset_like(listings), check_dtype=False,
+                                  check_categorical=False)
+
+    # Table vide : seulement l'en-tête
+    assert store.export_csv('motos', tmp_path / "motos_base.csv") == 0
+    assert list(read_dataset(tmp_path / "motos_base.csv").columns) == list(store_columns('motos'))
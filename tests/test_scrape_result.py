@@ -0,0 +1,64 @@
+"""
+Résultat d'un scraping en session : compteurs, aperçu borné, sauvegarde en flux
+"""
+
+import io
+
+import pandas as pd
+import pytest
+
+from conftest import FIXTURES_DIR
+from utils.schema import read_dataset
+from utils.scrape_result import summarize_scrape
+from utils.scraper import clean_dataframe, parse_listing_page
+from utils.storage import load_dataset, save_dataset_chunks
+
+
+@pytest.fixture
+def raw_csv(tmp_path):
+    """CSV brut des pages de voitures, écrit comme pendant un scraping"""
+    records = []
+    for path in sorted(FIXTURES_DIR.glob("voitures_page_*.html")):
+        records.extend(parse_listing_page(path.read_bytes(), 'voitures')[0])
+    raw = pd.DataFrame(records)
+    path = tmp_path / "voitures_brutes.csv"
+    raw.to_csv(path, index=False, encoding='utf-8-sig')
+    return path, raw
+
+
+def test_session_keeps_counts_and_bounded_preview(raw_csv, monkeypatch):
+    path, raw = raw_csv
+    monkeypatch.setattr('utils.scrape_result.PREVIEW_ROWS', 4)
+    result = summarize_scrape(path, 'voitures', chunk_rows=3)
+    assert result.rows == len(raw)
+    assert len(result.preview) == 4
+    assert result.duplicates == raw.duplicated().sum()
+    assert result.path == path and not result.scratch
+
+    result.discard()
+    assert path.exists()
+
+
+@pytest.mark.parametrize('suffix', ['.parquet', '.feather', '.csv'])
+def test_cleaned_result_is_saved_chunk_by_chunk(raw_csv, tmp_path, suffix):
+    path, raw = raw_csv
+    result = summarize_scrape(path, 'voitures', clean=True, chunk_rows=5)
+    cleaned = clean_dataframe(raw, 'voitures')
+    assert result.rows == len(cleaned)
+    assert result.missing == cleaned.isnull().sum().sum()
+
+    # Les morceaux nettoyés passent par un CSV : les textes vides y deviennent des valeurs manquantes
+    expected = read_dataset(io.StringIO(cleaned.to_csv(index=False)))
+
+    output = tmp_path / f"voitures_nettoyees{suffix}"
+    assert save_dataset_chunks(result.iter_chunks(chunk_rows=5), output, result.columns) == len(expected)
+    pd.testing.assert_frame_equal(load_dataset(output), expected, check_dtype=False, check_categorical=False)
+
+    result.discard()
+    assert not result.path.exists()
+
+
+def test_empty_save_keeps_columns(tmp_path):
+    output = tmp_path / "vide.parquet"
+    assert save_dataset_chunks([], output, ['titre', 'prix']) == 0
+    assert list(load_dataset(output).columns) == ['titre', 'prix']
@@ -0,0 +1,86 @@
+"""
+Scraping incrémental : requêtes d'un site inchangé, identité des annonces
+"""
+
+import pandas as pd
+
+from conftest import BASE_URL
+from utils.listing_store import identity_columns, listing_identities
+from utils.scraper import clean_dataframe
+from utils.seen_index import crawl_path, load_seen_index, run_incremental_crawl
+from utils.snapshots import SnapshotStore
+
+
+def read_raw(path):
+    return pd.read_csv(path, encoding='utf-8-sig', dtype=str, keep_default_na=False)
+
+
+def test_unchanged_site_costs_one_request(fake_site):
+    csv_path, written = run_incremental_crawl(BASE_URL, 'voitures')
+    rows = read_raw(csv_path)
+    assert written == len(rows) > 0
+    # Pages 1 à 3, puis la page 4 vide arrête le crawl
+    assert len(fake_site.requests) == 4
+    assert len(read_raw(crawl_path(csv_path))) == len(rows)
+
+    fake_site.requests.clear()
+    _, written = run_incremental_crawl(BASE_URL, 'voitures')
+    assert written == 0
+    assert fake_site.requests == [BASE_URL]
+    assert len(read_raw(csv_path)) == len(rows)
+    # La page 1, entièrement connue, a tout de même été vue lors de ce scraping
+    assert 0 < len(read_raw(crawl_path(csv_path))) < len(rows)
+
+
+def test_new_listings_are_appended_once(fake_site):
+    first_page = fake_site.pages[1]
+    fake_site.pages = {1: fake_site.pages[2]}
+    csv_path, _ = run_incremental_crawl(BASE_URL, 'voitures')
+    known = len(read_raw(csv_path))
+
+    # De nouvelles annonces arrivent en tête ; l'ancienne page 1 devient la page 2
+    fake_site.pages = {1: first_page, 2: fake_site.pages[1]}
+    fake_site.requests.clear()
+    _, written = run_incremental_crawl(BASE_URL, 'voitures')
+    rows = read_raw(csv_path)
+    assert len(fake_site.requests) == 2
+    assert len(rows) == known + written
+    assert not rows.duplicated().any()
+
+
+def test_price_change_is_not_a_new_listing(fake_site):
+    run_incremental_crawl(BASE_URL, 'voitures', max_pages=1)
+    fake_site.pages[1] = fake_site.pages[1].replace(b"27 900 000 F CFA", b"25 000 000 F CFA")
+    fake_site.requests.clear()
+    _, written = run_incremental_crawl(BASE_URL, 'voitures', max_pages=1)
+    assert written == 0
+
+    index = load_seen_index('voitures')
+    assert not index.take_new([{'titre': 'Mercedes-Benz 208 2010', 'marque': 'Mercedes-Benz', 'année': '2010',
+                                'prix': '1 F CFA', 'kilométrage': '', 'transmission': '', 'carburant': '',
+                                'adresse': 'Rufisque Dakar'}])
+
+
+def test_snapshot_covers_listings_seen_in_this_crawl(fake_site, tmp_path):
+    history = SnapshotStore(tmp_path / "historique")
+    pages = fake_site.pages
+    fake_site.pages = {1: pages[1], 2: pages[2]}
+    csv_path, _ = run_incremental_crawl(BASE_URL, 'voitures')
+    first_seen = clean_dataframe(read_raw(crawl_path(csv_path)), 'voitures')
+    first = history.save('voitures', first_seen)
+
+    # Nouvelles annonces en tête ; les annonces de l'ancienne page 2 ont disparu du site
+    fake_site.pages = {1: pages[3], 2: pages[1]}
+    fake_site.requests.clear()
+    _, written = run_incremental_crawl(BASE_URL, 'voitures')
+    seen = clean_dataframe(read_raw(crawl_path(csv_path)), 'voitures')
+    assert len(fake_site.requests) == 2
+    assert len(seen) > written > 0
+
+    second = history.save('voitures', seen)
+    identities = {name: set(listing_identities(df, identity_columns('voitures')))
+                  for name, df in (('first', first_seen), ('second', seen))}
+    assert second['added'] == len(identities['second'] - identities['first']) > 0
+    assert second['removed'] == len(identities['first'] - identities['second']) > 0
+    assert second['rows'] == len(identities['second']) < len(read_raw(csv_path))
+    assert first['rows'] == len(identities['first'])
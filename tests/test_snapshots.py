@@ -0,0 +1,89 @@
+"""
+Historique des scrapings : aller-retour save / load / compare sur plusieurs deltas et un instantané complet
+"""
+
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+from conftest import FIXTURES_DIR
+from utils.listing_store import identity_columns, listing_identities, store_columns
+from utils.schema import apply_schema
+from utils.scraper import clean_dataframe, parse_listing_page
+from utils.snapshots import SnapshotStore
+
+
+COLUMNS = list(store_columns('voitures'))
+
+
+@pytest.fixture
+def listings():
+    """Annonces de voitures nettoyées des pages de fixtures, sans doublon d'identité"""
+    records = []
+    for path in sorted(FIXTURES_DIR.glob("voitures_page_*.html")):
+        records.extend(parse_listing_page(path.read_bytes(), 'voitures')[0])
+    df = clean_dataframe(pd.DataFrame(records), 'voitures')
+    identities = listing_identities(df, identity_columns('voitures'))
+    return df[~pd.Series(identities).duplicated().to_numpy()].reset_index(drop=True)
+
+
+def reprice(df, rows, delta=100_000):
+    """Change le prix de quelques annonces (même identité, ligne modifiée)"""
+    df = df.copy()
+    df['prix_numerique'] = df['prix_numerique'].astype('Float64')
+    df.loc[rows, 'prix_numerique'] = df.loc[rows, 'prix_numerique'].fillna(0) + delta
+    # Types compacts, comme après un nettoyage
+    return apply_schema(df)
+
+
+def by_identity(df):
+    identities = listing_identities(df, identity_columns('voitures'))
+    return df[COLUMNS].set_axis(pd.Index(identities, name='identity')).sort_index()
+
+
+def assert_same_state(actual, expected):
+    pd.testing.assert_frame_equal(actual[COLUMNS].sort_index().astype(str),
+                                  by_identity(expected).astype(str), check_index_type=False)
+
+
+def test_round_trip_over_deltas_and_keyframe(tmp_path, listings):
+    history = SnapshotStore(tmp_path / "historique", keyframe_interval=3)
+    states = [
+        listings.iloc[:30],
+        # Ajouts et changements de prix
+        reprice(pd.concat([listings.iloc[:30], listings.iloc[30:35]]), [0, 1]),
+    ]
+    # Retraits
+    states.append(states[-1].drop(index=[2, 3, 4]))
+    # Ajouts, retraits et changements : instantané complet (keyframe_interval=3)
+    states.append(reprice(pd.concat([states[-1].drop(index=[5]), listings.iloc[35:38]]), [6]))
+    # Delta après l'instantané complet
+    states.append(reprice(states[-1].drop(index=[7, 8]), [0], delta=-50_000))
+
+    start = datetime(2026, 1, 1)
+    entries = [history.save('voitures', state, taken_at=start + timedelta(days=day))
+               for day, state in enumerate(states)]
+    assert [entry['kind'] for entry in entries] == ['full', 'delta', 'delta', 'full', 'delta']
+    assert [entry['rows'] for entry in entries] == [len(state) for state in states]
+    assert [(entry['added'], entry['removed'], entry['changed']) for entry in entries[1:]] == \
+        [(5, 0, 2), (0, 3, 0), (3, 1, 1), (0, 2, 1)]
+
+    # Chaque état est reconstruit à l'identique en rejouant les deltas
+    for entry, state in zip(entries, states):
+        assert_same_state(history.load('voitures', entry['id']), state)
+
+    # Comparaison entre instantanés non consécutifs, de part et d'autre de l'instantané complet
+    diff = history.compare('voitures', entries[0]['id'], entries[4]['id'])
+    old, new = by_identity(states[0]), by_identity(states[4])
+    assert set(diff.added.index) == set(new.index) - set(old.index)
+    assert set(diff.removed.index) == set(old.index) - set(new.index)
+    # Annonces 0, 1 et 6 : prix changé entre-temps (l'annonce 0 deux fois)
+    assert set(diff.changed.index) == set(by_identity(listings.loc[[0, 1, 6]]).index)
+    assert (diff.changed['prix_numerique'].astype(float) !=
+            diff.changed['prix_numerique_avant'].astype(float)).all()
+
+    # Lecture partielle : colonnes et annonces demandées seulement
+    subset = list(new.index[:4])
+    partial = history.load('voitures', entries[4]['id'], columns=['marque'], identities=subset)
+    assert list(partial.columns) == ['marque'] and set(partial.index) == set(subset)
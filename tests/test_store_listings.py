@@ -0,0 +1,66 @@
+"""
+Sauvegarde d'un scraping brut : nettoyage, base SQLite et historique.
+
+Usage : python -m pytest tests
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+# Ajouter le dossier parent au path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.scraping import store_listings
+from utils.listing_store import ListingStore, store_columns
+from utils.schema import apply_schema
+from utils.scraper import clean_dataframe, parse_listing_page
+from utils.snapshots import SnapshotStore
+
+
+FIXTURES_DIR = Path(__file__).parent.parent / "benchmarks" / "fixtures"
+
+
+def scrape_raw(category: str) -> pd.DataFrame:
+    """Annonces brutes des pages de fixtures, comme après un scraping sans nettoyage"""
+    records = []
+    for path in sorted(FIXTURES_DIR.glob(f"{category}_page_*.html")):
+        records.extend(parse_listing_page(path.read_bytes(), category)[0])
+    return pd.DataFrame(records)
+
+
+@pytest.mark.parametrize('category', ['voitures', 'motos', 'locations'])
+def test_raw_scrape_is_saved_and_read_back(tmp_path, category):
+    raw = scrape_raw(category)
+    assert len(raw)
+    store = ListingStore(tmp_path / "annonces.sqlite")
+    history = SnapshotStore(tmp_path / "historique")
+
+    counts, snapshot = store_listings([raw], category, is_cleaned=False, store=store, history=history)
+
+    expected = clean_dataframe(raw, category)
+    columns = list(store_columns(category))
+    assert counts == {'inserted': len(expected), 'updated': 0}
+    assert snapshot['rows'] == len(expected)
+    assert store.count(category) == len(expected)
+    stored = store.page(category, size=len(expected) + 1)
+    pd.testing.assert_frame_equal(stored, apply_schema(expected[columns].reset_index(drop=True)),
+                                  check_dtype=False, check_categorical=False)
+
+    # Une deuxième sauvegarde identique ne change rien, même lue en plusieurs morceaux
+    chunks = [raw.iloc[:5], raw.iloc[5:]]
+    counts, snapshot = store_listings(chunks, category, is_cleaned=False, store=store, history=history)
+    assert counts == {'inserted': 0, 'updated': len(expected)}
+    assert (snapshot['added'], snapshot['removed'], snapshot['changed']) == (0, 0, 0)
+    assert len(history.load(category, snapshot['id'])) == len(expected)
+
+
+def test_cleaned_scrape_is_stored_as_is(tmp_path):
+    cleaned = clean_dataframe(scrape_raw('voitures'), 'voitures')
+    store = ListingStore(tmp_path / "annonces.sqlite")
+    counts, _ = store_listings([cleaned], 'voitures', is_cleaned=True, store=store,
+                               history=SnapshotStore(tmp_path / "historique"))
+    assert counts['inserted'] == store.count('voitures') == len(cleaned)
@@ -0,0 +1,35 @@
+"""
+Agrégats calculés côté serveur pour les graphiques du dashboard
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def histogram_bins(values: pd.Series, nbins: int = 30) -> pd.DataFrame:
+    """
+    Histogramme à classes de même largeur (NumPy) : début, fin, centre et
+    effectif de chaque classe. Les valeurs manquantes sont ignorées.
+    """
+    present = pd.to_numeric(values, errors='coerce').dropna().to_numpy(dtype='float64')
+    if not len(present):
+        return pd.DataFrame(columns=['début', 'fin', 'centre', 'effectif'])
+    counts, edges = np.histogram(present, bins=nbins)
+    return pd.DataFrame({
+        'début': edges[:-1],
+        'fin': edges[1:],
+        'centre': (edges[:-1] + edges[1:]) / 2,
+        'effectif': counts,
+    })
+
+
+def top_counts(values: pd.Series, n: int = None) -> pd.Series:
+    """Effectifs des valeurs les plus fréquentes (catégories absentes exclues)"""
+    counts = values.value_counts()
+    counts = counts[counts > 0]
+    return counts.head(n) if n is not None else counts
+
+
+def group_means(df: pd.DataFrame, by: str, column: str) -> pd.Series:
+    """Moyenne d'une colonne par groupe, triée par ordre décroissant"""
+    return df.groupby(by, observed=True)[column].mean().sort_values(ascending=False)
@@ -0,0 +1,206 @@
+"""
+Archive compressée des pages HTML téléchargées (segments en ajout seul)
+"""
+
+import gzip
+import hashlib
+import json
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from utils.specs import CATEGORY_SPECS
+
+
+# Paramètres par défaut de l'archive
+DEFAULT_ARCHIVE_DIR = Path(".html_archive")
+DEFAULT_SEGMENT_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+DEFAULT_MAX_AGE_DAYS = 90
+
+PAGE_PARAM_PATTERN = re.compile(r'[?&]page=(\d+)')
+
+
+def page_number(url: str) -> int:
+    """Numéro de page d'une URL de liste (1 sans paramètre page=)"""
+    matches = PAGE_PARAM_PATTERN.findall(url)
+    return int(matches[-1]) if matches else 1
+
+
+class HtmlArchive:
+    """
+    Archive des pages brutes, inspirée du format WARC.
+    Chaque page est ajoutée à un segment `segment-<horodatage>.html.gz` sous
+    forme d'un membre gzip indépendant (en-tête JSON + corps). Un index
+    `.idx` (JSON Lines) par segment donne l'URL, la date de téléchargement,
+    la position et la longueur de chaque membre. Une page identique au
+    dernier instantané de la même URL n'est pas ré-archivée. La rétention
+    supprime les segments les plus anciens (taille totale, âge maximal).
+    """
+
+    def __init__(self, archive_dir: Path = DEFAULT_ARCHIVE_DIR, segment_bytes: int = DEFAULT_SEGMENT_BYTES,
+                 max_bytes: int = DEFAULT_MAX_BYTES, max_age_days: float = DEFAULT_MAX_AGE_DAYS,
+                 enabled: bool = True):
+        self.archive_dir = Path(archive_dir)
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._entries: Optional[List[Dict]] = None  # instantanés, du plus ancien au plus récent
+        self._last_digest: Dict[str, str] = {}
+        self._segment: Optional[Path] = None
+
+    # -- Index -----------------------------------------------------------------
+
+    @staticmethod
+    def _index_path(segment: Path) -> Path:
+        return segment.with_suffix('.idx')
+
+    def _segments(self) -> List[Path]:
+        return sorted(self.archive_dir.glob("segment-*.html.gz"))
+
+    def _load_index(self):
+        if self._entries is not None:
+            return
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        entries = []
+        for segment in self._segments():
+            index_path = self._index_path(segment)
+            if not index_path.exists():
+                continue
+            with open(index_path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    entry['segment'] = segment.name
+                    entries.append(entry)
+        entries.sort(key=lambda entry: entry['fetched_at'])
+        self._entries = entries
+        self._last_digest = {entry['url']: entry['sha1'] for entry in entries}
+        self._apply_retention()
+
+    def _current_segment(self) -> Path:
+        """Segment ouvert en écriture, renouvelé au-delà de segment_bytes"""
+        if self._segment is None or (self._segment.exists()
+                                     and self._segment.stat().st_size >= self.segment_bytes):
+            self._segment = self.archive_dir / f"segment-{time.time_ns()}.html.gz"
+            self._apply_retention()
+        return self._segment
+
+    def _apply_retention(self):
+        """Supprime les segments les plus anciens (hors segment courant) hors limites"""
+        oldest_allowed = time.time() - self.max_age_days * 86400
+        segments = [segment for segment in self._segments() if segment != self._segment]
+        total = sum(segment.stat().st_size for segment in segments)
+        newest = {}
+        for entry in self._entries:
+            newest[entry['segment']] = max(newest.get(entry['segment'], 0), entry['fetched_at'])
+        removed = set()
+        for segment in segments:
+            if total <= self.max_bytes and newest.get(segment.name, 0) >= oldest_allowed:
+                break
+            total -= segment.stat().st_size
+            segment.unlink()
+            self._index_path(segment).unlink(missing_ok=True)
+            removed.add(segment.name)
+        if removed:
+            self._entries = [entry for entry in self._entries if entry['segment'] not in removed]
+            self._last_digest = {entry['url']: entry['sha1'] for entry in self._entries}
+
+    # -- Écriture / lecture ------------------------------------------------------
+
+    def add(self, url: str, content: bytes, fetched_at: Optional[float] = None):
+        """Archive une page (ignorée si identique au dernier instantané de l'URL)"""
+        if not self.enabled or content is None:
+            return
+        digest = hashlib.sha1(content).hexdigest()
+        fetched_at = fetched_at if fetched_at is not None else time.time()
+        with self._lock:
+            self._load_index()
+            if self._last_digest.get(url) == digest:
+                return
+        # Compression hors du verrou : il ne protège que l'ajout au segment et à l'index
+        header = json.dumps({'url': url, 'fetched_at': fetched_at, 'length': len(content)})
+        member = gzip.compress(header.encode('utf-8') + b'\n' + content)
+        with self._lock:
+            if self._last_digest.get(url) == digest:
+                return
+            segment = self._current_segment()
+            with open(segment, 'ab') as f:
+                offset = f.tell()
+                f.write(member)
+            entry = {'url': url, 'fetched_at': fetched_at, 'offset': offset, 'length': len(member),
+                     'sha1': digest}
+            with open(self._index_path(segment), 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + '\n')
+            entry['segment'] = segment.name
+            self._entries.append(entry)
+            self._last_digest[url] = digest
+
+    def read(self, entry: Dict) -> Optional[bytes]:
+        """Corps archivé d'un instantané de l'index"""
+        try:
+            with open(self.archive_dir / entry['segment'], 'rb') as f:
+                f.seek(entry['offset'])
+                member = f.read(entry['length'])
+        except OSError:
+            return None
+        _, _, body = gzip.decompress(member).partition(b'\n')
+        return body
+
+    def snapshots(self, category: str, as_of: Optional[float] = None) -> Dict[int, Dict]:
+        """
+        Dernier instantané de chaque page de liste d'une catégorie,
+        téléchargé au plus tard à la date `as_of` (par numéro de page).
+        """
+        base_url = CATEGORY_SPECS[category].url
+        with self._lock:
+            self._load_index()
+            entries = list(self._entries)
+        latest = {}
+        for entry in entries:
+            url = entry['url']
+            if url != base_url and not url.startswith(base_url + '?'):
+                continue
+            if as_of is not None and entry['fetched_at'] > as_of:
+                continue
+            latest[page_number(url)] = entry
+        return latest
+
+    def page_reader(self, category: str, as_of: Optional[float] = None) -> Callable[[str], Optional[bytes]]:
+        """Fonction URL -> corps archivé, utilisable à la place du téléchargement"""
+        snapshots = self.snapshots(category, as_of)
+
+        def read_page(url: str) -> Optional[bytes]:
+            entry = snapshots.get(page_number(url))
+            return self.read(entry) if entry is not None else None
+
+        return read_page
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            self._load_index()
+            segments = self._segments()
+            return {
+                'segments': len(segments),
+                'snapshots': len(self._entries),
+                'urls': len(self._last_digest),
+                'size_bytes': sum(segment.stat().st_size for segment in segments),
+                'oldest': self._entries[0]['fetched_at'] if self._entries else None,
+            }
+
+    def clear(self):
+        with self._lock:
+            for segment in self._segments():
+                segment.unlink()
+                self._index_path(segment).unlink(missing_ok=True)
+            self._entries, self._last_digest, self._segment = [], {}, None
+
+
+# Archive globale : chaque page téléchargée par le scraper y est ajoutée
+html_archive = HtmlArchive()
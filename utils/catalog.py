@@ -0,0 +1,126 @@
+"""
+Catalogue des jeux de données d'un dossier (métadonnées et aperçus en cache)
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+import pandas as pd
+
+from utils.storage import dataset_num_rows, load_dataset
+
+
+CATALOG_FILE_NAME = ".catalog.json"
+PREVIEW_ROWS = 5
+
+
+def describe_dataset(path: Path) -> Dict:
+    """Métadonnées d'un fichier : lignes, colonnes, types, taille et aperçu"""
+    path = Path(path)
+    stat = path.stat()
+    preview = load_dataset(path, nrows=PREVIEW_ROWS)
+    return {
+        'mtime_ns': stat.st_mtime_ns,
+        'size': stat.st_size,
+        'rows': dataset_num_rows(path),
+        'columns': list(preview.columns),
+        'dtypes': [str(dtype) for dtype in preview.dtypes],
+        'preview': json.loads(preview.to_json(orient='split', index=False, force_ascii=False)),
+    }
+
+
+def preview_frame(entry: Dict) -> pd.DataFrame:
+    """Aperçu d'une entrée du catalogue sous forme de DataFrame"""
+    return pd.DataFrame(entry['preview']['data'], columns=entry['preview']['columns'])
+
+
+class DatasetCatalog:
+    """
+    Catalogue d'un dossier, enregistré dans `<dossier>/.catalog.json`.
+    Chaque fichier y est décrit (lignes, colonnes, types, taille, aperçu)
+    avec sa date de modification et sa taille : il n'est relu que s'il a
+    changé depuis, et les fichiers disparus sont retirés du catalogue.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.path = self.directory / CATALOG_FILE_NAME
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[str, Dict]] = None
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        try:
+            self._entries = json.loads(self.path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            self._entries = {}
+
+    def _save(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        tmp_path.write_text(json.dumps(self._entries, ensure_ascii=False), encoding='utf-8')
+        os.replace(tmp_path, self.path)
+
+    def refresh(self, files: Iterable[Path]) -> Dict[str, Dict]:
+        """
+        Entrées des fichiers donnés (par nom), mises à jour pour ceux qui ont
+        changé. Un fichier illisible a une entrée avec une clé 'error'.
+        """
+        files = [Path(path) for path in files]
+        with self._lock:
+            self._load()
+            changed = False
+            for name in [name for name in self._entries if not (self.directory / name).exists()]:
+                del self._entries[name]
+                changed = True
+            for path in files:
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                entry = self._entries.get(path.name)
+                if entry is not None and (entry['mtime_ns'], entry['size']) == (stat.st_mtime_ns, stat.st_size):
+                    continue
+                try:
+                    self._entries[path.name] = describe_dataset(path)
+                except Exception as e:
+                    self._entries[path.name] = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size,
+                                                'error': str(e)}
+                changed = True
+            if changed:
+                self._save()
+            return {path.name: dict(self._entries[path.name]) for path in files if path.name in self._entries}
+
+    def non_null_counts(self, path: Path) -> Dict[str, int]:
+        """
+        Valeurs non nulles par colonne. Le calcul lit tout le fichier : il
+        n'est fait qu'à la demande, une fois par version du fichier.
+        """
+        path = Path(path)
+        entry = self.refresh([path]).get(path.name, {})
+        if 'non_null' in entry:
+            return entry['non_null']
+        counts = {column: int(count) for column, count in load_dataset(path).count().items()}
+        with self._lock:
+            current = self._entries.get(path.name)
+            if current is not None and current['mtime_ns'] == entry.get('mtime_ns'):
+                current['non_null'] = counts
+                self._save()
+        return counts
+
+
+_catalogs: Dict[Path, DatasetCatalog] = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_catalog(directory: Path) -> DatasetCatalog:
+    """Catalogue partagé d'un dossier (une instance par dossier et par processus)"""
+    directory = Path(directory).resolve()
+    with _catalogs_lock:
+        if directory not in _catalogs:
+            _catalogs[directory] = DatasetCatalog(directory)
+        return _catalogs[directory]
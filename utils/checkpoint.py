@@ -0,0 +1,152 @@
+"""
+Journal de reprise des crawls (checkpoints)
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from utils.scraper import DEFAULT_PARSER_BACKEND, get_total_pages, iter_category_pages
+from utils.specs import CATEGORY_SPECS
+from utils.storage import CsvSink, raw_data_path
+
+
+def journal_path(csv_path: Path) -> Path:
+    """Chemin du journal associé à un CSV brut"""
+    return Path(csv_path).with_suffix('.journal')
+
+
+class CrawlJournal:
+    """
+    Journal JSON Lines d'un crawl écrit en flux dans un CSV.
+    La première ligne décrit le crawl (URL, nombre de pages). Chaque page
+    terminée ajoute une ligne avec son décalage en lignes et la taille du CSV
+    après écriture ; la fin des annonces est notée par une ligne 'end'.
+    Une ligne tronquée par un arrêt brutal est ignorée à la relecture.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.header: Optional[Dict] = None
+        self.completed: Dict[int, Dict] = {}
+        self.end_page: Optional[int] = None
+        self.total_rows = 0
+        self.byte_end = 0
+
+    def _append(self, entry: Dict):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def load(self) -> bool:
+        """Relit le journal ; retourne False s'il est absent ou illisible"""
+        self.header, self.completed, self.end_page = None, {}, None
+        self.total_rows, self.byte_end = 0, 0
+        if not self.path.exists():
+            return False
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                kind = entry.get('type')
+                if kind == 'header':
+                    self.header = entry
+                elif kind == 'page':
+                    self.completed[entry['page']] = entry
+                    self.total_rows = entry['row_offset'] + entry['rows']
+                    self.byte_end = entry['byte_end']
+                elif kind == 'end':
+                    self.end_page = entry['page']
+        return self.header is not None
+
+    def start(self, base_url: str, category: str, max_pages: int):
+        """Démarre un nouveau journal (l'éventuel précédent est remplacé)"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.unlink(missing_ok=True)
+        self.header = {'type': 'header', 'base_url': base_url, 'category': category,
+                       'max_pages': max_pages, 'started_at': time.time()}
+        self.completed, self.end_page = {}, None
+        self.total_rows, self.byte_end = 0, 0
+        self._append(self.header)
+
+    def record_page(self, page: int, rows: int, byte_end: int):
+        entry = {'type': 'page', 'page': page, 'row_offset': self.total_rows, 'rows': rows,
+                 'byte_end': byte_end}
+        self._append(entry)
+        self.completed[page] = entry
+        self.total_rows += rows
+        self.byte_end = byte_end
+
+    def record_end(self, page: int):
+        self._append({'type': 'end', 'page': page})
+        self.end_page = page
+
+    def missing_pages(self) -> List[int]:
+        """Pages restant à scraper (avant la fin des annonces si elle est connue)"""
+        if self.header is None:
+            return []
+        last = self.header['max_pages'] if self.end_page is None else self.end_page - 1
+        return [page for page in range(1, last + 1) if page not in self.completed]
+
+    def is_resumable(self, base_url: str) -> bool:
+        return self.header is not None and self.header['base_url'] == base_url and bool(self.missing_pages())
+
+
+def load_journal(category: str) -> Optional[CrawlJournal]:
+    """Journal du dernier crawl en flux de la catégorie, s'il existe"""
+    journal = CrawlJournal(journal_path(raw_data_path(category)))
+    return journal if journal.load() else None
+
+
+def _truncate(path: Path, size: int):
+    """Retire du CSV les lignes écrites après le dernier checkpoint"""
+    if path.exists() and path.stat().st_size > size:
+        with open(path, 'r+b') as f:
+            f.truncate(size)
+
+
+def run_checkpointed_crawl(base_url: str, category: str, max_pages: int = None, progress_callback=None,
+                           resume: bool = False, page_callback: Optional[Callable[[int], None]] = None,
+                           **crawl_options) -> Tuple[Path, int]:
+    """
+    Scrape une catégorie en écrivant chaque page dans le CSV brut et en
+    journalisant les pages terminées. Avec resume=True, seules les pages
+    absentes du journal sont scrapées et ajoutées au CSV existant.
+    Retourne le chemin du CSV et le nombre d'annonces écrites par ce crawl.
+    """
+    spec = CATEGORY_SPECS[category]
+    csv_path = raw_data_path(category)
+    journal = CrawlJournal(journal_path(csv_path))
+    page_numbers = None
+    append = False
+
+    if resume and journal.load() and journal.is_resumable(base_url):
+        # Les lignes écrites après le dernier checkpoint seront re-scrapées
+        _truncate(csv_path, journal.byte_end)
+        page_numbers = journal.missing_pages()
+        max_pages = journal.header['max_pages']
+        append = True
+        if progress_callback:
+            progress_callback(f"♻️ Reprise: {len(journal.completed)} pages déjà terminées, "
+                              f"{len(page_numbers)} pages restantes")
+    else:
+        if max_pages is None:
+            max_pages = get_total_pages(base_url, crawl_options.get('backend', DEFAULT_PARSER_BACKEND), category)
+        journal.start(base_url, category, max_pages)
+
+    with CsvSink(csv_path, spec.columns, append=append) as sink:
+        pages = iter_category_pages(base_url, category, max_pages, progress_callback,
+                                    page_numbers=page_numbers, end_callback=journal.record_end,
+                                    **crawl_options)
+        for page, records in pages:
+            sink.write(records)
+            journal.record_page(page, len(records), sink.size())
+            if page_callback:
+                page_callback(page)
+
+    return csv_path, sink.rows_written
@@ -0,0 +1,117 @@
+"""
+Cache mémoire des jeux de données chargés par les pages (partagé entre sessions)
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from utils.storage import load_dataset
+
+
+# Budget mémoire par défaut du cache (somme des DataFrames conservés)
+DEFAULT_MEMORY_BUDGET = 512 * 1024 * 1024
+
+
+def file_fingerprint(path: Path) -> Tuple[str, int, int]:
+    """Empreinte d'un fichier : chemin absolu, date de modification (ns) et taille"""
+    stat = os.stat(path)
+    return str(Path(path).resolve()), stat.st_mtime_ns, stat.st_size
+
+
+class DatasetCache:
+    """
+    Cache LRU des DataFrames lus sur disque.
+    La clé combine l'empreinte du fichier (chemin, mtime, taille) et les
+    colonnes demandées : un fichier réécrit n'est jamais servi périmé, et
+    ses anciennes versions sont retirées dès qu'elles sont détectées.
+    Des structures dérivées (index de filtrage...) peuvent être attachées à
+    une entrée : elles sont construites une fois et évincées avec elle.
+    L'éviction LRU maintient la mémoire occupée sous memory_budget.
+    Les DataFrames servis sont partagés entre sessions : ne pas les modifier.
+    """
+
+    def __init__(self, memory_budget: int = DEFAULT_MEMORY_BUDGET):
+        self.memory_budget = memory_budget
+        self._lock = threading.Lock()
+        self._entries: OrderedDict = OrderedDict()  # clé -> entrée, de la moins à la plus récente
+        self._total_bytes = 0
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    @staticmethod
+    def _key(path: Path, columns: Optional[Sequence[str]]) -> Tuple:
+        return file_fingerprint(path) + (tuple(columns) if columns is not None else None,)
+
+    def _remove(self, key: Tuple):
+        entry = self._entries.pop(key)
+        self._total_bytes -= entry['size']
+
+    def _evict(self):
+        while self._total_bytes > self.memory_budget and self._entries:
+            self._remove(next(iter(self._entries)))
+            self.stats['evictions'] += 1
+
+    def load(self, path: Path, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """Jeu de données du fichier, relu seulement si le fichier a changé"""
+        key = self._key(path, columns)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return entry['df']
+            self.stats['misses'] += 1
+            # Versions précédentes du même fichier
+            for stale_key in [k for k in self._entries if k[0] == key[0] and k[1:3] != key[1:3]]:
+                self._remove(stale_key)
+
+        df = load_dataset(path, columns=columns)
+        size = int(df.memory_usage(deep=True).sum())
+        with self._lock:
+            if key not in self._entries and size <= self.memory_budget:
+                self._entries[key] = {'df': df, 'size': size, 'derived': {}}
+                self._total_bytes += size
+                self._evict()
+        return df
+
+    def derived(self, path: Path, columns: Optional[Sequence[str]], name: str,
+                build: Callable[[pd.DataFrame], Any]) -> Any:
+        """
+        Structure dérivée du jeu de données (build(df)), construite une fois
+        par version du fichier et partagée comme le DataFrame lui-même.
+        """
+        key = self._key(path, columns)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and name in entry['derived']:
+                return entry['derived'][name]
+        df = entry['df'] if entry is not None else self.load(path, columns)
+        value = build(df)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry['df'] is df:
+                entry['derived'][name] = value
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def get_stats(self) -> Dict:
+        """Statistiques de hits/misses et mémoire occupée"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['entries'] = len(self._entries)
+            stats['size_bytes'] = self._total_bytes
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+
+# Cache du processus Streamlit, commun à toutes les sessions
+dataset_cache = DatasetCache()
@@ -0,0 +1,121 @@
+"""
+Données des boutons de téléchargement : fichiers stockés et archives ZIP
+"""
+
+import os
+import tempfile
+import threading
+import zipfile
+from collections import OrderedDict
+from pathlib import Path
+from typing import BinaryIO, Callable, Optional, Sequence, Union
+
+from streamlit.proto.DownloadButton_pb2 import DownloadButton as DownloadButtonProto
+
+from utils.dataset_cache import file_fingerprint
+
+
+# Streamlit récent : `data` peut être une fonction, appelée seulement au clic
+DEFERRED_DOWNLOADS = 'deferred_file_id' in DownloadButtonProto.DESCRIPTOR.fields_by_name
+
+# Formats déjà compressés, stockés tels quels dans les archives
+COMPRESSED_SUFFIXES = {'.parquet', '.feather', '.gz', '.zip', '.bz2', '.xz', '.br'}
+
+# Taille totale des archives conservées sur disque
+DEFAULT_MAX_BUNDLE_BYTES = 512 * 1024 * 1024
+
+
+def download_data(build: Callable[[], bytes]) -> Union[Callable[[], bytes], bytes]:
+    """
+    Données d'un st.download_button : la fonction elle-même si Streamlit
+    sait différer le téléchargement (rien n'est lu avant le clic), sinon
+    son résultat.
+    """
+    return build if DEFERRED_DOWNLOADS else build()
+
+
+def file_download_data(path: Path) -> Union[Callable[[], bytes], bytes]:
+    """Octets d'un fichier tels qu'ils sont stockés, sans relecture ni conversion"""
+    path = Path(path)
+    return download_data(path.read_bytes)
+
+
+class ZipBundleCache:
+    """
+    Archives ZIP de plusieurs fichiers, écrites en flux dans un fichier
+    temporaire sur disque. Une archive est réutilisée tant que ses fichiers
+    n'ont pas changé (chemin, date de modification, taille). Les formats
+    déjà compressés sont stockés sans recompression. Les archives les moins
+    récemment utilisées sont supprimées au-delà de max_bytes au total (la
+    plus récente est toujours gardée).
+    Le verrou ne protège que l'index des archives : une construction ne
+    bloque pas les téléchargements des autres sessions. st.download_button
+    garde de toute façon les octets servis en mémoire (MediaFileManager) :
+    l'archive entière est lue au clic.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BUNDLE_BYTES):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # Supprimé à l'arrêt du processus
+        self._directory = tempfile.TemporaryDirectory(prefix='zip_bundles_')
+        self._bundles: OrderedDict = OrderedDict()  # empreintes des fichiers -> (chemin, taille)
+        self.stats = {'built': 0, 'reused': 0}
+
+    def _build(self, files: Sequence[Path]) -> Path:
+        fd, name = tempfile.mkstemp(suffix='.zip', dir=self._directory.name)
+        with os.fdopen(fd, 'wb') as bundle, zipfile.ZipFile(bundle, 'w') as zip_file:
+            for path in files:
+                compression = zipfile.ZIP_STORED if path.suffix in COMPRESSED_SUFFIXES else zipfile.ZIP_DEFLATED
+                # ZipFile.write copie le fichier par blocs, sans le charger en entier
+                zip_file.write(path, path.name, compress_type=compression)
+        return Path(name)
+
+    def _evict(self):
+        """Supprime les archives les moins récemment utilisées au-delà de max_bytes"""
+        total = sum(size for _, size in self._bundles.values())
+        while total > self.max_bytes and len(self._bundles) > 1:
+            _, (path, size) = self._bundles.popitem(last=False)
+            # Une lecture déjà commencée garde son fichier ouvert jusqu'à la fin
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def _open(self, key: tuple) -> Optional[BinaryIO]:
+        """Ouvre l'archive en cache d'une clé (sous le verrou), ou None"""
+        entry = self._bundles.get(key)
+        if entry is None:
+            return None
+        self._bundles.move_to_end(key)
+        return open(entry[0], 'rb')
+
+    def read(self, files: Sequence[Path]) -> bytes:
+        """Contenu de l'archive des fichiers donnés, construite au besoin"""
+        files = [Path(path) for path in files]
+        key = tuple(file_fingerprint(path) for path in files)
+        with self._lock:
+            bundle = self._open(key)
+            if bundle is not None:
+                self.stats['reused'] += 1
+        if bundle is None:
+            # Construction hors du verrou ; si une autre session a fini avant, son archive est gardée
+            path = self._build(files)
+            with self._lock:
+                bundle = self._open(key)
+                if bundle is None:
+                    self._bundles[key] = (path, path.stat().st_size)
+                    self.stats['built'] += 1
+                    bundle = open(path, 'rb')
+                    self._evict()
+                else:
+                    path.unlink(missing_ok=True)
+        with bundle:
+            return bundle.read()
+
+    def download_data(self, files: Sequence[Path]) -> Union[Callable[[], bytes], bytes]:
+        """Données d'un bouton de téléchargement de l'archive"""
+        files = list(files)
+        return download_data(lambda: self.read(files))
+
+
+# Archives partagées par toutes les sessions
+zip_bundles = ZipBundleCache()
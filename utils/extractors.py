@@ -0,0 +1,216 @@
+"""
+Extraction des cartes d'annonces pilotée par les spécifications de catégorie.
+Deux backends : lxml (XPath compilés, parse ciblé) et BeautifulSoup (repli).
+"""
+
+import io
+import re
+from functools import lru_cache
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from bs4.dammit import EncodingDetector
+from lxml import etree
+
+from utils.specs import CATEGORY_SPECS, TRANSFORMS, FieldSpec
+
+
+PAGE_PARAM_PATTERN = re.compile(r'page=(\d+)')
+
+# Seuls sous-arbres utiles d'une page : les cartes et la pagination
+CARD_CLASS = 'listings-cards__list-item'
+PAGINATOR_CLASS = 'paginator'
+
+
+def _class_xpath(tag: str, css_class: str) -> str:
+    """XPath équivalent à find_all(tag, class_=css_class) de BeautifulSoup"""
+    return f"descendant::{tag}[contains(concat(' ', normalize-space(@class), ' '), ' {css_class} ')]"
+
+
+PAGE_LINKS_XPATH = etree.XPath(_class_xpath('a', 'page-link'))
+LINK_XPATH = etree.XPath('descendant::a')
+TEXT_XPATH = etree.XPath('string()')
+
+
+# -- Backends : recherche des éléments et lecture du texte -------------------------
+
+def _lxml_matcher(tag: str, css_class: str, limit: int) -> Callable[[object], list]:
+    # Un XPath renvoie déjà la liste complète ; la limite ne sert qu'au backend bs4
+    return etree.XPath(_class_xpath(tag, css_class))
+
+
+def _lxml_text(elem, prefer_link: bool) -> str:
+    """Équivalent lxml de get_text().strip() (texte du premier lien si demandé)"""
+    if prefer_link:
+        links = LINK_XPATH(elem)
+        if links:
+            elem = links[0]
+    return TEXT_XPATH(elem).strip()
+
+
+def _bs4_matcher(tag: str, css_class: str, limit: int) -> Callable[[object], list]:
+    if limit == 1:
+        def find_first(card) -> list:
+            elem = card.find(tag, class_=css_class)
+            return [elem] if elem is not None else []
+        return find_first
+    return lambda card: card.find_all(tag, class_=css_class, limit=limit)
+
+
+def _bs4_text(elem, prefer_link: bool) -> str:
+    if prefer_link:
+        link = elem.find('a')
+        if link:
+            elem = link
+    return elem.get_text().strip()
+
+
+_BACKENDS = {
+    'lxml': (_lxml_matcher, _lxml_text),
+    'bs4': (_bs4_matcher, _bs4_text),
+}
+
+
+# -- Compilation des spécifications ----------------------------------------------
+
+def _compile_field(field: FieldSpec, text_of: Callable) -> Callable[[Dict, Dict], str]:
+    """Compile un champ en fonction (éléments trouvés, champs déjà lus) -> texte"""
+    if field.derive_from:
+        transform, source = TRANSFORMS[field.transform], field.derive_from
+        return lambda matches, data: transform(data[source])
+
+    index, prefer_link = field.index, field.prefer_link
+
+    def read(matches: Dict, selector) -> Optional[str]:
+        elems = matches[selector]
+        return text_of(elems[index], prefer_link) if len(elems) > index else None
+
+    if len(field.selectors) == 1:
+        selector = field.selectors[0]
+
+        def read_one(matches, data) -> str:
+            text = read(matches, selector)
+            return text if text is not None else ""
+
+        return read_one
+
+    selectors = field.selectors
+
+    def read_joined(matches, data) -> str:
+        texts = (read(matches, selector) for selector in selectors)
+        return ' '.join(text for text in texts if text is not None)
+
+    return read_joined
+
+
+@lru_cache(maxsize=None)
+def compile_card_extractor(category: str, backend: str = 'lxml') -> Callable[[object], Dict]:
+    """
+    Compile une seule fois la spécification d'une catégorie en extracteur de
+    carte pour le backend donné ('lxml' ou 'bs4'). Chaque sélecteur distinct
+    n'est évalué qu'une fois par carte, même s'il alimente plusieurs champs.
+    """
+    make_matcher, text_of = _BACKENDS[backend]
+    fields = CATEGORY_SPECS[category].fields
+
+    limits = {}
+    for field in fields:
+        for selector in field.selectors:
+            limits[selector] = max(limits.get(selector, 0), field.index + 1)
+    matchers = [(selector, make_matcher(*selector, limit)) for selector, limit in limits.items()]
+    compiled = [(field.name, _compile_field(field, text_of)) for field in fields]
+
+    def extract_card(card) -> Dict:
+        matches = {selector: match(card) for selector, match in matchers}
+        data = {}
+        for name, read in compiled:
+            data[name] = read(matches, data)
+        return data
+
+    return extract_card
+
+
+# -- Parse ciblé lxml ----------------------------------------------------------------
+
+def _detect_encoding(content: bytes) -> str:
+    """Encodage déclaré dans la page (comme BeautifulSoup), sinon UTF-8"""
+    return EncodingDetector.find_declared_encoding(content, is_html=True) or 'utf-8'
+
+
+def _target_kind(elem):
+    """Retourne 'card' ou 'paginator' si l'élément est un sous-arbre utile"""
+    classes = elem.get('class')
+    if not classes:
+        return None
+    tokens = classes.split()
+    if elem.tag == 'div' and CARD_CLASS in tokens:
+        return 'card'
+    if elem.tag == 'nav' and PAGINATOR_CLASS in tokens:
+        return 'paginator'
+    return None
+
+
+def iter_page_elements(content: bytes) -> Iterator[Tuple[str, object]]:
+    """
+    Parse ciblé d'une page : produit ('card', élément) pour chaque carte
+    d'annonce et ('paginator', élément) pour la pagination. Le reste du
+    document (en-têtes, scripts, publicités...) est libéré au fil du parsing,
+    si bien qu'un seul sous-arbre utile est matérialisé à la fois.
+    """
+    if not content or not content.strip():
+        return
+    events = etree.iterparse(io.BytesIO(content), events=('start', 'end'), html=True,
+                             encoding=_detect_encoding(content), recover=True)
+    inside = 0  # profondeur d'imbrication dans un sous-arbre utile
+    for event, elem in events:
+        kind = _target_kind(elem)
+        if event == 'start':
+            if kind:
+                inside += 1
+            continue
+        if kind:
+            inside -= 1
+            if inside == 0:
+                yield kind, elem
+        if inside == 0:
+            # Libère l'élément terminé et ses frères précédents déjà traités
+            elem.clear()
+            parent = elem.getparent()
+            if parent is not None:
+                while elem.getprevious() is not None:
+                    del parent[0]
+
+
+def max_page_from_paginator(paginator) -> int:
+    """Plus grand numéro de page référencé par les liens de pagination"""
+    max_page = 1
+    for link in PAGE_LINKS_XPATH(paginator):
+        # Prendre le dernier paramètre page= (le vrai numéro)
+        matches = PAGE_PARAM_PATTERN.findall(link.get('href', ''))
+        if matches:
+            max_page = max(max_page, int(matches[-1]))
+    return max_page
+
+
+def extract_listings(content: bytes, category: str) -> Tuple[List[Dict], List[str]]:
+    """Extrait les annonces d'une page brute en une passe (parse ciblé lxml)"""
+    extract_card = compile_card_extractor(category, 'lxml')
+    records, errors = [], []
+    for kind, elem in iter_page_elements(content):
+        if kind != 'card':
+            continue
+        try:
+            records.append(extract_card(elem))
+        except Exception as e:
+            errors.append(str(e))
+    return records, errors
+
+
+def scan_page(content: bytes) -> Tuple[int, int]:
+    """Nombre de cartes d'annonces et plus grand numéro de page de la pagination"""
+    cards, max_page = 0, 1
+    for kind, elem in iter_page_elements(content):
+        if kind == 'card':
+            cards += 1
+        else:
+            max_page = max(max_page, max_page_from_paginator(elem))
+    return cards, max_page
@@ -0,0 +1,122 @@
+"""
+Index de filtrage des jeux de données du dashboard
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+# Colonnes indexées par défaut
+FILTER_CATEGORY_COLUMNS = ('marque', 'transmission', 'carburant')
+FILTER_RANGE_COLUMNS = ('prix_numerique', 'km_numerique', 'année')
+
+
+class FilterIndex:
+    """
+    Index construit une fois par jeu de données.
+    - Colonnes catégorielles : liste triée des positions des lignes de chaque
+      valeur (index inversé), et codes de chaque ligne.
+    - Colonnes numériques : valeurs présentes triées avec leurs positions,
+      pour répondre à un intervalle par recherche dichotomique.
+    Une requête part de la plus petite liste de candidats donnée par un
+    filtre, puis vérifie les autres filtres sur ces seules lignes : le coût
+    est proportionnel au nombre de candidats, pas à la taille de la table.
+    """
+
+    def __init__(self, df: pd.DataFrame, category_columns: Sequence[str] = FILTER_CATEGORY_COLUMNS,
+                 range_columns: Sequence[str] = FILTER_RANGE_COLUMNS):
+        self.num_rows = len(df)
+        self._categories: Dict[str, pd.Index] = {}
+        self._codes: Dict[str, np.ndarray] = {}
+        self._postings: Dict[str, List[np.ndarray]] = {}
+        self._values: Dict[str, np.ndarray] = {}
+        self._sorted_values: Dict[str, np.ndarray] = {}
+        self._sorted_positions: Dict[str, np.ndarray] = {}
+
+        for column in category_columns:
+            if column not in df.columns:
+                continue
+            categorical = pd.Categorical(df[column])
+            codes = np.asarray(categorical.codes)
+            order = np.argsort(codes, kind='stable')
+            bounds = np.searchsorted(codes[order], np.arange(len(categorical.categories) + 1))
+            self._categories[column] = categorical.categories
+            self._codes[column] = codes
+            self._postings[column] = [order[bounds[code]:bounds[code + 1]]
+                                      for code in range(len(categorical.categories))]
+
+        for column in range_columns:
+            if column not in df.columns:
+                continue
+            values = pd.to_numeric(df[column], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+            present = np.flatnonzero(~np.isnan(values))
+            order = present[np.argsort(values[present], kind='stable')]
+            self._values[column] = values
+            self._sorted_values[column] = values[order]
+            self._sorted_positions[column] = order
+
+    def options(self, column: str) -> List:
+        """Valeurs présentes d'une colonne catégorielle, dans l'ordre des catégories"""
+        if column not in self._postings:
+            return []
+        return [value for value, positions in zip(self._categories[column], self._postings[column])
+                if len(positions)]
+
+    def bounds(self, column: str) -> Optional[Tuple[float, float]]:
+        """Minimum et maximum d'une colonne numérique (None sans valeur)"""
+        sorted_values = self._sorted_values.get(column)
+        if sorted_values is None or not len(sorted_values):
+            return None
+        return sorted_values[0], sorted_values[-1]
+
+    def _category_candidates(self, column: str, selected: Sequence) -> np.ndarray:
+        codes = self._categories[column].get_indexer(list(selected))
+        postings = [self._postings[column][code] for code in codes if code >= 0]
+        return np.concatenate(postings) if postings else np.empty(0, dtype=np.intp)
+
+    def _range_candidates(self, column: str, low: float, high: float) -> np.ndarray:
+        sorted_values = self._sorted_values[column]
+        start = np.searchsorted(sorted_values, low, side='left')
+        end = np.searchsorted(sorted_values, high, side='right')
+        return self._sorted_positions[column][start:end]
+
+    def select(self, categories: Optional[Dict[str, Sequence]] = None,
+               ranges: Optional[Dict[str, Tuple[float, float]]] = None) -> Optional[np.ndarray]:
+        """
+        Positions (croissantes) des lignes qui satisfont tous les filtres :
+        valeur parmi celles choisies pour chaque colonne catégorielle, valeur
+        dans [bas, haut] pour chaque colonne numérique (valeurs manquantes
+        exclues). Retourne None si aucun filtre n'est actif.
+        """
+        categories = {column: values for column, values in (categories or {}).items()
+                      if values and column in self._postings}
+        ranges = {column: bounds for column, bounds in (ranges or {}).items()
+                  if bounds is not None and column in self._sorted_values}
+        if not categories and not ranges:
+            return None
+
+        # Taille de chaque liste de candidats, sans la construire
+        sizes = {}
+        for column, selected in categories.items():
+            codes = self._categories[column].get_indexer(list(selected))
+            sizes[('category', column)] = sum(len(self._postings[column][code]) for code in codes if code >= 0)
+        for column, (low, high) in ranges.items():
+            sorted_values = self._sorted_values[column]
+            sizes[('range', column)] = (np.searchsorted(sorted_values, high, side='right')
+                                        - np.searchsorted(sorted_values, low, side='left'))
+        kind, column = min(sizes, key=sizes.get)
+
+        if kind == 'category':
+            candidates = self._category_candidates(column, categories.pop(column))
+        else:
+            candidates = self._range_candidates(column, *ranges.pop(column))
+
+        for other, selected in categories.items():
+            codes = self._categories[other].get_indexer(list(selected))
+            candidates = candidates[np.isin(self._codes[other][candidates], codes[codes >= 0])]
+        for other, (low, high) in ranges.items():
+            values = self._values[other][candidates]
+            candidates = candidates[(values >= low) & (values <= high)]
+        return np.sort(candidates)
@@ -0,0 +1,216 @@
+"""
+Cache HTTP sur disque avec requêtes conditionnelles (ETag / Last-Modified)
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+import requests
+
+from utils.http_client import http_get
+
+
+# Paramètres par défaut du cache
+DEFAULT_CACHE_DIR = Path(".http_cache")
+DEFAULT_MAX_AGE = 300  # secondes pendant lesquelles une page est servie sans requête
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+
+
+class HttpCache:
+    """
+    Cache des réponses HTTP sur disque.
+    Chaque entrée stocke le corps de la réponse et ses validateurs
+    (ETag, Last-Modified). Une entrée plus jeune que max_age est servie
+    localement. Au-delà, elle est revalidée par une requête conditionnelle
+    (304 = corps réutilisé). L'éviction est LRU dès que la taille totale
+    dépasse max_bytes.
+    """
+
+    def __init__(self, cache_dir: Path = DEFAULT_CACHE_DIR, max_age: float = DEFAULT_MAX_AGE,
+                 max_bytes: int = DEFAULT_MAX_BYTES, enabled: bool = True):
+        self.cache_dir = Path(cache_dir)
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._index: Optional[OrderedDict] = None  # clé -> métadonnées, du moins au plus récent
+        self._total_bytes = 0
+        self.stats = {'hits': 0, 'revalidated': 0, 'misses': 0, 'evictions': 0}
+
+    # -- Index -----------------------------------------------------------------
+
+    @staticmethod
+    def _key(url: str) -> str:
+        return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+    def _body_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.body"
+
+    def _meta_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def _load_index(self):
+        """Reconstruit l'index LRU depuis les métadonnées présentes sur disque"""
+        if self._index is not None:
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        entries = []
+        for meta_path in self.cache_dir.glob("*.json"):
+            try:
+                meta = json.loads(meta_path.read_text(encoding='utf-8'))
+                entries.append((meta_path.stem, meta))
+            except (OSError, ValueError):
+                continue
+        entries.sort(key=lambda item: item[1].get('last_access', 0))
+        self._index = OrderedDict(entries)
+        self._total_bytes = sum(meta.get('size', 0) for meta in self._index.values())
+
+    def _write_meta(self, key: str, meta: Dict):
+        tmp_path = self._meta_path(key).with_suffix('.json.tmp')
+        tmp_path.write_text(json.dumps(meta), encoding='utf-8')
+        os.replace(tmp_path, self._meta_path(key))
+
+    def _remove(self, key: str):
+        meta = self._index.pop(key, None)
+        if meta is not None:
+            self._total_bytes -= meta.get('size', 0)
+        for path in (self._body_path(key), self._meta_path(key)):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and self._index:
+            oldest_key = next(iter(self._index))
+            self._remove(oldest_key)
+            self.stats['evictions'] += 1
+
+    # -- Lecture / écriture ----------------------------------------------------
+
+    def lookup(self, url: str) -> Optional[Dict]:
+        """Retourne les métadonnées de l'entrée associée à l'URL, ou None"""
+        with self._lock:
+            self._load_index()
+            meta = self._index.get(self._key(url))
+            return dict(meta) if meta else None
+
+    def read_body(self, url: str) -> Optional[bytes]:
+        try:
+            return self._body_path(self._key(url)).read_bytes()
+        except OSError:
+            return None
+
+    def touch(self, url: str, revalidated: bool = False):
+        """Marque l'entrée comme récemment utilisée (et fraîche si revalidée)"""
+        key = self._key(url)
+        with self._lock:
+            self._load_index()
+            meta = self._index.get(key)
+            if meta is None:
+                return
+            now = time.time()
+            meta['last_access'] = now
+            if revalidated:
+                meta['fetched_at'] = now
+            self._index.move_to_end(key)
+            self._write_meta(key, meta)
+
+    def store(self, url: str, body: bytes, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """Enregistre une réponse, puis applique l'éviction LRU"""
+        key = self._key(url)
+        now = time.time()
+        meta = {
+            'url': url,
+            'etag': etag,
+            'last_modified': last_modified,
+            'fetched_at': now,
+            'last_access': now,
+            'size': len(body),
+        }
+        with self._lock:
+            self._load_index()
+            if key in self._index:
+                self._remove(key)
+            tmp_path = self._body_path(key).with_suffix('.body.tmp')
+            tmp_path.write_bytes(body)
+            os.replace(tmp_path, self._body_path(key))
+            self._write_meta(key, meta)
+            self._index[key] = meta
+            self._total_bytes += len(body)
+            self._evict()
+
+    def clear(self):
+        """Supprime toutes les entrées du cache"""
+        with self._lock:
+            self._load_index()
+            for key in list(self._index):
+                self._remove(key)
+
+    def _count(self, stat: str):
+        with self._lock:
+            self.stats[stat] += 1
+
+    # -- Requête avec cache ----------------------------------------------------
+
+    def fetch(self, url: str, get: Callable[..., requests.Response] = http_get) -> bytes:
+        """
+        Retourne le corps de la page en passant par le cache.
+        Lève une exception HTTP si la page ne peut pas être récupérée.
+        """
+        if not self.enabled:
+            response = get(url)
+            response.raise_for_status()
+            return response.content
+
+        meta = self.lookup(url)
+        body = self.read_body(url) if meta else None
+        headers = {}
+
+        if body is not None:
+            if time.time() - meta['fetched_at'] < self.max_age:
+                self.touch(url)
+                self._count('hits')
+                return body
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        response = get(url, headers=headers)
+
+        if response.status_code == 304 and body is not None:
+            self.touch(url, revalidated=True)
+            self._count('revalidated')
+            return body
+
+        response.raise_for_status()
+        self._count('misses')
+        self.store(url, response.content, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        return response.content
+
+    def get_stats(self) -> Dict:
+        """Statistiques de hits/misses et occupation du cache"""
+        with self._lock:
+            self._load_index()
+            stats = dict(self.stats)
+            stats['entries'] = len(self._index)
+            stats['size_bytes'] = self._total_bytes
+        lookups = stats['hits'] + stats['revalidated'] + stats['misses']
+        stats['hit_rate'] = (stats['hits'] + stats['revalidated']) / lookups if lookups else 0.0
+        return stats
+
+    def reset_stats(self):
+        with self._lock:
+            for stat in self.stats:
+                self.stats[stat] = 0
+
+
+# Cache partagé par toutes les requêtes de pages d'annonces
+http_cache = HttpCache()
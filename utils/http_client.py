@@ -0,0 +1,325 @@
+"""
+Couche HTTP partagée : session keep-alive avec pool de connexions
+"""
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.request import ACCEPT_ENCODING
+
+
+# Paramètres par défaut de la session
+DEFAULT_CONNECT_TIMEOUT = 5
+DEFAULT_READ_TIMEOUT = 10
+DEFAULT_POOL_MAXSIZE = 16
+DEFAULT_REQUESTS_PER_SECOND = 2.0
+
+# Contrôle adaptatif du débit (AIMD) : bornes, pas d'augmentation, facteur de réduction.
+# Le plafond par défaut est le débit poli : il n'est relevé que sur demande explicite.
+DEFAULT_MIN_REQUESTS_PER_SECOND = 0.5
+DEFAULT_MAX_REQUESTS_PER_SECOND = DEFAULT_REQUESTS_PER_SECOND
+RATE_INCREASE = 0.1
+RATE_DECREASE_FACTOR = 0.5
+# Latence (s) en dessous de laquelle le site est jugé en bonne santé
+LATENCY_TARGET = 1.0
+
+# Nouvelles tentatives : réponses concernées et backoff exponentiel avec jitter
+MAX_RETRIES = 3
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 10.0
+MAX_RETRY_AFTER = 60.0
+
+# En-têtes construits une seule fois. ACCEPT_ENCODING annonce gzip/deflate,
+# et br si le module brotli est installé (décodage pris en charge par urllib3).
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+    'Accept-Encoding': ACCEPT_ENCODING,
+    'Connection': 'keep-alive',
+}
+
+
+class RateLimiter:
+    """
+    Limiteur de débit à seau de jetons (token bucket), partagé entre threads.
+    Garantit au plus `rate` requêtes par seconde en moyenne, avec des rafales
+    limitées à `capacity` requêtes.
+    """
+
+    def __init__(self, rate: float = DEFAULT_REQUESTS_PER_SECOND, capacity: int = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+        self._paused_until = 0.0
+
+    def set_rate(self, rate: float):
+        """Modifie le débit autorisé (requêtes par seconde)"""
+        with self._lock:
+            self._refill()
+            self.rate = rate
+
+    def pause(self, seconds: float):
+        """Suspend toutes les requêtes pendant `seconds` (ex: Retry-After)"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self):
+        """Bloque jusqu'à ce qu'un jeton soit disponible, puis le consomme"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                else:
+                    self._refill()
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+# Limiteur global : toutes les requêtes réseau vers le site partagent le même budget
+rate_limiter = RateLimiter()
+
+
+class AdaptiveRateController:
+    """
+    Ajuste le débit du limiteur selon la santé du site (AIMD) : augmentation
+    additive tant que la latence reste sous LATENCY_TARGET, réduction
+    multiplicative sur 429, 5xx ou timeout. Comme pour TCP, une seule
+    augmentation est appliquée par fenêtre (la plus longue de la latence de
+    la réponse et de l'intervalle entre deux requêtes), quel que soit le
+    nombre de workers dont les réponses arrivent dans cette fenêtre. De même,
+    une seule réduction est appliquée par intervalle entre deux requêtes, les
+    réponses déjà en vol décrivant la même congestion.
+    """
+
+    def __init__(self, limiter: RateLimiter, min_rate: float = DEFAULT_MIN_REQUESTS_PER_SECOND,
+                 max_rate: float = DEFAULT_MAX_REQUESTS_PER_SECOND, enabled: bool = True):
+        self.limiter = limiter
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.enabled = enabled
+        self._last_increase = 0.0
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    def configure(self, enabled: Optional[bool] = None, min_rate: Optional[float] = None,
+                  max_rate: Optional[float] = None):
+        with self._lock:
+            if enabled is not None:
+                self.enabled = enabled
+            if min_rate is not None:
+                self.min_rate = min_rate
+            if max_rate is not None:
+                self.max_rate = max_rate
+
+    def on_success(self, latency: float):
+        if not self.enabled or latency > LATENCY_TARGET:
+            return
+        with self._lock:
+            now = time.monotonic()
+            rate = self.limiter.rate
+            if rate >= self.max_rate or now - self._last_increase < max(latency, 1.0 / rate):
+                return
+            self._last_increase = now
+            self.limiter.set_rate(min(self.max_rate, rate + RATE_INCREASE))
+
+    def on_congestion(self):
+        if not self.enabled:
+            return
+        with self._lock:
+            now = time.monotonic()
+            rate = self.limiter.rate
+            if now - self._last_decrease < 1.0 / rate:
+                return
+            self._last_decrease = now
+            self._last_increase = now
+            self.limiter.set_rate(max(self.min_rate, rate * RATE_DECREASE_FACTOR))
+
+
+rate_controller = AdaptiveRateController(rate_limiter)
+
+
+class ConnectionStats:
+    """Compteurs de requêtes et de connexions ouvertes, partagés entre threads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+        self.retries = 0
+
+    def record_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def record_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def record_new_connection(self):
+        with self._lock:
+            self.new_connections += 1
+
+    @property
+    def reused_connections(self) -> int:
+        """Nombre de requêtes servies par une connexion déjà ouverte"""
+        return max(0, self.requests - self.new_connections)
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.new_connections = 0
+            self.retries = 0
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'new_connections': self.new_connections,
+                'reused_connections': max(0, self.requests - self.new_connections),
+                'retries': self.retries,
+            }
+
+
+connection_stats = ConnectionStats()
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    def _new_conn(self):
+        connection_stats.record_new_connection()
+        return super()._new_conn()
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    def _new_conn(self):
+        connection_stats.record_new_connection()
+        return super()._new_conn()
+
+
+class _PooledAdapter(HTTPAdapter):
+    """Adaptateur dont les pools comptent les nouvelles connexions (handshakes)"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _CountingHTTPConnectionPool,
+            'https': _CountingHTTPSConnectionPool,
+        }
+
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+_pool_maxsize = DEFAULT_POOL_MAXSIZE
+_timeout = (DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT)
+
+
+def _build_session() -> requests.Session:
+    session = requests.Session()
+    session.headers.update(DEFAULT_HEADERS)
+    # pool_block=True : au-delà de pool_maxsize, les threads attendent une
+    # connexion libre au lieu d'ouvrir des connexions jetables
+    adapter = _PooledAdapter(pool_connections=4, pool_maxsize=_pool_maxsize, pool_block=True)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """Retourne la session HTTP partagée (créée au premier appel)"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def configure_session(pool_maxsize: Optional[int] = None, connect_timeout: Optional[float] = None,
+                      read_timeout: Optional[float] = None):
+    """
+    Modifie la taille du pool et les timeouts. La session est recréée
+    uniquement si la taille du pool change.
+    """
+    global _session, _pool_maxsize, _timeout
+    with _session_lock:
+        if connect_timeout is not None or read_timeout is not None:
+            _timeout = (connect_timeout if connect_timeout is not None else _timeout[0],
+                        read_timeout if read_timeout is not None else _timeout[1])
+        if pool_maxsize is not None and pool_maxsize != _pool_maxsize:
+            _pool_maxsize = pool_maxsize
+            if _session is not None:
+                _session.close()
+                _session = None
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Délai en secondes d'un en-tête Retry-After (nombre de secondes ou date HTTP)"""
+    if not value:
+        return None
+    try:
+        delay = float(value)
+    except ValueError:
+        try:
+            delay = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max(0.0, delay), MAX_RETRY_AFTER)
+
+
+def backoff_delay(attempt: int) -> float:
+    """Backoff exponentiel avec jitter complet pour la tentative `attempt` (0, 1, ...)"""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+def http_get(url: str, **kwargs) -> requests.Response:
+    """
+    Requête GET via la session partagée, soumise au limiteur de débit global.
+    Les réponses 429/5xx et les erreurs réseau sont retentées MAX_RETRIES fois
+    avec backoff (Retry-After est respecté et suspend toutes les requêtes).
+    Après la dernière tentative, la réponse est retournée ou l'erreur levée.
+    """
+    kwargs.setdefault('timeout', _timeout)
+    kwargs.setdefault('allow_redirects', True)
+
+    for attempt in range(MAX_RETRIES + 1):
+        rate_limiter.acquire()
+        connection_stats.record_request()
+        started = time.monotonic()
+        try:
+            response = get_session().get(url, **kwargs)
+        except (requests.Timeout, requests.ConnectionError):
+            rate_controller.on_congestion()
+            if attempt == MAX_RETRIES:
+                raise
+            delay = backoff_delay(attempt)
+        else:
+            if response.status_code not in RETRY_STATUSES:
+                rate_controller.on_success(time.monotonic() - started)
+                return response
+            rate_controller.on_congestion()
+            if attempt == MAX_RETRIES:
+                return response
+            delay = backoff_delay(attempt)
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            if retry_after is not None:
+                rate_limiter.pause(retry_after)
+                delay = max(delay, retry_after)
+            response.close()
+        connection_stats.record_retry()
+        time.sleep(delay)
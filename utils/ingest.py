@@ -0,0 +1,121 @@
+"""
+Import par morceaux des fichiers CSV uploadés (avec nettoyage optionnel)
+"""
+
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, List, Optional
+
+import pandas as pd
+
+from utils.scraper import clean_dataframe
+from utils.specs import CATEGORY_SPECS
+
+
+DEFAULT_CHUNK_ROWS = 50_000
+
+
+@dataclass
+class IngestResult:
+    path: Path
+    rows: int
+    columns: List[str]
+    cleaned_path: Optional[Path] = None
+
+
+def cleaned_path_for(path: Path) -> Path:
+    """Chemin du fichier nettoyé associé à un import"""
+    path = Path(path)
+    return path.with_name(f"{path.stem}_nettoyees{path.suffix}")
+
+
+def validate_columns(columns: List[str], category: Optional[str] = None):
+    """Vérifie l'en-tête du premier morceau (et les colonnes attendues par le nettoyage)"""
+    if not columns:
+        raise ValueError("Le fichier ne contient aucune colonne.")
+    duplicates = sorted({column for column in columns if columns.count(column) > 1})
+    if duplicates:
+        raise ValueError(f"Colonnes en double: {', '.join(duplicates)}")
+    if category is not None:
+        missing = [column for column in CATEGORY_SPECS[category].columns if column not in columns]
+        if missing:
+            raise ValueError(f"Colonnes manquantes pour le nettoyage {category}: {', '.join(missing)}")
+
+
+def _iter_cleaned(chunks, category: str, workers: int):
+    """Nettoie les morceaux dans un pool de processus, dans l'ordre, avec une fenêtre bornée"""
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append((chunk, executor.submit(clean_dataframe, chunk, category)))
+            # Au plus deux morceaux en vol par processus : mémoire bornée
+            if len(pending) >= 2 * workers:
+                chunk, future = pending.popleft()
+                yield chunk, future.result()
+        while pending:
+            chunk, future = pending.popleft()
+            yield chunk, future.result()
+
+
+def ingest_csv(source, path: Path, category: Optional[str] = None, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+               workers: int = 0, progress_callback: Callable[[int], None] = None) -> IngestResult:
+    """
+    Importe un CSV par morceaux de chunk_rows lignes. Le schéma est validé
+    sur le premier morceau, puis chaque morceau est ajouté à `path` (texte
+    brut, valeurs inchangées). Avec une catégorie, les morceaux sont aussi
+    nettoyés (clean_dataframe) et écrits dans `<nom>_nettoyees.csv` : dans
+    le processus courant par défaut, ou dans un pool de `workers` processus
+    si workers > 1 (chaque processus a son coût de démarrage et copie les
+    morceaux, à réserver aux gros fichiers). Les fichiers n'apparaissent qu'une fois
+    l'import terminé ; en cas d'erreur, rien n'est écrit.
+    """
+    path = Path(path)
+    cleaned_path = cleaned_path_for(path) if category is not None else None
+    chunks = pd.read_csv(source, encoding='utf-8-sig', dtype=str, keep_default_na=False, chunksize=chunk_rows)
+
+    outputs = [path] + ([cleaned_path] if cleaned_path is not None else [])
+    tmp_paths = [output.with_name(output.name + '.tmp') for output in outputs]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    handles = [open(tmp_path, 'w', encoding='utf-8-sig', newline='') for tmp_path in tmp_paths]
+    rows = 0
+    columns: List[str] = []
+    try:
+        def validated():
+            nonlocal columns
+            for chunk in chunks:
+                if not columns:
+                    columns = list(chunk.columns)
+                    validate_columns(columns, category)
+                yield chunk
+
+        if category is None:
+            pairs = ((chunk, None) for chunk in validated())
+        elif workers > 1:
+            pairs = _iter_cleaned(validated(), category, workers)
+        else:
+            pairs = ((chunk, clean_dataframe(chunk, category)) for chunk in validated())
+
+        for chunk, cleaned in pairs:
+            header = rows == 0
+            chunk.to_csv(handles[0], index=False, header=header)
+            if cleaned is not None:
+                cleaned.to_csv(handles[1], index=False, header=header)
+            rows += len(chunk)
+            if progress_callback:
+                progress_callback(rows)
+
+        if not columns:
+            raise ValueError("Le fichier est vide.")
+    except BaseException:
+        for handle, tmp_path in zip(handles, tmp_paths):
+            handle.close()
+            tmp_path.unlink(missing_ok=True)
+        raise
+
+    for handle, tmp_path, output in zip(handles, tmp_paths, outputs):
+        handle.close()
+        os.replace(tmp_path, output)
+    return IngestResult(path=path, rows=rows, columns=columns, cleaned_path=cleaned_path)
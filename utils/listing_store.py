@@ -0,0 +1,311 @@
+"""
+Base SQLite des annonces nettoyées (une table par catégorie, requêtes indexées)
+"""
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.schema import INTEGER_COLUMNS, apply_schema
+from utils.specs import CATEGORY_SPECS
+from utils.storage import CLEAN_DATA_DIR
+
+
+STORE_PATH = CLEAN_DATA_DIR / "annonces.sqlite"
+
+# Colonnes indexées dans chaque table qui les contient
+INDEXED_COLUMNS = ('marque', 'année', 'prix_numerique', 'adresse')
+
+# Valeurs numériques extraites par le nettoyage (colonne source, colonne numérique)
+NUMERIC_COLUMNS = (('prix', 'prix_numerique'), ('kilométrage', 'km_numerique'))
+
+# Lignes lues par morceau lors de l'export CSV
+EXPORT_CHUNK_ROWS = 50_000
+
+
+def store_columns(category: str) -> Tuple[str, ...]:
+    """Colonnes de la table d'une catégorie : champs scrapés puis valeurs numériques"""
+    columns = CATEGORY_SPECS[category].columns
+    return columns + tuple(numeric for source, numeric in NUMERIC_COLUMNS if source in columns)
+
+
+def identity_columns(category: str) -> Tuple[str, ...]:
+    """Champs qui identifient une annonce (le prix peut changer d'un scraping à l'autre)"""
+    return tuple(column for column in CATEGORY_SPECS[category].columns if column != 'prix')
+
+
+def listing_identities(df: pd.DataFrame, columns: Sequence[str]) -> np.ndarray:
+    """Identifiants 64 bits signés des annonces (hash vectorisé des champs d'identité)"""
+    frame = pd.DataFrame({
+        column: (df[column].astype('string').fillna('') if column in df.columns else '')
+        for column in columns
+    }, index=df.index)
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy().view('int64')
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _where(categories: Optional[Dict[str, Sequence]] = None,
+           ranges: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None) -> Tuple[str, List]:
+    """
+    Clause WHERE des filtres : valeur parmi celles choisies (liste vide = pas
+    de filtre), valeur dans [bas, haut] (borne None = ouverte, valeurs
+    manquantes exclues).
+    """
+    conditions = []
+    params: List = []
+    for column, values in (categories or {}).items():
+        if values:
+            conditions.append(f"{_quote(column)} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+    for column, bounds in (ranges or {}).items():
+        if bounds is None:
+            continue
+        low, high = bounds
+        conditions.append(f"{_quote(column)} IS NOT NULL")
+        if low is not None:
+            conditions.append(f"{_quote(column)} >= ?")
+            params.append(low)
+        if high is not None:
+            conditions.append(f"{_quote(column)} <= ?")
+            params.append(high)
+    return (" WHERE " + " AND ".join(conditions) if conditions else ""), params
+
+
+class ListingStore:
+    """
+    Annonces nettoyées de toutes les catégories, dans une base SQLite locale.
+    Chaque catégorie a sa table, indexée sur marque, année, prix_numerique et
+    adresse. Une annonce est identifiée par le hash de ses champs hors prix :
+    une nouvelle sauvegarde met à jour les annonces déjà connues (prix) et
+    ajoute les autres, dans une seule transaction. Les agrégats et filtres du
+    dashboard sont calculés par SQLite, sans charger les tables.
+    """
+
+    def __init__(self, path: Path = STORE_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._ready = False
+
+    def _create_schema(self, connection: sqlite3.Connection):
+        # WAL : les pages lisent pendant qu'une sauvegarde écrit
+        connection.execute("PRAGMA journal_mode=WAL")
+        with connection:
+            for category in CATEGORY_SPECS:
+                table = _quote(category)
+                columns = ", ".join(
+                    f"{_quote(column)} {'INTEGER' if column in INTEGER_COLUMNS else 'TEXT'}"
+                    for column in store_columns(category)
+                )
+                connection.execute(f"CREATE TABLE IF NOT EXISTS {table} "
+                                   f"(identity INTEGER NOT NULL UNIQUE, {columns})")
+                for column in INDEXED_COLUMNS:
+                    if column in store_columns(category):
+                        connection.execute(f"CREATE INDEX IF NOT EXISTS {_quote(f'idx_{category}_{column}')} "
+                                           f"ON {table} ({_quote(column)})")
+
+    @contextmanager
+    def _connect(self):
+        """Connexion ouverte pour une opération (les sessions Streamlit tournent dans des threads différents)"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path)
+        try:
+            with self._lock:
+                if not self._ready:
+                    self._create_schema(connection)
+                    self._ready = True
+            yield connection
+        finally:
+            connection.close()
+
+    @staticmethod
+    def _table(category: str) -> str:
+        if category not in CATEGORY_SPECS:
+            raise ValueError(f"Catégorie inconnue: {category}")
+        return _quote(category)
+
+    @staticmethod
+    def _column(category: str, column: str) -> str:
+        if column not in store_columns(category):
+            raise ValueError(f"Colonne inconnue pour {category}: {column}")
+        return _quote(column)
+
+    def insert(self, category: str, df: pd.DataFrame) -> Dict[str, int]:
+        """
+        Ajoute ou met à jour les annonces d'un DataFrame nettoyé, en une
+        transaction. Retourne le nombre d'annonces ajoutées et mises à jour.
+        """
+        table = self._table(category)
+        columns = [column for column in store_columns(category) if column in df.columns]
+        identities = listing_identities(df, identity_columns(category))
+        values = df[columns].astype(object)
+        values = values.where(df[columns].notna(), None)
+        rows = ((int(identity),) + tuple(row) for identity, row in zip(identities, values.itertuples(index=False)))
+
+        names = ", ".join(_quote(column) for column in columns)
+        updates = ", ".join(f"{_quote(column)} = excluded.{_quote(column)}" for column in columns)
+        sql = (f"INSERT INTO {table} (identity, {names}) VALUES ({', '.join('?' * (len(columns) + 1))}) "
+               f"ON CONFLICT(identity) DO UPDATE SET {updates}")
+        with self._connect() as connection:
+            with connection:
+                before = connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                connection.executemany(sql, rows)
+                after = connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        inserted = after - before
+        return {'inserted': inserted, 'updated': len(set(identities.tolist())) - inserted}
+
+    def table_counts(self) -> Dict[str, int]:
+        """Nombre d'annonces des catégories non vides"""
+        counts = {}
+        with self._connect() as connection:
+            for category in CATEGORY_SPECS:
+                count = connection.execute(f"SELECT COUNT(*) FROM {self._table(category)}").fetchone()[0]
+                if count:
+                    counts[category] = count
+        return counts
+
+    def count(self, category: str, categories: Optional[Dict[str, Sequence]] = None,
+              ranges: Optional[Dict[str, Tuple]] = None) -> int:
+        """Nombre d'annonces qui satisfont les filtres"""
+        where, params = _where(categories, ranges)
+        with self._connect() as connection:
+            return connection.execute(f"SELECT COUNT(*) FROM {self._table(category)}{where}", params).fetchone()[0]
+
+    def means(self, category: str, columns: Sequence[str]) -> Dict[str, Optional[float]]:
+        """Moyennes de plusieurs colonnes en une requête (valeurs manquantes ignorées)"""
+        if not columns:
+            return {}
+        select = ", ".join(f"AVG({self._column(category, column)})" for column in columns)
+        with self._connect() as connection:
+            row = connection.execute(f"SELECT {select} FROM {self._table(category)}").fetchone()
+        return dict(zip(columns, row))
+
+    def top_counts(self, category: str, column: str, n: Optional[int] = None) -> pd.Series:
+        """Effectifs des valeurs les plus fréquentes (GROUP BY sur l'index quand il existe)"""
+        quoted = self._column(category, column)
+        sql = (f"SELECT {quoted}, COUNT(*) FROM {self._table(category)} WHERE {quoted} IS NOT NULL "
+               f"GROUP BY {quoted} ORDER BY COUNT(*) DESC, {quoted}")
+        params = []
+        if n is not None:
+            sql += " LIMIT ?"
+            params.append(n)
+        with self._connect() as connection:
+            rows = connection.execute(sql, params).fetchall()
+        return pd.Series([count for _, count in rows], index=pd.Index([value for value, _ in rows], name=column),
+                         name='count', dtype='int64')
+
+    def group_means(self, category: str, by: str, column: str, categories: Optional[Dict[str, Sequence]] = None,
+                    ranges: Optional[Dict[str, Tuple]] = None) -> pd.Series:
+        """Moyenne d'une colonne par groupe, parmi les annonces filtrées, triée par ordre décroissant"""
+        quoted_by, quoted = self._column(category, by), self._column(category, column)
+        where, params = _where(categories, ranges)
+        where = where + (" AND " if where else " WHERE ") + f"{quoted_by} IS NOT NULL"
+        sql = (f"SELECT {quoted_by}, AVG({quoted}) FROM {self._table(category)}{where} "
+               f"GROUP BY {quoted_by} HAVING COUNT({quoted}) > 0 ORDER BY 2 DESC")
+        with self._connect() as connection:
+            rows = connection.execute(sql, params).fetchall()
+        return pd.Series([mean for _, mean in rows], index=pd.Index([value for value, _ in rows], name=by),
+                         name=column, dtype='float64')
+
+    def histogram_bins(self, category: str, column: str, nbins: int = 30,
+                       ranges: Optional[Dict[str, Tuple]] = None) -> pd.DataFrame:
+        """
+        Histogramme à classes de même largeur calculé par SQLite, avec les
+        mêmes classes que aggregates.histogram_bins (bornes de NumPy).
+        """
+        table, quoted = self._table(category), self._column(category, column)
+        where, params = _where(None, {column: (None, None), **(ranges or {})})
+        with self._connect() as connection:
+            low, high = connection.execute(f"SELECT MIN({quoted}), MAX({quoted}) FROM {table}{where}",
+                                           params).fetchone()
+            if low is None:
+                return pd.DataFrame(columns=['début', 'fin', 'centre', 'effectif'])
+            edges = np.histogram_bin_edges(np.array([low, high], dtype='float64'), bins=nbins)
+            width = edges[-1] - edges[0]
+            rows = connection.execute(
+                f"SELECT MIN(CAST(({quoted} - ?) * ? / ? AS INTEGER), ?) AS classe, COUNT(*) "
+                f"FROM {table}{where} GROUP BY classe",
+                [edges[0], nbins, width, nbins - 1] + params
+            ).fetchall()
+        counts = np.zeros(nbins, dtype='int64')
+        for index, count in rows:
+            counts[index] = count
+        return pd.DataFrame({
+            'début': edges[:-1],
+            'fin': edges[1:],
+            'centre': (edges[:-1] + edges[1:]) / 2,
+            'effectif': counts,
+        })
+
+    def options(self, category: str, column: str) -> List:
+        """Valeurs distinctes d'une colonne, triées"""
+        quoted = self._column(category, column)
+        with self._connect() as connection:
+            rows = connection.execute(f"SELECT DISTINCT {quoted} FROM {self._table(category)} "
+                                      f"WHERE {quoted} IS NOT NULL ORDER BY {quoted}").fetchall()
+        return [value for value, in rows]
+
+    def bounds(self, category: str, column: str) -> Optional[Tuple[float, float]]:
+        """Minimum et maximum d'une colonne, ou None si elle n'a aucune valeur"""
+        quoted = self._column(category, column)
+        with self._connect() as connection:
+            low, high = connection.execute(f"SELECT MIN({quoted}), MAX({quoted}) "
+                                           f"FROM {self._table(category)}").fetchone()
+        return None if low is None else (low, high)
+
+    def page(self, category: str, categories: Optional[Dict[str, Sequence]] = None,
+             ranges: Optional[Dict[str, Tuple]] = None, sort_column: Optional[str] = None,
+             ascending: bool = True, start: int = 0, size: int = 50) -> pd.DataFrame:
+        """
+        Une page d'annonces filtrées, triées par SQLite (valeurs manquantes en
+        dernier, puis ordre d'insertion), avec le schéma compact.
+        """
+        columns = ", ".join(_quote(column) for column in store_columns(category))
+        where, params = _where(categories, ranges)
+        order = "rowid"
+        if sort_column is not None:
+            quoted = self._column(category, sort_column)
+            order = f"{quoted} IS NULL, {quoted} {'ASC' if ascending else 'DESC'}, rowid"
+        sql = f"SELECT {columns} FROM {self._table(category)}{where} ORDER BY {order} LIMIT ? OFFSET ?"
+        with self._connect() as connection:
+            df = pd.read_sql_query(sql, connection, params=params + [size, start])
+        return apply_schema(df)
+
+    def export_csv(self, category: str, path: Path) -> int:
+        """
+        Écrit la table d'une catégorie dans un CSV, morceau par morceau : un
+        seul morceau de EXPORT_CHUNK_ROWS lignes est en mémoire à la fois.
+        Le fichier est remplacé atomiquement. Retourne le nombre d'annonces.
+        """
+        path = Path(path)
+        tmp_path = path.with_name(path.name + '.tmp')
+        columns = ", ".join(_quote(column) for column in store_columns(category))
+        rows = 0
+        try:
+            with self._connect() as connection, open(tmp_path, 'w', encoding='utf-8-sig', newline='') as f:
+                chunks = pd.read_sql_query(f"SELECT {columns} FROM {self._table(category)} ORDER BY rowid",
+                                           connection, chunksize=EXPORT_CHUNK_ROWS)
+                header = True
+                for chunk in chunks:
+                    apply_schema(chunk).to_csv(f, index=False, header=header)
+                    header = False
+                    rows += len(chunk)
+                if header:
+                    pd.DataFrame(columns=list(store_columns(category))).to_csv(f, index=False)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        os.replace(tmp_path, path)
+        return rows
+
+
+# Base partagée par toutes les sessions
+listing_store = ListingStore()
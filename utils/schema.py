@@ -0,0 +1,95 @@
+"""
+Schéma de types compacts des DataFrames d'annonces
+"""
+
+import numpy as np
+import pandas as pd
+
+
+# Colonnes texte à faible cardinalité, répétées sur des milliers d'annonces
+CATEGORY_COLUMNS = ('marque', 'transmission', 'carburant', 'adresse')
+
+# Colonnes numériques converties en entiers nullables, du plus petit type suffisant
+INTEGER_COLUMNS = ('année', 'km_numerique', 'prix_numerique')
+
+# Colonnes gardées en texte telles quelles (« Prix sur demande », « 0 km »...)
+TEXT_COLUMNS = ('titre', 'prix', 'kilométrage', 'propriétaire')
+
+# Types imposés à la lecture d'un CSV : pas d'inférence sur ces colonnes.
+# Les entiers sont compactés après lecture (leur plus petit type dépend des valeurs).
+CSV_DTYPES = {
+    **{column: 'category' for column in CATEGORY_COLUMNS},
+    **{column: 'str' for column in TEXT_COLUMNS},
+}
+
+_INTEGER_TYPES = [
+    (np.iinfo(np.uint8).max, 'UInt8'),
+    (np.iinfo(np.uint16).max, 'UInt16'),
+    (np.iinfo(np.uint32).max, 'UInt32'),
+    (np.iinfo(np.uint64).max, 'UInt64'),
+]
+
+
+def compact_integers(values: pd.Series) -> pd.Series:
+    """
+    Convertit une colonne en entier nullable non signé le plus petit possible
+    (UInt8 à UInt64). La colonne est laissée telle quelle si la conversion
+    perdrait de l'information (texte non numérique, décimales, négatifs).
+    """
+    if values.empty:
+        return values
+    # Les chaînes vides des données brutes sont des valeurs manquantes
+    present_values = values.replace('', None)
+    numbers = pd.to_numeric(present_values, errors='coerce')
+    if numbers.isna().sum() != present_values.isna().sum():
+        return values
+    present = numbers.dropna()
+    if present.empty:
+        return numbers.astype('UInt8')
+    if (present < 0).any() or (present % 1 != 0).any():
+        return values
+    maximum = present.max()
+    for limit, dtype in _INTEGER_TYPES:
+        if maximum <= limit:
+            return numbers.astype(dtype)
+    return values
+
+
+def apply_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Applique le schéma compact : colonnes à faible cardinalité en `category`,
+    année, kilométrage et prix en entiers nullables compacts. Les autres
+    colonnes sont inchangées.
+    """
+    typed = df.copy()
+    for column in CATEGORY_COLUMNS:
+        if column in typed.columns and not isinstance(typed[column].dtype, pd.CategoricalDtype):
+            typed[column] = typed[column].astype('category')
+    for column in INTEGER_COLUMNS:
+        if column in typed.columns:
+            typed[column] = compact_integers(typed[column])
+    return typed
+
+
+def read_dataset(source, **kwargs) -> pd.DataFrame:
+    """Lit un CSV d'annonces avec les types imposés puis applique le schéma compact"""
+    kwargs.setdefault('encoding', 'utf-8-sig')
+    kwargs.setdefault('dtype', CSV_DTYPES)
+    return apply_schema(pd.read_csv(source, **kwargs))
+
+
+def memory_report(before: pd.DataFrame, after: pd.DataFrame) -> pd.DataFrame:
+    """
+    Octets par ligne de chaque colonne avant et après typage. Les colonnes
+    ajoutées entre-temps (prix_numerique...) n'ont pas de valeur « avant ».
+    """
+    rows = max(len(before), 1)
+    columns = list(before.columns) + [column for column in after.columns if column not in before.columns]
+    report = pd.DataFrame(index=columns, data={
+        'Type avant': [str(before[column].dtype) if column in before else '' for column in columns],
+        'Type après': [str(after[column].dtype) if column in after else '' for column in columns],
+        'Octets/ligne avant': before.memory_usage(deep=True, index=False).reindex(columns) / rows,
+        'Octets/ligne après': after.memory_usage(deep=True, index=False).reindex(columns) / rows,
+    })
+    report.loc['Total'] = ['', '', report['Octets/ligne avant'].sum(), report['Octets/ligne après'].sum()]
+    return report.round(1)
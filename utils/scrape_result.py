@@ -0,0 +1,141 @@
+"""
+Résultat d'un scraping gardé en session : compteurs et aperçu, annonces sur disque
+"""
+
+import os
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, List
+
+import numpy as np
+import pandas as pd
+
+from utils.schema import CSV_DTYPES, apply_schema, memory_report
+from utils.scraper import clean_dataframe
+from utils.specs import CATEGORY_SPECS
+
+
+DEFAULT_CHUNK_ROWS = 50_000
+
+# Lignes gardées en session pour l'aperçu, les types et les statistiques descriptives
+PREVIEW_ROWS = 1_000
+
+# CSV des résultats sans CSV brut (scraping en mémoire, ré-extraction) et des
+# résultats nettoyés ; supprimés à l'arrêt du processus
+_scratch = tempfile.TemporaryDirectory(prefix='scraping_')
+
+
+@dataclass
+class ScrapeResult:
+    """
+    Résultat d'un scraping tel que gardé dans st.session_state : des
+    compteurs et un aperçu d'au plus PREVIEW_ROWS lignes, jamais les
+    annonces elles-mêmes. Elles restent dans le CSV `path` (texte brut, ou
+    nettoyé si `cleaned`), relu par morceaux pour la sauvegarde et le
+    téléchargement.
+    """
+    category: str
+    path: Path
+    cleaned: bool
+    rows: int
+    columns: List[str]
+    missing: int
+    duplicates: int
+    preview: pd.DataFrame
+    memory: pd.DataFrame
+    scratch: bool = False  # fichier temporaire propre au résultat
+
+    def iter_chunks(self, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+        """Annonces par morceaux : texte brut, ou nettoyées avec le schéma compact"""
+        yield from _read_chunks(self.path, self.cleaned, chunk_rows)
+
+    def discard(self):
+        """Supprime le fichier temporaire du résultat (jamais le CSV brut d'un crawl)"""
+        if self.scratch:
+            self.path.unlink(missing_ok=True)
+
+
+def _scratch_path(category: str, label: str) -> Path:
+    fd, name = tempfile.mkstemp(suffix='.csv', prefix=f"{category}_{label}_", dir=_scratch.name)
+    os.close(fd)
+    return Path(name)
+
+
+def _read_chunks(path: Path, cleaned: bool, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    if cleaned:
+        with pd.read_csv(path, encoding='utf-8-sig', dtype=CSV_DTYPES, chunksize=chunk_rows) as reader:
+            for chunk in reader:
+                yield apply_schema(chunk)
+    else:
+        # Colonnes relues en texte, comme après un scraping en mémoire
+        with pd.read_csv(path, encoding='utf-8-sig', dtype=str, keep_default_na=False,
+                         chunksize=chunk_rows) as reader:
+            yield from reader
+
+
+def summarize_scrape(path: Path, category: str, clean: bool = False, scratch: bool = False,
+                     chunk_rows: int = DEFAULT_CHUNK_ROWS) -> ScrapeResult:
+    """
+    Parcourt un CSV brut par morceaux et n'en garde que les compteurs (lignes,
+    valeurs manquantes, doublons) et l'aperçu, avec le schéma compact. Avec
+    `clean`, les morceaux nettoyés sont écrits dans un CSV temporaire qui
+    devient le fichier du résultat. `scratch` indique que `path` est un
+    fichier temporaire, supprimé avec le résultat.
+    """
+    path = Path(path)
+    cleaned_path = _scratch_path(category, 'nettoyees') if clean else None
+    rows = 0
+    missing = 0
+    columns: List[str] = []
+    row_hashes = []
+    preview = []
+    memory = None
+    try:
+        with open(cleaned_path or os.devnull, 'w', encoding='utf-8-sig', newline='') as output:
+            for chunk in _read_chunks(path, False, chunk_rows):
+                view = clean_dataframe(chunk, category) if clean else apply_schema(chunk)
+                if clean:
+                    view.to_csv(output, index=False, header=not columns)
+                if memory is None:
+                    columns = list(view.columns)
+                    memory = memory_report(chunk.head(PREVIEW_ROWS), view.head(PREVIEW_ROWS))
+                if rows < PREVIEW_ROWS:
+                    preview.append(view.head(PREVIEW_ROWS - rows))
+                rows += len(view)
+                missing += int(view.isnull().sum().sum())
+                # 8 octets par annonce pour compter les doublons entre morceaux
+                row_hashes.append(pd.util.hash_pandas_object(view, index=False).to_numpy())
+    except BaseException:
+        if cleaned_path is not None:
+            cleaned_path.unlink(missing_ok=True)
+        raise
+    if clean and scratch:
+        path.unlink(missing_ok=True)
+
+    hashes = np.concatenate(row_hashes) if row_hashes else np.empty(0, dtype=np.uint64)
+    return ScrapeResult(
+        category=category,
+        path=cleaned_path or path,
+        cleaned=clean,
+        rows=rows,
+        columns=columns,
+        missing=missing,
+        duplicates=len(hashes) - len(np.unique(hashes)),
+        preview=apply_schema(pd.concat(preview, ignore_index=True)) if preview else pd.DataFrame(columns=columns),
+        memory=memory,
+        scratch=scratch or clean,
+    )
+
+
+def summarize_frame(df: pd.DataFrame, category: str, clean: bool = False) -> ScrapeResult:
+    """
+    Résultat d'annonces extraites en mémoire (scraping sans CSV brut,
+    ré-extraction depuis l'archive) : elles sont écrites dans un CSV
+    temporaire, puis résumées comme un CSV brut.
+    """
+    if df.columns.empty:
+        df = pd.DataFrame(columns=CATEGORY_SPECS[category].columns)
+    path = _scratch_path(category, 'brutes')
+    df.to_csv(path, index=False, encoding='utf-8-sig')
+    return summarize_scrape(path, category, clean=clean, scratch=True)
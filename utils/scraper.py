@@ -2,40 +2,142 @@
 Module de scraping pour dakar-auto.com
 """
 
-import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+import os
 import pandas as pd
+import queue
 import re
+import threading
 import time
-from typing import List, Dict, Optional
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
+from utils.archive import html_archive
+from utils.extractors import (
+    CARD_CLASS,
+    PAGINATOR_CLASS,
+    compile_card_extractor,
+    extract_listings,
+    scan_page
+)
+from utils.http_cache import http_cache
+from utils.http_client import rate_limiter
+from utils.schema import apply_schema
+from utils.specs import CATEGORY_SPECS
 
-def get_page_content(url: str) -> Optional[BeautifulSoup]:
-    """Récupère et parse le contenu HTML d'une page"""
+
+# Paramètres par défaut du mode concurrent
+DEFAULT_MAX_WORKERS = 4
+
+# Profondeur des files du pipeline téléchargement -> parsing
+DEFAULT_FETCH_QUEUE_SIZE = 16
+DEFAULT_PARSE_QUEUE_SIZE = 8
+
+# Backend d'extraction des cartes : 'lxml' (XPath compilés) ou 'bs4' (BeautifulSoup)
+PARSER_BACKENDS = ('lxml', 'bs4')
+DEFAULT_PARSER_BACKEND = 'lxml'
+
+# Parse partiel : seuls les sous-arbres des cartes et de la pagination sont construits
+def _is_listing_class(value) -> bool:
+    """Vrai si l'attribut class contient la classe d'une carte ou de la pagination"""
+    if not value:
+        return False
+    tokens = value.split() if isinstance(value, str) else value
+    return CARD_CLASS in tokens or PAGINATOR_CLASS in tokens
+
+
+LISTING_STRAINER = SoupStrainer(['div', 'nav'], class_=_is_listing_class)
+
+# Nombre d'échecs de téléchargement consécutifs avant d'abandonner le crawl
+MAX_CONSECUTIVE_FAILURES = 5
+
+# Marqueur de fin de la file des pages brutes
+_END_OF_PAGES = object()
+
+# Durée de validité (s) du nombre de pages détecté, partagé entre les sessions
+PAGE_COUNT_TTL = 300
+
+# Borne de la recherche de la dernière page quand la pagination est tronquée
+MAX_PROBED_PAGE = 3000
+
+
+def fetch_page_bytes(url: str) -> Optional[bytes]:
+    """
+    Télécharge le contenu HTML brut d'une page (sans parsing), via le cache
+    HTTP. Chaque nouvelle version d'une page est ajoutée à l'archive HTML.
+    """
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=10, allow_redirects=True)
-        response.raise_for_status()
-        return BeautifulSoup(response.content, 'lxml')
+        content = http_cache.fetch(url)
     except Exception as e:
         print(f"Erreur lors de la récupération de {url}: {e}")
         return None
+    try:
+        html_archive.add(url, content)
+    except OSError as e:
+        print(f"Archivage impossible pour {url}: {e}")
+    return content
 
 
-def get_total_pages(base_url: str) -> int:
-    """Détecte automatiquement le nombre total de pages"""
-    soup = get_page_content(base_url)
-    if not soup:
-        return 1
+def parse_html(content: bytes, parse_only: Optional[SoupStrainer] = None) -> BeautifulSoup:
+    """Parse un contenu HTML brut (éventuellement limité aux sous-arbres de parse_only)"""
+    return BeautifulSoup(content, 'lxml', parse_only=parse_only)
+
+
+def get_page_content(url: str, parse_only: Optional[SoupStrainer] = None) -> Optional[BeautifulSoup]:
+    """Récupère et parse le contenu HTML d'une page"""
+    content = fetch_page_bytes(url)
+    if content is None:
+        return None
+    return parse_html(content, parse_only)
+
+
+def build_page_url(base_url: str, page: int) -> str:
+    """Construit l'URL d'une page de résultats"""
+    return f"{base_url}?page={page}" if page > 1 else base_url
+
+
+def fetch_pages(urls: Iterable[str], max_workers: int = DEFAULT_MAX_WORKERS,
+                fetch: Callable[[str], Optional[object]] = None) -> Iterator[Optional[object]]:
+    """
+    Récupère des pages en parallèle avec un pool de threads borné.
+    Le débit réseau est plafonné par le limiteur global de la couche HTTP
+    (les pages servies par le cache ne consomment pas de jeton). Les
+    résultats de `fetch` (page parsée par défaut) sont renvoyés dans l'ordre
+    des URLs. Fermer le générateur annule les requêtes encore en attente.
+    """
+    task = fetch or get_page_content
+
+    url_iter = iter(urls)
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        # Fenêtre bornée de requêtes en vol pour garder la mémoire constante
+        pending = deque(executor.submit(task, url) for url in islice(url_iter, max(1, max_workers) * 2))
+        try:
+            while pending:
+                result = pending.popleft().result()
+                next_url = next(url_iter, None)
+                if next_url is not None:
+                    pending.append(executor.submit(task, next_url))
+                yield result
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def _scan_page_bs4(content: bytes) -> Tuple[int, int]:
+    """Équivalent BeautifulSoup de scan_page (backend de repli)"""
+    # Seules les cartes et la pagination sont matérialisées
+    soup = parse_html(content, LISTING_STRAINER)
+    cards = len(soup.find_all('div', class_=CARD_CLASS))
+    max_page = 1
     
     try:
         paginator = soup.find('nav', class_='paginator')
         if paginator:
             # Trouver tous les liens de pagination
             page_links = paginator.find_all('a', class_='page-link')
-            max_page = 1
             
             for link in page_links:
                 # Extraire le numéro de page de l'URL
@@ -46,12 +148,128 @@ def get_total_pages(base_url: str) -> int:
                     # Prendre le dernier paramètre page= (le vrai numéro)
                     page_num = int(matches[-1])
                     max_page = max(max_page, page_num)
-            
-            return max_page
     except Exception as e:
         print(f"Erreur lors de la détection du nombre de pages: {e}")
     
-    return 1
+    return cards, max_page
+
+
+def scan_listing_page(content: bytes, backend: str = DEFAULT_PARSER_BACKEND) -> Tuple[int, int]:
+    """Nombre de cartes d'une page brute et plus grand numéro de page de sa pagination"""
+    if backend == 'lxml':
+        try:
+            return scan_page(content)
+        except Exception as e:
+            print(f"Extraction lxml impossible, repli sur BeautifulSoup: {e}")
+    return _scan_page_bs4(content)
+
+
+def _probe_page(base_url: str, page: int, backend: str) -> Tuple[int, int]:
+    """Télécharge une page et retourne (nombre de cartes, page maximale référencée)"""
+    content = fetch_page_bytes(build_page_url(base_url, page))
+    if content is None:
+        return 0, 1
+    return scan_listing_page(content, backend)
+
+
+def find_last_page(base_url: str, low: int, high: Optional[int] = None,
+                   backend: str = DEFAULT_PARSER_BACKEND) -> int:
+    """
+    Dernière page non vide, sachant que la page `low` contient des annonces
+    et que la page `high` est vide. Sans `high`, une recherche exponentielle
+    (low*2, low*4...) le trouve d'abord ; une dichotomie termine la recherche.
+    """
+    if high is None:
+        high = low * 2
+        while high <= MAX_PROBED_PAGE and _probe_page(base_url, high, backend)[0]:
+            low, high = high, high * 2
+        high = min(high, MAX_PROBED_PAGE + 1)
+    
+    while high - low > 1:
+        middle = (low + high) // 2
+        if _probe_page(base_url, middle, backend)[0]:
+            low = middle
+        else:
+            high = middle
+    return low
+
+
+@dataclass
+class PageCount:
+    """Nombre de pages d'une catégorie et première page déjà extraite"""
+    total: int
+    first_page: Optional[Tuple[List[Dict], List[str]]]
+    detected_at: float
+    
+    def is_fresh(self, ttl: float = PAGE_COUNT_TTL) -> bool:
+        return time.time() - self.detected_at < ttl
+
+
+# Détections récentes par (URL, catégorie, backend), communes à toutes les sessions Streamlit
+_page_counts: Dict[Tuple[str, Optional[str], str], PageCount] = {}
+_page_counts_lock = threading.Lock()
+
+
+def detect_page_count(base_url: str, category: Optional[str] = None,
+                      backend: str = DEFAULT_PARSER_BACKEND, ttl: float = PAGE_COUNT_TTL) -> PageCount:
+    """
+    Détecte le nombre de pages à partir de la pagination de la page 1.
+    Le résultat (et la page 1 extraite, si la catégorie est donnée) est gardé
+    ttl secondes pour toutes les sessions. La pagination est vérifiée sur la
+    dernière page annoncée ; si elle est tronquée ou surestimée, la dernière
+    page non vide est recherchée (exponentielle puis dichotomie).
+    Cache HTTP désactivé : la détection est toujours refaite.
+    """
+    key = (base_url, category, backend)
+    cached = _fresh_page_count(key, ttl)
+    if cached is not None:
+        return cached
+    
+    content = fetch_page_bytes(base_url)
+    if content is None:
+        return PageCount(1, None, time.time())
+    
+    cards, total = scan_listing_page(content, backend)
+    first_page = parse_listing_page(content, category, backend) if category else None
+    
+    if cards and total > 1:
+        # La page annoncée comme dernière passe ensuite par le cache HTTP
+        last_cards, last_max_page = _probe_page(base_url, total, backend)
+        if not last_cards:
+            total = find_last_page(base_url, 1, total, backend)
+        elif last_max_page > total:
+            total = find_last_page(base_url, total, backend=backend)
+    
+    count = PageCount(total, first_page, time.time())
+    with _page_counts_lock:
+        _page_counts[key] = count
+    return count
+
+
+def _fresh_page_count(key: Tuple[str, Optional[str], str], ttl: float) -> Optional[PageCount]:
+    """Détection récente, ignorée quand le cache HTTP est désactivé (pages toujours relues)"""
+    if not http_cache.enabled:
+        return None
+    with _page_counts_lock:
+        cached = _page_counts.get(key)
+    return cached if cached is not None and cached.is_fresh(ttl) else None
+
+
+def cached_first_page(base_url: str, category: str, backend: str = DEFAULT_PARSER_BACKEND,
+                      ttl: float = PAGE_COUNT_TTL) -> Optional[Tuple[List[Dict], List[str]]]:
+    """Page 1 extraite par ce backend lors d'une détection récente, si elle existe"""
+    cached = _fresh_page_count((base_url, category, backend), ttl)
+    return cached.first_page if cached is not None else None
+
+
+def clear_page_counts():
+    with _page_counts_lock:
+        _page_counts.clear()
+
+
+def get_total_pages(base_url: str, backend: str = DEFAULT_PARSER_BACKEND, category: Optional[str] = None) -> int:
+    """Détecte automatiquement le nombre total de pages"""
+    return detect_page_count(base_url, category, backend).total
 
 
 def clean_text(text: str) -> str:
@@ -76,315 +294,364 @@ def extract_number(text: str) -> Optional[float]:
     return None
 
 
-def scrape_voitures_brut(base_url: str, max_pages: int = None, progress_callback=None) -> List[Dict]:
+def _parse_listing_page_bs4(content: bytes, category: str) -> Tuple[List[Dict], List[str]]:
+    """Extraction avec BeautifulSoup (backend de repli), limitée aux cartes et à la pagination"""
+    soup = parse_html(content, LISTING_STRAINER)
+    parse_card = compile_card_extractor(category, 'bs4')
+    records, errors = [], []
+    
+    for article in soup.find_all('div', class_='listings-cards__list-item'):
+        try:
+            records.append(parse_card(article))
+        except Exception as e:
+            errors.append(str(e))
+    
+    return records, errors
+
+
+def parse_listing_page(content: bytes, category: str,
+                       backend: str = DEFAULT_PARSER_BACKEND) -> Tuple[List[Dict], List[str]]:
     """
-    Scrape les données brutes des voitures (SANS NETTOYAGE)
-    Variables: titre, marque, année, prix, kilométrage, transmission, carburant, adresse
+    Parse une page brute et extrait les annonces de la catégorie.
+    Fonction de niveau module pour pouvoir être exécutée dans un processus
+    de parsing. Retourne les annonces et les erreurs rencontrées par carte.
+    Le backend 'lxml' (XPath compilés) retombe sur BeautifulSoup en cas d'échec.
     """
-    if max_pages is None:
-        if progress_callback:
-            progress_callback("🔍 Détection du nombre total de pages...")
-        max_pages = get_total_pages(base_url)
-        if progress_callback:
-            progress_callback(f"✓ {max_pages} pages détectées\n")
+    if backend == 'lxml':
+        try:
+            return extract_listings(content, category)
+        except Exception as e:
+            print(f"Extraction lxml impossible, repli sur BeautifulSoup: {e}")
     
-    all_data = []
+    return _parse_listing_page_bs4(content, category)
+
+
+def iter_listing_pages(base_url: str, max_pages: int, category: str,
+                       max_workers: int = DEFAULT_MAX_WORKERS,
+                       parse_workers: int = 0,
+                       fetch_queue_size: int = DEFAULT_FETCH_QUEUE_SIZE,
+                       parse_queue_size: int = DEFAULT_PARSE_QUEUE_SIZE,
+                       backend: str = DEFAULT_PARSER_BACKEND,
+                       page_numbers: Optional[Iterable[int]] = None,
+                       first_page: Optional[Tuple[List[Dict], List[str]]] = None,
+                       fetch: Callable[[str], Optional[bytes]] = None
+                       ) -> Iterator[Tuple[int, Optional[Tuple[List[Dict], List[str]]]]]:
+    """
+    Pipeline en deux étapes : téléchargement puis parsing des pages.
+    Avec parse_workers=0, le parsing se fait dans le thread appelant.
+    Sinon, les fetchers déposent les octets bruts dans une file bornée
+    (fetch_queue_size) et un ProcessPoolExecutor les transforme en annonces,
+    avec au plus parse_queue_size pages en cours de parsing.
+    Produit (page, (annonces, erreurs)) dans l'ordre, ou (page, None) si la
+    page n'a pas pu être récupérée. page_numbers restreint le crawl à une
+    liste de pages (reprise), sinon les pages 1 à max_pages sont parcourues.
+    first_page, résultat déjà extrait de la page 1, évite de la re-télécharger.
+    fetch remplace le téléchargement (ex: lecture de l'archive HTML).
+    """
+    fetch = fetch or fetch_page_bytes
+    page_numbers = list(page_numbers) if page_numbers is not None else list(range(1, max_pages + 1))
+    if first_page is not None and page_numbers and page_numbers[0] == 1:
+        yield 1, first_page
+        page_numbers = page_numbers[1:]
+    urls = (build_page_url(base_url, page) for page in page_numbers)
     
-    for page in range(1, max_pages + 1):
-        if progress_callback:
-            progress_callback(f"📄 Scraping page {page}/{max_pages}...")
-        
-        url = f"{base_url}?page={page}" if page > 1 else base_url
-        soup = get_page_content(url)
-        
-        if not soup:
-            if progress_callback:
-                progress_callback(f"❌ Impossible de récupérer la page {page}, arrêt.")
-            break
-            
-        articles = soup.find_all('div', class_='listings-cards__list-item')
-        
-        if not articles:
-            if progress_callback:
-                progress_callback(f"⚠️ Aucun article trouvé sur la page {page}, arrêt.")
-            break
-            
-        for article in articles:
+    if parse_workers <= 0:
+        pages = fetch_pages(urls, max_workers=max_workers, fetch=fetch)
+        try:
+            for page, content in zip(page_numbers, pages):
+                yield page, (parse_listing_page(content, category, backend) if content is not None else None)
+        finally:
+            pages.close()
+        return
+    
+    raw_queue = queue.Queue(maxsize=max(1, fetch_queue_size))
+    stop = threading.Event()
+    
+    def put(item) -> bool:
+        while not stop.is_set():
             try:
-                data = {}
-                
-                # V1: Titre - BRUT
-                title_elem = article.find('h2', class_='listing-card__header__title')
-                if title_elem:
-                    title_link = title_elem.find('a')
-                    data['titre'] = title_link.get_text().strip() if title_link else title_elem.get_text().strip()
-                else:
-                    data['titre'] = ""
-                
-                # V2: Marque
-                data['marque'] = ""
-                if data['titre']:
-                    words = data['titre'].split()
-                    if words:
-                        data['marque'] = words[0]
-                
-                # V3: Année
-                data['année'] = ""
-                if data['titre']:
-                    year_match = re.search(r'\b(19|20)\d{2}\b', data['titre'])
-                    if year_match:
-                        data['année'] = year_match.group()
-                
-                # V4: Prix - BRUT
-                price_elem = article.find('h3', class_='listing-card__header__price')
-                data['prix'] = price_elem.get_text().strip() if price_elem else ""
-                
-                # V5-V7: Attributs (kilométrage, transmission, carburant) - BRUT
-                data['kilométrage'] = ""
-                data['transmission'] = ""
-                data['carburant'] = ""
-                
-                attributes = article.find_all('li', class_='listing-card__attribute')
-                for i, attr in enumerate(attributes[:3]):
-                    text = attr.get_text().strip()
-                    if i == 0:
-                        data['kilométrage'] = text
-                    elif i == 1:
-                        data['transmission'] = text
-                    elif i == 2:
-                        data['carburant'] = text
-                
-                # V8: Adresse - BRUT
-                address_parts = []
-                town_elem = article.find('span', class_='town-suburb')
-                if town_elem:
-                    address_parts.append(town_elem.get_text().strip())
-                province_elem = article.find('span', class_='province')
-                if province_elem:
-                    address_parts.append(province_elem.get_text().strip())
-                data['adresse'] = ' '.join(address_parts)
-                
-                all_data.append(data)
-                
-            except Exception as e:
-                if progress_callback:
-                    progress_callback(f"⚠️ Erreur article: {e}")
+                raw_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
                 continue
-        
-        if page < max_pages:
-            time.sleep(1)
+        return False
     
-    if progress_callback:
-        progress_callback(f"\n✅ Total voitures scrapées: {len(all_data)}")
+    def produce():
+        pages = fetch_pages(urls, max_workers=max_workers, fetch=fetch)
+        try:
+            for page, content in zip(page_numbers, pages):
+                if not put((page, content)):
+                    break
+        finally:
+            pages.close()
+            put(_END_OF_PAGES)
     
-    return all_data
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    
+    try:
+        with ProcessPoolExecutor(max_workers=parse_workers) as executor:
+            pending = deque()
+            exhausted = False
+            while True:
+                while not exhausted and len(pending) < max(1, parse_queue_size):
+                    item = raw_queue.get()
+                    if item is _END_OF_PAGES:
+                        exhausted = True
+                        break
+                    page, content = item
+                    future = executor.submit(parse_listing_page, content, category, backend) if content is not None else None
+                    pending.append((page, future))
+                
+                if not pending:
+                    break
+                
+                page, future = pending.popleft()
+                try:
+                    yield page, (future.result() if future is not None else None)
+                except GeneratorExit:
+                    for _, other in pending:
+                        if other is not None:
+                            other.cancel()
+                    raise
+    finally:
+        stop.set()
+        producer.join()
 
 
-def scrape_motos_brut(base_url: str, max_pages: int = None, progress_callback=None) -> List[Dict]:
+def iter_category_pages(base_url: str, category: str, max_pages: int = None, progress_callback=None,
+                        max_workers: int = DEFAULT_MAX_WORKERS, parse_workers: int = 0,
+                        fetch_queue_size: int = DEFAULT_FETCH_QUEUE_SIZE,
+                        parse_queue_size: int = DEFAULT_PARSE_QUEUE_SIZE,
+                        backend: str = DEFAULT_PARSER_BACKEND,
+                        page_numbers: Optional[Iterable[int]] = None,
+                        end_callback: Optional[Callable[[int], None]] = None,
+                        fetch: Callable[[str], Optional[bytes]] = None) -> Iterator[Tuple[int, List[Dict]]]:
     """
-    Scrape les données brutes des motos (SANS NETTOYAGE)
-    Variables: titre, marque, année, prix, kilométrage, adresse
+    API de scraping en flux : produit (page, annonces) dès qu'une page est
+    extraite, sans accumuler les annonces en mémoire. La catégorie est décrite
+    dans CATEGORY_SPECS. Le moteur gère la pagination, les conditions d'arrêt
+    et l'extraction des champs selon la spécification compilée.
+    Une page impossible à récupérer est ignorée (elle pourra être reprise) ;
+    le crawl s'arrête après MAX_CONSECUTIVE_FAILURES échecs consécutifs ou à
+    la première page sans annonce, signalée à end_callback.
+    fetch remplace le téléchargement des pages (ex: archive HTML).
     """
     if max_pages is None:
         if progress_callback:
             progress_callback("🔍 Détection du nombre total de pages...")
-        max_pages = get_total_pages(base_url)
+        max_pages = get_total_pages(base_url, backend, category)
         if progress_callback:
             progress_callback(f"✓ {max_pages} pages détectées\n")
     
-    all_data = []
+    # La page 1 lue par une détection récente n'est ni re-téléchargée ni re-parsée
+    first_page = cached_first_page(base_url, category, backend) if fetch is None else None
     
-    for page in range(1, max_pages + 1):
-        if progress_callback:
-            progress_callback(f"📄 Scraping page {page}/{max_pages}...")
-        
-        url = f"{base_url}?page={page}" if page > 1 else base_url
-        soup = get_page_content(url)
-        
-        if not soup:
-            if progress_callback:
-                progress_callback(f"❌ Impossible de récupérer la page {page}, arrêt.")
-            break
-            
-        articles = soup.find_all('div', class_='listings-cards__list-item')
-        
-        if not articles:
+    total = 0
+    failures = 0
+    
+    pages = iter_listing_pages(base_url, max_pages, category, max_workers=max_workers,
+                               parse_workers=parse_workers, fetch_queue_size=fetch_queue_size,
+                               parse_queue_size=parse_queue_size, backend=backend,
+                               page_numbers=page_numbers, first_page=first_page, fetch=fetch)
+    
+    try:
+        for page, result in pages:
             if progress_callback:
-                progress_callback(f"⚠️ Aucun article trouvé sur la page {page}, arrêt.")
-            break
+                progress_callback(f"📄 Scraping page {page}/{max_pages}... ({rate_limiter.rate:.1f} req/s)")
             
-        for article in articles:
-            try:
-                data = {}
-                
-                # V1: Titre - BRUT
-                title_elem = article.find('h2', class_='listing-card__header__title')
-                if title_elem:
-                    title_link = title_elem.find('a')
-                    data['titre'] = title_link.get_text().strip() if title_link else title_elem.get_text().strip()
-                else:
-                    data['titre'] = ""
-                
-                # V2: Marque
-                data['marque'] = ""
-                if data['titre']:
-                    words = data['titre'].split()
-                    if words:
-                        data['marque'] = words[0]
-                
-                # V3: Année
-                data['année'] = ""
-                if data['titre']:
-                    year_match = re.search(r'\b(19|20)\d{2}\b', data['titre'])
-                    if year_match:
-                        data['année'] = year_match.group()
-                
-                # V4: Prix - BRUT
-                price_elem = article.find('h3', class_='listing-card__header__price')
-                data['prix'] = price_elem.get_text().strip() if price_elem else ""
-                
-                # V5: Kilométrage - BRUT
-                data['kilométrage'] = ""
-                km_attr = article.find('li', class_='listing-card__attribute')
-                if km_attr:
-                    data['kilométrage'] = km_attr.get_text().strip()
-                
-                # V6: Adresse - BRUT
-                address_parts = []
-                town_elem = article.find('span', class_='town-suburb')
-                if town_elem:
-                    address_parts.append(town_elem.get_text().strip())
-                province_elem = article.find('span', class_='province')
-                if province_elem:
-                    address_parts.append(province_elem.get_text().strip())
-                data['adresse'] = ' '.join(address_parts)
-                
-                all_data.append(data)
-                
-            except Exception as e:
+            if result is None:
+                failures += 1
+                if failures >= MAX_CONSECUTIVE_FAILURES:
+                    if progress_callback:
+                        progress_callback(f"❌ Impossible de récupérer la page {page} "
+                                          f"({failures} échecs consécutifs), arrêt.")
+                    break
                 if progress_callback:
-                    progress_callback(f"⚠️ Erreur article: {e}")
+                    progress_callback(f"❌ Impossible de récupérer la page {page}, page ignorée.")
                 continue
-        
-        if page < max_pages:
-            time.sleep(1)
+            
+            failures = 0
+            records, errors = result
+            
+            if not records and not errors:
+                if progress_callback:
+                    progress_callback(f"⚠️ Aucun article trouvé sur la page {page}, arrêt.")
+                if end_callback:
+                    end_callback(page)
+                break
+            
+            if progress_callback:
+                for error in errors:
+                    progress_callback(f"⚠️ Erreur article: {error}")
+                progress_callback(f"✓ Page {page}: {len(records)} annonces extraites")
+            
+            total += len(records)
+            yield page, records
+    finally:
+        # Annule les requêtes et parsings encore en vol après un arrêt anticipé
+        pages.close()
     
     if progress_callback:
-        progress_callback(f"\n✅ Total motos scrapées: {len(all_data)}")
-    
+        progress_callback(f"\n✅ Total {category} scrapées: {total}")
+
+
+def iter_archived_pages(category: str, progress_callback=None, as_of: Optional[float] = None,
+                        **crawl_options) -> Iterator[Tuple[int, List[Dict]]]:
+    """
+    Ré-extraction hors ligne : applique les extracteurs actuels aux pages de
+    la catégorie conservées dans l'archive HTML (dernier instantané de chaque
+    page, au plus tard à la date as_of), sans aucun accès réseau. Le parsing
+    est réparti sur tous les cœurs sauf si parse_workers est précisé.
+    """
+    snapshots = html_archive.snapshots(category, as_of)
+    if progress_callback:
+        progress_callback(f"📦 {len(snapshots)} pages archivées pour {category}")
+    crawl_options.setdefault('parse_workers', os.cpu_count() or 1)
+    return iter_category_pages(CATEGORY_SPECS[category].url, category, max(snapshots, default=0),
+                               progress_callback, page_numbers=sorted(snapshots),
+                               fetch=html_archive.page_reader(category, as_of), **crawl_options)
+
+
+def scrape_category(base_url: str, category: str, max_pages: int = None, progress_callback=None,
+                    max_workers: int = DEFAULT_MAX_WORKERS, parse_workers: int = 0,
+                    fetch_queue_size: int = DEFAULT_FETCH_QUEUE_SIZE,
+                    parse_queue_size: int = DEFAULT_PARSE_QUEUE_SIZE,
+                    backend: str = DEFAULT_PARSER_BACKEND) -> List[Dict]:
+    """Scrape les données brutes d'une catégorie et les retourne en liste"""
+    all_data = []
+    for _, records in iter_category_pages(base_url, category, max_pages, progress_callback, max_workers,
+                                          parse_workers, fetch_queue_size, parse_queue_size, backend):
+        all_data.extend(records)
     return all_data
 
 
-def scrape_locations_brut(base_url: str, max_pages: int = None, progress_callback=None) -> List[Dict]:
+def scrape_voitures_brut(base_url: str, max_pages: int = None, progress_callback=None,
+                         max_workers: int = DEFAULT_MAX_WORKERS, parse_workers: int = 0,
+                         fetch_queue_size: int = DEFAULT_FETCH_QUEUE_SIZE,
+                         parse_queue_size: int = DEFAULT_PARSE_QUEUE_SIZE,
+                         backend: str = DEFAULT_PARSER_BACKEND) -> List[Dict]:
+    """
+    Scrape les données brutes des voitures (SANS NETTOYAGE)
+    Variables: titre, marque, année, prix, kilométrage, transmission, carburant, adresse
+    """
+    return scrape_category(base_url, 'voitures', max_pages, progress_callback, max_workers,
+                            parse_workers, fetch_queue_size, parse_queue_size, backend)
+
+
+def scrape_motos_brut(base_url: str, max_pages: int = None, progress_callback=None,
+                      max_workers: int = DEFAULT_MAX_WORKERS, parse_workers: int = 0,
+                      fetch_queue_size: int = DEFAULT_FETCH_QUEUE_SIZE,
+                      parse_queue_size: int = DEFAULT_PARSE_QUEUE_SIZE,
+                      backend: str = DEFAULT_PARSER_BACKEND) -> List[Dict]:
+    """
+    Scrape les données brutes des motos (SANS NETTOYAGE)
+    Variables: titre, marque, année, prix, kilométrage, adresse
+    """
+    return scrape_category(base_url, 'motos', max_pages, progress_callback, max_workers,
+                            parse_workers, fetch_queue_size, parse_queue_size, backend)
+
+
+def scrape_locations_brut(base_url: str, max_pages: int = None, progress_callback=None,
+                          max_workers: int = DEFAULT_MAX_WORKERS, parse_workers: int = 0,
+                          fetch_queue_size: int = DEFAULT_FETCH_QUEUE_SIZE,
+                          parse_queue_size: int = DEFAULT_PARSE_QUEUE_SIZE,
+                          backend: str = DEFAULT_PARSER_BACKEND) -> List[Dict]:
     """
     Scrape les données brutes des locations (SANS NETTOYAGE)
     Variables: marque, année, prix, adresse, propriétaire
     """
-    if max_pages is None:
-        if progress_callback:
-            progress_callback("🔍 Détection du nombre total de pages...")
-        max_pages = get_total_pages(base_url)
-        if progress_callback:
-            progress_callback(f"✓ {max_pages} pages détectées\n")
-    
-    all_data = []
-    
-    for page in range(1, max_pages + 1):
-        if progress_callback:
-            progress_callback(f"📄 Scraping page {page}/{max_pages}...")
-        
-        url = f"{base_url}?page={page}" if page > 1 else base_url
-        soup = get_page_content(url)
-        
-        if not soup:
-            if progress_callback:
-                progress_callback(f"❌ Impossible de récupérer la page {page}, arrêt.")
-            break
-            
-        articles = soup.find_all('div', class_='listings-cards__list-item')
-        
-        if not articles:
-            if progress_callback:
-                progress_callback(f"⚠️ Aucun article trouvé sur la page {page}, arrêt.")
-            break
-            
-        for article in articles:
-            try:
-                data = {}
-                
-                # V1: Marque - BRUT
-                title_elem = article.find('h2', class_='listing-card__header__title')
-                if title_elem:
-                    title_link = title_elem.find('a')
-                    data['marque'] = title_link.get_text().strip() if title_link else title_elem.get_text().strip()
-                else:
-                    data['marque'] = ""
-                
-                # V2: Année
-                data['année'] = ""
-                if data['marque']:
-                    year_match = re.search(r'\b(19|20)\d{2}\b', data['marque'])
-                    if year_match:
-                        data['année'] = year_match.group()
-                
-                # V3: Prix - BRUT
-                price_elem = article.find('h3', class_='listing-card__header__price')
-                data['prix'] = price_elem.get_text().strip() if price_elem else ""
-                
-                # V4: Adresse - BRUT
-                address_parts = []
-                town_elem = article.find('span', class_='town-suburb')
-                if town_elem:
-                    address_parts.append(town_elem.get_text().strip())
-                province_elem = article.find('span', class_='province')
-                if province_elem:
-                    address_parts.append(province_elem.get_text().strip())
-                data['adresse'] = ' '.join(address_parts)
-                
-                # V5: Propriétaire - BRUT
-                author_elem = article.find('p', class_='time-author')
-                if author_elem:
-                    author_link = author_elem.find('a')
-                    data['propriétaire'] = author_link.get_text().strip() if author_link else author_elem.get_text().strip()
-                else:
-                    data['propriétaire'] = ""
-                
-                all_data.append(data)
-                
-            except Exception as e:
-                if progress_callback:
-                    progress_callback(f"⚠️ Erreur article: {e}")
-                continue
-        
-        if page < max_pages:
-            time.sleep(1)
-    
-    if progress_callback:
-        progress_callback(f"\n✅ Total locations scrapées: {len(all_data)}")
-    
-    return all_data
+    return scrape_category(base_url, 'locations', max_pages, progress_callback, max_workers,
+                            parse_workers, fetch_queue_size, parse_queue_size, backend)
+
+
+# Année composée uniquement de chiffres (\d Unicode du module re)
+DIGITS_PATTERN = r'\d+'
+
+
+def _distinct(values: pd.Series) -> Tuple[pd.Series, object]:
+    """
+    Valeurs distinctes d'une colonne (manquantes traitées comme chaînes vides)
+    et codes permettant de redistribuer un résultat calculé sur celles-ci.
+    Les prix, kilométrages et adresses d'annonces se répètent beaucoup.
+    Elles sont renvoyées en colonne object : les expressions régulières
+    passent alors par le module re, et non par RE2 (pyarrow) où \\d ne
+    couvre que l'ASCII. Une colonne déjà typée par apply_schema (catégorie,
+    entier nullable) est d'abord ramenée au texte.
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype) or pd.api.types.is_numeric_dtype(values.dtype):
+        values = values.astype('string')
+    codes, uniques = pd.factorize(values.fillna(''))
+    return pd.Series(uniques, dtype=object), codes
+
+
+def _spread(result: pd.Series, codes, values: pd.Series) -> pd.Series:
+    """Redistribue sur toute la colonne un résultat calculé par valeur distincte"""
+    spread = result.take(codes)
+    spread.index, spread.name = values.index, values.name
+    # Dtype qu'aurait inféré Series.apply pour une colonne sans valeur
+    if spread.isna().all():
+        return pd.Series([None] * len(spread), index=spread.index, name=spread.name, dtype=object)
+    return spread
+
+
+def extract_numbers(values: pd.Series) -> pd.Series:
+    """Équivalent de values.apply(extract_number), calculé une fois par valeur distincte"""
+    if values.empty:
+        return values.copy()
+    text, codes = _distinct(values)
+    return _spread(text.map(extract_number).astype(float), codes, values)
+
+
+def extract_years(values: pd.Series) -> pd.Series:
+    """Équivalent de l'ancienne conversion de l'année (int si chiffres, sinon None), par valeur distincte"""
+    if values.empty:
+        return values.copy()
+    text, codes = _distinct(values)
+    is_digit = text.str.fullmatch(DIGITS_PATTERN).fillna(False).astype(bool)
+    years = pd.to_numeric(text.where(is_digit), errors='coerce')
+    unparsed = is_digit & years.isna()
+    if unparsed.any():
+        years = years.astype(float)
+        years[unparsed] = text[unparsed].map(int).astype(float)
+    if years.notna().all():
+        years = years.astype('int64')
+    return _spread(years, codes, values)
+
+
+def clean_texts(values: pd.Series) -> pd.Series:
+    """Équivalent de values.apply(clean_text), calculé une fois par valeur distincte"""
+    if values.empty:
+        return values.copy()
+    text, codes = _distinct(values)
+    return _spread(text.map(clean_text).astype('str'), codes, values)
 
 
 def clean_dataframe(df: pd.DataFrame, category: str) -> pd.DataFrame:
-    """Nettoie un DataFrame selon la catégorie"""
+    """
+    Nettoie un DataFrame selon la catégorie, avec le schéma compact. Chaque
+    conversion n'est calculée qu'une fois par valeur distincte : le gain
+    dépend de la répétition des valeurs (aucun si toutes diffèrent).
+    """
     df_cleaned = df.copy()
     
     # Nettoyage du prix
     if 'prix' in df_cleaned.columns:
-        df_cleaned['prix_numerique'] = df_cleaned['prix'].apply(extract_number)
+        df_cleaned['prix_numerique'] = extract_numbers(df_cleaned['prix'])
     
     # Nettoyage du kilométrage
     if 'kilométrage' in df_cleaned.columns:
-        df_cleaned['km_numerique'] = df_cleaned['kilométrage'].apply(extract_number)
+        df_cleaned['km_numerique'] = extract_numbers(df_cleaned['kilométrage'])
     
     # Nettoyage de l'année
     if 'année' in df_cleaned.columns:
-        df_cleaned['année'] = df_cleaned['année'].apply(lambda x: int(x) if x and x.isdigit() else None)
+        df_cleaned['année'] = extract_years(df_cleaned['année'])
     
     # Nettoyage des textes
     text_columns = ['titre', 'marque', 'transmission', 'carburant', 'adresse', 'propriétaire']
     for col in text_columns:
         if col in df_cleaned.columns:
-            df_cleaned[col] = df_cleaned[col].apply(clean_text)
+            df_cleaned[col] = clean_texts(df_cleaned[col])
     
-    return df_cleaned
+    # Types compacts (catégories, entiers nullables)
+    return apply_schema(df_cleaned)
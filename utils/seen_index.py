@@ -0,0 +1,171 @@
+"""
+Index persistant des annonces déjà vues (scraping incrémental)
+"""
+
+import csv
+import hashlib
+import os
+from array import array
+from pathlib import Path
+from itertools import count
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from utils.checkpoint import journal_path
+from utils.listing_store import identity_columns
+from utils.scraper import DEFAULT_PARSER_BACKEND, build_page_url, fetch_page_bytes, parse_listing_page
+from utils.specs import CATEGORY_SPECS
+from utils.storage import CsvSink, raw_data_path
+
+
+# Version du calcul des empreintes, écrite après la taille du CSV : un index
+# d'une autre version est reconstruit
+INDEX_VERSION = 2
+
+
+def listing_key(record: Dict, columns: Sequence[str]) -> int:
+    """Empreinte 64 bits d'une annonce (hash des champs donnés, dans l'ordre des colonnes)"""
+    payload = '\x1f'.join(str(record.get(column, '')) for column in columns)
+    return int.from_bytes(hashlib.blake2b(payload.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def index_path(csv_path: Path) -> Path:
+    """Chemin de l'index associé à un CSV brut"""
+    return Path(csv_path).with_suffix('.seen')
+
+
+def crawl_path(csv_path: Path) -> Path:
+    """Annonces vues lors du dernier scraping incrémental (connues ou nouvelles), au format du CSV brut"""
+    return Path(csv_path).with_suffix('.crawl')
+
+
+class SeenIndex:
+    """
+    Ensemble des empreintes d'annonces déjà scrapées pour une catégorie.
+    Une annonce est identifiée comme dans la base SQLite : par ses champs
+    hors prix (identity_columns), si bien qu'un changement de prix ne la
+    rend pas nouvelle. Chaque annonce occupe 8 octets sur disque (tableau
+    d'entiers 64 bits), précédés de la taille du CSV brut indexé et de
+    INDEX_VERSION. Si le CSV a été réécrit depuis
+    (scraping complet, sauvegarde, reprise), l'index est reconstruit à partir
+    du CSV.
+    """
+
+    def __init__(self, path: Path, columns: Sequence[str]):
+        self.path = Path(path)
+        self.columns = list(columns)
+        self.csv_path = None
+        self.keys = set()
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def load(self, csv_path: Path) -> 'SeenIndex':
+        """Relit l'index, ou le reconstruit depuis le CSV brut s'il est absent ou périmé"""
+        self.csv_path = Path(csv_path)
+        csv_size = self.csv_path.stat().st_size if self.csv_path.exists() else 0
+        self.keys = set()
+        if self.path.exists():
+            data = array('Q')
+            with open(self.path, 'rb') as f:
+                data.frombytes(f.read())
+            if len(data) >= 2 and data[0] == csv_size and data[1] == INDEX_VERSION:
+                self.keys = set(data[2:])
+                return self
+        if csv_size:
+            with open(self.csv_path, encoding='utf-8-sig', newline='') as f:
+                self.keys = {listing_key(row, self.columns) for row in csv.DictReader(f)}
+        return self
+
+    def take_new(self, records: Iterable[Dict]) -> List[Dict]:
+        """
+        Retourne les annonces inconnues de l'index et les y ajoute au fur et à
+        mesure : un doublon au sein d'une même page n'est gardé qu'une fois.
+        """
+        new_records = []
+        for record in records:
+            key = listing_key(record, self.columns)
+            if key not in self.keys:
+                self.keys.add(key)
+                new_records.append(record)
+        return new_records
+
+    def save(self, csv_size: int):
+        """Écrit l'index de façon atomique (fichier temporaire puis renommage)"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.seen.tmp')
+        with open(tmp_path, 'wb') as f:
+            data = array('Q', [csv_size, INDEX_VERSION])
+            data.extend(sorted(self.keys))
+            data.tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+
+def load_seen_index(category: str) -> SeenIndex:
+    """Index des annonces déjà vues d'une catégorie"""
+    csv_path = raw_data_path(category)
+    return SeenIndex(index_path(csv_path), identity_columns(category)).load(csv_path)
+
+
+def run_incremental_crawl(base_url: str, category: str, max_pages: int = None, progress_callback=None,
+                          page_callback=None, backend: str = DEFAULT_PARSER_BACKEND) -> Tuple[Path, int]:
+    """
+    Scraping incrémental : les pages sont téléchargées une à une, de la plus
+    récente à la plus ancienne, et seules les annonces absentes de l'index
+    sont ajoutées au CSV brut. Le crawl s'arrête à la première page
+    entièrement connue (ou vide, ou impossible à récupérer) : sans détection
+    du nombre de pages ni préchargement, un site inchangé ne coûte qu'une
+    requête.
+    Toutes les annonces des pages parcourues, connues ou nouvelles, sont
+    aussi écrites dans crawl_path(csv) : ce sont les annonces vues lors de
+    ce scraping (l'instantané de l'historique), alors que le CSV brut
+    cumule tous les scrapings.
+    Le journal d'un scraping complet interrompu est abandonné, le CSV ne
+    correspondant plus à ses checkpoints.
+    Retourne le chemin du CSV et le nombre de nouvelles annonces.
+    """
+    spec = CATEGORY_SPECS[category]
+    csv_path = raw_data_path(category)
+    index = load_seen_index(category)
+    journal_path(csv_path).unlink(missing_ok=True)
+    if progress_callback:
+        progress_callback(f"🧾 Index: {len(index)} annonces déjà vues")
+
+    with CsvSink(csv_path, spec.columns, append=True) as sink, \
+            CsvSink(crawl_path(csv_path), spec.columns) as seen_sink:
+        for page in count(1):
+            if max_pages is not None and page > max_pages:
+                break
+            content = fetch_page_bytes(build_page_url(base_url, page))
+            if content is None:
+                if progress_callback:
+                    progress_callback(f"❌ Impossible de récupérer la page {page}, arrêt.")
+                break
+            records, errors = parse_listing_page(content, category, backend)
+            if progress_callback:
+                for error in errors:
+                    progress_callback(f"⚠️ Erreur article: {error}")
+            if not records:
+                if progress_callback:
+                    progress_callback(f"⚠️ Aucun article trouvé sur la page {page}, arrêt.")
+                break
+
+            seen_sink.write(records)
+            new_records = index.take_new(records)
+            if new_records:
+                sink.write(new_records)
+            if page_callback:
+                page_callback(page)
+            if not new_records:
+                if progress_callback:
+                    progress_callback(f"⏹️ Page {page} entièrement connue, arrêt.")
+                break
+            if progress_callback:
+                progress_callback(f"🆕 Page {page}: {len(new_records)} nouvelles annonces")
+
+    # Un index non sauvegardé (arrêt brutal) sera reconstruit depuis le CSV
+    index.save(csv_path.stat().st_size)
+    if progress_callback:
+        progress_callback(f"✅ {sink.rows_written} nouvelles annonces {category}")
+    return csv_path, sink.rows_written
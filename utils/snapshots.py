@@ -0,0 +1,240 @@
+"""
+Historique des scrapings : instantanés datés encodés en delta
+"""
+
+import json
+import os
+import shutil
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import pandas as pd
+
+from utils.aggregates import group_means, top_counts
+from utils.listing_store import identity_columns, listing_identities, store_columns
+from utils.schema import apply_schema
+
+
+HISTORY_DIR = Path("data_dakar_auto_historique")
+MANIFEST_FILE_NAME = "snapshots.json"
+SNAPSHOT_ID_FORMAT = "%Y-%m-%d_%H%M%S"
+
+# Un instantané complet tous les KEYFRAME_INTERVAL : borne le nombre de deltas à rejouer
+KEYFRAME_INTERVAL = 10
+
+
+@dataclass
+class SnapshotDiff:
+    """Différences entre deux instantanés d'une catégorie (DataFrames indexés par identité)"""
+    old_id: str
+    new_id: str
+    added: pd.DataFrame    # annonces apparues (valeurs du nouvel instantané)
+    removed: pd.DataFrame  # annonces disparues (valeurs de l'ancien)
+    changed: pd.DataFrame  # nouvelles valeurs, anciennes suffixées par '_avant'
+
+
+def snapshot_summary(df: pd.DataFrame) -> Dict:
+    """Volume et prix moyen, au total et par marque (conservés dans le manifeste)"""
+    priced = df.loc[df['prix_numerique'] > 0, ['marque', 'prix_numerique']] if 'prix_numerique' in df.columns else None
+    mean_price = priced['prix_numerique'].mean() if priced is not None and len(priced) else None
+    marques = {}
+    if 'marque' in df.columns:
+        means = group_means(priced, 'marque', 'prix_numerique') if priced is not None else pd.Series(dtype='float64')
+        for marque, count in top_counts(df['marque']).items():
+            mean = means.get(marque)
+            marques[str(marque)] = {'annonces': int(count), 'prix_moyen': float(mean) if pd.notna(mean) else None}
+    return {
+        'rows': len(df),
+        'prix_moyen': float(mean_price) if pd.notna(mean_price) else None,
+        'marques': marques,
+    }
+
+
+def _by_identity(frame: pd.DataFrame) -> pd.DataFrame:
+    """Indexe par la colonne identity (Index construit directement : les hash ne forment pas une plage)"""
+    return frame.drop(columns='identity').set_axis(pd.Index(frame['identity'].to_numpy(), name='identity'))
+
+
+class SnapshotStore:
+    """
+    Instantanés datés des annonces nettoyées, une partition par sauvegarde :
+    `<dossier>/<catégorie>/<date>/`. Chaque partition ne contient que le
+    delta avec l'instantané précédent (annonces ajoutées, modifiées, et
+    identités des annonces retirées), sauf un instantané complet tous les
+    keyframe_interval. Une annonce est identifiée comme dans la base SQLite
+    (champs hors prix). Chaque partition garde aussi son index (identité,
+    hash de la ligne) : deux instantanés se comparent sur leurs index, puis
+    seules les annonces qui diffèrent sont relues.
+    Le manifeste `snapshots.json` liste les instantanés valides et leurs
+    statistiques ; une partition absente du manifeste est ignorée.
+    """
+
+    def __init__(self, directory: Path = HISTORY_DIR, keyframe_interval: int = KEYFRAME_INTERVAL):
+        self.directory = Path(directory)
+        self.keyframe_interval = keyframe_interval
+        self._lock = threading.Lock()
+
+    def _manifest_path(self, category: str) -> Path:
+        return self.directory / category / MANIFEST_FILE_NAME
+
+    def snapshots(self, category: str) -> List[Dict]:
+        """Instantanés d'une catégorie, du plus ancien au plus récent"""
+        try:
+            return json.loads(self._manifest_path(category).read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return []
+
+    def _save_manifest(self, category: str, entries: List[Dict]):
+        path = self._manifest_path(category)
+        tmp_path = path.with_name(path.name + '.tmp')
+        tmp_path.write_text(json.dumps(entries, ensure_ascii=False, indent=1), encoding='utf-8')
+        os.replace(tmp_path, path)
+
+    def categories(self) -> Dict[str, int]:
+        """Nombre d'instantanés par catégorie"""
+        if not self.directory.exists():
+            return {}
+        counts = {path.name: len(self.snapshots(path.name)) for path in sorted(self.directory.iterdir())
+                  if path.is_dir()}
+        return {category: count for category, count in counts.items() if count}
+
+    def _entry(self, category: str, snapshot_id: str) -> Dict:
+        for entry in self.snapshots(category):
+            if entry['id'] == snapshot_id:
+                return entry
+        raise ValueError(f"Instantané inconnu pour {category}: {snapshot_id}")
+
+    def _read_index(self, category: str, snapshot_id: str) -> pd.Series:
+        """Hash de chaque ligne d'un instantané, indexé par identité"""
+        index = pd.read_parquet(self.directory / category / snapshot_id / 'index.parquet')
+        return _by_identity(index)['row_hash']
+
+    def save(self, category: str, df: pd.DataFrame, taken_at: Optional[datetime] = None) -> Dict:
+        """
+        Enregistre un nouvel instantané (DataFrame nettoyé) sous forme de delta
+        avec le précédent. Retourne son entrée du manifeste.
+        """
+        columns = [column for column in store_columns(category) if column in df.columns]
+        rows = df[columns].set_axis(pd.Index(listing_identities(df, identity_columns(category)), name='identity'))
+        rows = rows[~rows.index.duplicated(keep='last')]
+        row_hashes = pd.Series(listing_identities(rows, columns), index=rows.index, name='row_hash')
+
+        with self._lock:
+            entries = self.snapshots(category)
+            taken_at = taken_at or datetime.now()
+            snapshot_id = taken_at.strftime(SNAPSHOT_ID_FORMAT)
+            existing = {entry['id'] for entry in entries}
+            suffix = 1
+            while snapshot_id in existing or (self.directory / category / snapshot_id).exists():
+                suffix += 1
+                snapshot_id = f"{taken_at.strftime(SNAPSHOT_ID_FORMAT)}_{suffix}"
+
+            if entries:
+                previous = self._read_index(category, entries[-1]['id'])
+                known = rows.index.isin(previous.index)
+                added_ids = rows.index[~known]
+                removed_ids = previous.index[~previous.index.isin(rows.index)]
+                common = rows.index[known]
+                changed_ids = common[row_hashes.loc[common].to_numpy() != previous.loc[common].to_numpy()]
+            else:
+                added_ids, removed_ids, changed_ids = rows.index, rows.index[:0], rows.index[:0]
+
+            since_keyframe = 0
+            for entry in reversed(entries):
+                if entry['kind'] == 'full':
+                    break
+                since_keyframe += 1
+            kind = 'full' if not entries or since_keyframe + 1 >= self.keyframe_interval else 'delta'
+
+            # Partition écrite à côté puis renommée : jamais de partition partielle
+            partition = self.directory / category / snapshot_id
+            tmp_partition = partition.with_name(snapshot_id + '.tmp')
+            shutil.rmtree(tmp_partition, ignore_errors=True)
+            tmp_partition.mkdir(parents=True)
+            row_hashes.reset_index().to_parquet(tmp_partition / 'index.parquet', index=False)
+            if kind == 'full':
+                rows.reset_index().to_parquet(tmp_partition / 'full.parquet', index=False)
+            else:
+                rows.loc[added_ids].reset_index().to_parquet(tmp_partition / 'added.parquet', index=False)
+                rows.loc[changed_ids].reset_index().to_parquet(tmp_partition / 'changed.parquet', index=False)
+                pd.DataFrame({'identity': removed_ids.to_numpy()}).to_parquet(tmp_partition / 'removed.parquet',
+                                                                                index=False)
+            os.replace(tmp_partition, partition)
+
+            entry = {
+                'id': snapshot_id,
+                'taken_at': taken_at.isoformat(timespec='seconds'),
+                'kind': kind,
+                'added': len(added_ids),
+                'removed': len(removed_ids),
+                'changed': len(changed_ids),
+                **snapshot_summary(rows),
+            }
+            self._save_manifest(category, entries + [entry])
+        return entry
+
+    def load(self, category: str, snapshot_id: str, columns: Optional[Sequence[str]] = None,
+             identities: Optional[Sequence[int]] = None) -> pd.DataFrame:
+        """
+        État d'une catégorie à un instantané (indexé par identité), reconstruit
+        depuis l'instantané complet précédent en rejouant les deltas. Seules
+        les colonnes demandées et, si `identities` est donné, ces annonces-là
+        sont lues dans les partitions.
+        """
+        entries = self.snapshots(category)
+        position = next((i for i, entry in enumerate(entries) if entry['id'] == snapshot_id), None)
+        if position is None:
+            raise ValueError(f"Instantané inconnu pour {category}: {snapshot_id}")
+        start = max(i for i in range(position + 1) if entries[i]['kind'] == 'full')
+        columns = list(columns) if columns is not None else list(store_columns(category))
+        filters = [('identity', 'in', list(identities))] if identities is not None else None
+
+        def read(entry: Dict, name: str, read_columns: List[str]) -> pd.DataFrame:
+            path = self.directory / category / entry['id'] / name
+            return _by_identity(pd.read_parquet(path, columns=['identity'] + read_columns, filters=filters))
+
+        if identities is not None and not len(identities):
+            return apply_schema(pd.DataFrame(columns=columns, index=pd.Index([], name='identity', dtype='int64')))
+
+        state = read(entries[start], 'full.parquet', columns)
+        for entry in entries[start + 1:position + 1]:
+            changed = read(entry, 'changed.parquet', columns)
+            removed = read(entry, 'removed.parquet', [])
+            state = state[~state.index.isin(removed.index) & ~state.index.isin(changed.index)]
+            state = pd.concat([state, changed, read(entry, 'added.parquet', columns)])
+        return apply_schema(state)
+
+    def compare(self, category: str, old_id: str, new_id: str,
+                columns: Optional[Sequence[str]] = None) -> SnapshotDiff:
+        """
+        Annonces ajoutées, retirées et modifiées entre deux instantanés.
+        Les index (identité, hash) suffisent à les trouver ; seules ces
+        annonces sont ensuite relues, avec les colonnes demandées.
+        """
+        self._entry(category, old_id)
+        self._entry(category, new_id)
+        old_index = self._read_index(category, old_id)
+        new_index = self._read_index(category, new_id)
+        added_ids = new_index.index.difference(old_index.index)
+        removed_ids = old_index.index.difference(new_index.index)
+        common = new_index.index.intersection(old_index.index)
+        changed_ids = common[new_index.loc[common].to_numpy() != old_index.loc[common].to_numpy()]
+
+        before = self.load(category, old_id, columns, identities=removed_ids.append(changed_ids))
+        after = self.load(category, new_id, columns, identities=added_ids.append(changed_ids))
+        changed = after.loc[after.index.isin(changed_ids)].join(
+            before.loc[before.index.isin(changed_ids)].add_suffix('_avant'))
+        return SnapshotDiff(
+            old_id=old_id,
+            new_id=new_id,
+            added=after.loc[after.index.isin(added_ids)],
+            removed=before.loc[before.index.isin(removed_ids)],
+            changed=changed,
+        )
+
+
+# Historique partagé par toutes les sessions
+snapshot_store = SnapshotStore()
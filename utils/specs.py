@@ -0,0 +1,125 @@
+"""
+Spécifications déclaratives des catégories de dakar-auto.com
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+
+YEAR_PATTERN = re.compile(r'\b(19|20)\d{2}\b')
+
+
+def first_word(text: str) -> str:
+    """Premier mot d'un texte (ex: la marque dans le titre)"""
+    words = text.split() if text else []
+    return words[0] if words else ""
+
+
+def year_in(text: str) -> str:
+    """Première année (19xx ou 20xx) trouvée dans un texte"""
+    match = YEAR_PATTERN.search(text) if text else None
+    return match.group() if match else ""
+
+
+# Transformations disponibles pour les champs dérivés
+TRANSFORMS: Dict[str, Callable[[str], str]] = {
+    'first_word': first_word,
+    'year': year_in,
+}
+
+
+@dataclass(frozen=True)
+class FieldSpec:
+    """
+    Champ d'une carte d'annonce.
+    Un champ extrait lit le texte du premier élément correspondant à chaque
+    sélecteur (balise, classe CSS) et joint les textes trouvés par un espace.
+    `index` choisit l'élément parmi les correspondances (attributs en liste)
+    et `prefer_link` prend le texte du premier lien de l'élément s'il existe.
+    Un champ dérivé applique `transform` à un champ déjà extrait.
+    """
+    name: str
+    selectors: Tuple[Tuple[str, str], ...] = ()
+    index: int = 0
+    prefer_link: bool = False
+    derive_from: Optional[str] = None
+    transform: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class CategorySpec:
+    """Catégorie scrapable : URL, libellé et champs dans l'ordre des colonnes"""
+    name: str
+    label: str
+    url: str
+    fields: Tuple[FieldSpec, ...]
+
+    @property
+    def columns(self) -> Tuple[str, ...]:
+        return tuple(f.name for f in self.fields)
+
+
+def extracted(name: str, tag: str, css_class: str, index: int = 0, prefer_link: bool = False) -> FieldSpec:
+    return FieldSpec(name, ((tag, css_class),), index=index, prefer_link=prefer_link)
+
+
+def joined(name: str, *selectors: Tuple[str, str]) -> FieldSpec:
+    return FieldSpec(name, tuple(selectors))
+
+
+def derived(name: str, source: str, transform: str) -> FieldSpec:
+    return FieldSpec(name, derive_from=source, transform=transform)
+
+
+# Sélecteurs communs aux cartes d'annonces
+TITLE = ('h2', 'listing-card__header__title')
+PRICE = ('h3', 'listing-card__header__price')
+ATTRIBUTE = ('li', 'listing-card__attribute')
+TOWN = ('span', 'town-suburb')
+PROVINCE = ('span', 'province')
+AUTHOR = ('p', 'time-author')
+
+
+CATEGORY_SPECS: Dict[str, CategorySpec] = {
+    'voitures': CategorySpec(
+        name='voitures',
+        label="🚗 Voitures",
+        url="https://dakar-auto.com/senegal/voitures-4",
+        fields=(
+            extracted('titre', *TITLE, prefer_link=True),
+            derived('marque', 'titre', 'first_word'),
+            derived('année', 'titre', 'year'),
+            extracted('prix', *PRICE),
+            extracted('kilométrage', *ATTRIBUTE, index=0),
+            extracted('transmission', *ATTRIBUTE, index=1),
+            extracted('carburant', *ATTRIBUTE, index=2),
+            joined('adresse', TOWN, PROVINCE),
+        ),
+    ),
+    'motos': CategorySpec(
+        name='motos',
+        label="🏍️ Motos",
+        url="https://dakar-auto.com/senegal/motos-and-scooters-3",
+        fields=(
+            extracted('titre', *TITLE, prefer_link=True),
+            derived('marque', 'titre', 'first_word'),
+            derived('année', 'titre', 'year'),
+            extracted('prix', *PRICE),
+            extracted('kilométrage', *ATTRIBUTE, index=0),
+            joined('adresse', TOWN, PROVINCE),
+        ),
+    ),
+    'locations': CategorySpec(
+        name='locations',
+        label="🚙 Locations de voitures",
+        url="https://dakar-auto.com/senegal/location-de-voitures-19",
+        fields=(
+            extracted('marque', *TITLE, prefer_link=True),
+            derived('année', 'marque', 'year'),
+            extracted('prix', *PRICE),
+            joined('adresse', TOWN, PROVINCE),
+            extracted('propriétaire', *AUTHOR, prefer_link=True),
+        ),
+    ),
+}
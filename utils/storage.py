@@ -0,0 +1,269 @@
+"""
+Stockage des données scrapées sur disque
+"""
+
+import csv
+import mmap
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+from utils.schema import apply_schema, read_dataset
+
+
+RAW_DATA_DIR = Path("data_dakar_auto_brutes")
+CLEAN_DATA_DIR = Path("data_dakar_auto")
+
+# Formats de stockage des jeux de données (extension par format)
+DATASET_FORMATS = {
+    'parquet': '.parquet',
+    'feather': '.feather',
+    'csv': '.csv',
+}
+DEFAULT_DATASET_FORMAT = 'parquet'
+
+# Taille des morceaux lus pour compter les lignes d'un CSV
+COUNT_CHUNK_BYTES = 64 * 1024 * 1024
+
+MIME_TYPES = {
+    '.parquet': 'application/vnd.apache.parquet',
+    '.feather': 'application/vnd.apache.arrow.file',
+    '.csv': 'text/csv',
+}
+
+
+def raw_data_path(category: str) -> Path:
+    """Chemin du fichier CSV brut d'une catégorie"""
+    return RAW_DATA_DIR / f"{category}_brutes.csv"
+
+
+def dataset_path(directory: Path, stem: str, fmt: str = DEFAULT_DATASET_FORMAT) -> Path:
+    """Chemin d'un jeu de données dans le format demandé"""
+    return Path(directory) / f"{stem}{DATASET_FORMATS[fmt]}"
+
+
+def list_datasets(directory: Path, pattern: str = "*") -> List[Path]:
+    """Jeux de données d'un dossier, tous formats confondus"""
+    directory = Path(directory)
+    return sorted(path for suffix in DATASET_FORMATS.values() for path in directory.glob(pattern + suffix))
+
+
+def save_dataset(df: pd.DataFrame, path: Path):
+    """
+    Écrit un DataFrame au format donné par l'extension (.parquet, .feather,
+    .csv). Le fichier est remplacé atomiquement : une page qui le lit en même
+    temps voit l'ancienne ou la nouvelle version, jamais un fichier partiel.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + '.tmp')
+    if path.suffix == '.parquet':
+        df.to_parquet(tmp_path, index=False)
+    elif path.suffix == '.feather':
+        df.reset_index(drop=True).to_feather(tmp_path)
+    else:
+        df.to_csv(tmp_path, index=False, encoding='utf-8-sig')
+    os.replace(tmp_path, path)
+
+
+def _stable_types(chunk: pd.DataFrame) -> pd.DataFrame:
+    """
+    Types identiques d'un morceau à l'autre : les catégories (dont le
+    dictionnaire dépend du morceau) en texte, les nombres (dont le type
+    compact dépend des valeurs) en Float64. Le schéma compact est réappliqué
+    à la lecture par load_dataset.
+    """
+    stable = chunk.reset_index(drop=True)
+    for column in stable.columns:
+        dtype = stable[column].dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            stable[column] = stable[column].astype('str')
+        elif pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype):
+            stable[column] = stable[column].astype('Float64')
+    return stable
+
+
+def save_dataset_chunks(chunks: Iterable[pd.DataFrame], path: Path, columns: Sequence[str] = ()) -> int:
+    """
+    Écrit un jeu de données morceau par morceau, dans le format donné par
+    l'extension comme save_dataset : un seul morceau est en mémoire à la
+    fois. Le fichier est remplacé atomiquement une fois le dernier morceau
+    écrit. Sans aucun morceau, le fichier ne contient que les colonnes
+    données. Retourne le nombre de lignes écrites.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + '.tmp')
+    empty = pd.DataFrame(columns=list(columns))
+    rows = 0
+    writer = None
+    try:
+        if path.suffix in ('.parquet', '.feather'):
+            schema = None
+            for chunk in chunks:
+                table = pa.Table.from_pandas(_stable_types(chunk), preserve_index=False)
+                if writer is None:
+                    schema = table.schema
+                    writer = (pq.ParquetWriter(tmp_path, schema) if path.suffix == '.parquet'
+                              else pa.ipc.new_file(str(tmp_path), schema))
+                writer.write_table(table.cast(schema))
+                rows += len(chunk)
+            if writer is None:
+                if path.suffix == '.parquet':
+                    empty.to_parquet(tmp_path, index=False)
+                else:
+                    empty.to_feather(tmp_path)
+            else:
+                writer.close()
+                writer = None
+        else:
+            with open(tmp_path, 'w', encoding='utf-8-sig', newline='') as f:
+                header = True
+                for chunk in chunks:
+                    chunk.to_csv(f, index=False, header=header)
+                    header = False
+                    rows += len(chunk)
+                if header:
+                    empty.to_csv(f, index=False)
+    except BaseException:
+        if writer is not None:
+            writer.close()
+        tmp_path.unlink(missing_ok=True)
+        raise
+    os.replace(tmp_path, path)
+    return rows
+
+
+def load_dataset(path: Path, columns: Optional[Sequence[str]] = None, nrows: Optional[int] = None) -> pd.DataFrame:
+    """
+    Lit un jeu de données (Parquet, Feather ou CSV) avec le schéma compact.
+    Seules les colonnes demandées sont lues (les colonnes absentes du fichier
+    sont ignorées) ; `nrows` limite la lecture aux premières lignes.
+    """
+    path = Path(path)
+    if columns is not None:
+        available = dataset_columns(path)
+        columns = [column for column in columns if column in available]
+    if path.suffix == '.parquet':
+        if nrows is None:
+            return apply_schema(pd.read_parquet(path, columns=columns))
+        batches = pq.ParquetFile(path).iter_batches(batch_size=max(nrows, 1), columns=columns)
+        batch = next(batches, None)
+        df = batch.to_pandas() if batch is not None else pd.read_parquet(path, columns=columns)
+        return apply_schema(df.head(nrows))
+    if path.suffix == '.feather':
+        # Fichier Arrow IPC projeté en mémoire : seules les colonnes lues sont chargées
+        table = feather.read_table(path, columns=columns, memory_map=True)
+        if nrows is not None:
+            table = table.slice(0, nrows)
+        return apply_schema(table.to_pandas())
+    return read_dataset(path, usecols=columns, nrows=nrows)
+
+
+def dataset_columns(path: Path) -> List[str]:
+    """Colonnes d'un jeu de données, lues dans ses métadonnées sans charger les données"""
+    path = Path(path)
+    if path.suffix == '.parquet':
+        return list(pq.read_schema(path).names)
+    if path.suffix == '.feather':
+        return list(feather.read_table(path, memory_map=True).schema.names)
+    return list(pd.read_csv(path, encoding='utf-8-sig', nrows=0).columns)
+
+
+def count_csv_rows(path: Path) -> int:
+    """
+    Nombre de lignes de données d'un CSV (en-tête exclu), compté sur le
+    fichier projeté en mémoire sans le parser. Un saut de ligne ne termine
+    un enregistrement que s'il est précédé d'un nombre pair de guillemets :
+    les champs multi-lignes entre guillemets comptent pour une seule ligne.
+    """
+    size = os.path.getsize(path)
+    if size == 0:
+        return 0
+    records = 0
+    quotes = 0  # guillemets rencontrés avant le morceau courant
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        data = np.frombuffer(mm, dtype=np.uint8)
+        for start in range(0, size, COUNT_CHUNK_BYTES):
+            chunk = data[start:start + COUNT_CHUNK_BYTES]
+            quote_positions = np.flatnonzero(chunk == ord('"'))
+            newline_positions = np.flatnonzero(chunk == ord('\n'))
+            quotes_before = quotes + np.searchsorted(quote_positions, newline_positions)
+            records += int(np.count_nonzero(quotes_before % 2 == 0))
+            quotes += len(quote_positions)
+        if data[-1] != ord('\n'):
+            records += 1
+        # Les vues sur la projection doivent être libérées avant sa fermeture
+        del data, chunk
+    return max(records - 1, 0)
+
+
+def dataset_num_rows(path: Path) -> int:
+    """Nombre de lignes d'un jeu de données, sans charger ses valeurs"""
+    path = Path(path)
+    if path.suffix == '.parquet':
+        return pq.ParquetFile(path).metadata.num_rows
+    if path.suffix == '.feather':
+        return feather.read_table(path, memory_map=True).num_rows
+    return count_csv_rows(path)
+
+
+class CsvSink:
+    """
+    Écrit des annonces dans un CSV au fil du scraping.
+    Chaque lot (une page) est ajouté puis synchronisé sur disque, si bien
+    qu'un arrêt brutal ne fait perdre que la page en cours. Le format est
+    celui de DataFrame.to_csv(index=False, encoding='utf-8-sig').
+    """
+
+    def __init__(self, path: Path, columns: Sequence[str], append: bool = False):
+        self.path = Path(path)
+        self.columns = list(columns)
+        self.append = append
+        self.rows_written = 0
+        self._file = None
+        self._writer = None
+
+    def open(self) -> 'CsvSink':
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        write_header = not (self.append and self.path.exists() and self.path.stat().st_size > 0)
+        # utf-8-sig n'écrit le BOM qu'en début de fichier, pas lors d'un ajout
+        self._file = open(self.path, 'a' if self.append else 'w', encoding='utf-8-sig', newline='')
+        self._writer = csv.DictWriter(self._file, fieldnames=self.columns, extrasaction='ignore',
+                                      lineterminator='\n')
+        if write_header:
+            self._writer.writeheader()
+            self._sync()
+        return self
+
+    def _sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def write(self, records: Iterable[Dict]):
+        """Ajoute un lot d'annonces et le rend durable"""
+        records = list(records)
+        self._writer.writerows(records)
+        self._sync()
+        self.rows_written += len(records)
+
+    def size(self) -> int:
+        """Taille du fichier en octets après le dernier lot écrit"""
+        return os.fstat(self._file.fileno()).st_size
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> 'CsvSink':
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()